@@ -0,0 +1,187 @@
+# archive.py - hot/cold archival of closed jobs and their applications
+#
+# Jobs closed for longer than ARCHIVE_AFTER_DAYS are moved, with all their
+# applications, out of the job_posting and application tables every
+# dashboard scans and into instance/archive.db, which has the same two
+# tables. run() works through each shard in batches of `batch_size` jobs;
+# each batch is one short transaction over the shard, core and archive
+# files (copy, then delete), so the rows are in exactly one place at any
+# time and writers only wait for a single batch. Bookmarks and shard
+# directory entries of archived jobs are dropped; analytics rollups stay.
+#
+# Reads by id fall back to the archive: lookup() tries the hot tables and
+# then the archive, and reading(True) routes the statements of a block to
+# the archive the way shards.using() routes them to a shard. The archive
+# connection ATTACHes the core database, so joins to candidate and user
+# work unchanged. Archived rows are read-only.
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import abort, current_app, g
+from sqlalchemy import create_engine, event
+from models import db, JobPosting, Application, SavedJob, JobShard
+from migrations import ensure_schema
+import shards
+from skill_matcher import matcher as skill_matcher
+
+ARCHIVED_MODELS = (JobPosting, Application)
+ARCHIVE_AFTER_DAYS = 365
+BATCH_SIZE = 200  # jobs per transaction
+BATCH_PAUSE = 0.05  # seconds writers get between batches
+
+
+def init_app(app):
+    """Create or upgrade instance/archive.db. Call after shards.init_app()."""
+    path = os.path.join(app.instance_path, 'archive.db')
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        db.metadata.create_all(engine, tables=[model.__table__ for model in ARCHIVED_MODELS])
+        ensure_schema(db, *ARCHIVED_MODELS, engine=engine)
+    finally:
+        engine.dispose()
+
+    core_path = app.extensions['shards'].core_path
+    engine = create_engine(f'sqlite:///{path}')
+
+    @event.listens_for(engine, 'connect')
+    def _attach_core(dbapi_connection, connection_record):
+        dbapi_connection.execute('ATTACH DATABASE ? AS core', (core_path,))
+
+    app.extensions['archive'] = {'path': path, 'engine': engine}
+
+
+def engine():
+    return current_app.extensions['archive']['engine']
+
+
+# ---------------------- Reads ----------------------
+@contextmanager
+def reading(archived=True):
+    """Route statements in this block to the archive (when `archived`)."""
+    if not archived:
+        yield
+        return
+    previous = g.get('archive')
+    g.archive = True
+    try:
+        yield
+    finally:
+        g.archive = previous
+
+
+def lookup(model, ident):
+    """(row, archived) for `model` by id: from the hot tables, else the archive.
+
+    The row is (None, False) when neither has it. Archived rows must not be
+    modified; read their relationships inside reading(True).
+    """
+    row = db.session.get(model, ident)
+    if row is not None:
+        return row, False
+    with reading():
+        row = db.session.get(model, ident)
+    return row, row is not None
+
+
+def lookup_or_404(model, ident):
+    row, archived = lookup(model, ident)
+    if row is None:
+        abort(404)
+    return row, archived
+
+
+# ---------------------- Archiving ----------------------
+def _columns(model):
+    return ', '.join(f'"{column.name}"' for column in model.__table__.columns)
+
+
+def _archive_batch(connection, src, number, cutoff, batch_size):
+    """Move up to `batch_size` closed jobs and their applications; returns (job ids, applications)."""
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        job_ids = [job_id for (job_id,) in connection.execute(
+            f"SELECT id FROM {src}.job_posting WHERE status = 'closed' AND updated_at < ? "
+            f'ORDER BY id LIMIT ?', (cutoff, batch_size))]
+        if not job_ids:
+            connection.execute('ROLLBACK')
+            return [], 0
+        in_jobs = ', '.join('?' * len(job_ids))
+
+        # Plain INSERT: an id already in the archive is a bug to surface,
+        # not a row to overwrite
+        columns = _columns(JobPosting)
+        connection.execute(f'INSERT INTO archive.job_posting ({columns}) '
+                           f'SELECT {columns} FROM {src}.job_posting WHERE id IN ({in_jobs})', job_ids)
+        columns = _columns(Application)
+        applications = connection.execute(
+            f'INSERT INTO archive.application ({columns}) '
+            f'SELECT {columns} FROM {src}.application WHERE job_id IN ({in_jobs})', job_ids).rowcount
+
+        # SQLite reuses the highest rowid once it is deleted; move the id
+        # sequence past the archived ids of this file's range first
+        low, high = number * shards.ID_SPAN, (number + 1) * shards.ID_SPAN
+        for table, ids_sql in (('job_posting', f'SELECT id FROM {src}.job_posting WHERE id IN ({in_jobs})'),
+                               ('application', f'SELECT id FROM {src}.application WHERE job_id IN ({in_jobs})')):
+            connection.execute(
+                f'UPDATE {src}.shard_sequence SET next_id = max(next_id, '
+                f'(SELECT coalesce(max(id), 0) FROM ({ids_sql}) WHERE id >= ? AND id < ?) + 1) '
+                f'WHERE name = ?', [*job_ids, low, high, table])
+
+        connection.execute(f'DELETE FROM {src}.application WHERE job_id IN ({in_jobs})', job_ids)
+        connection.execute(f'DELETE FROM {src}.job_posting WHERE id IN ({in_jobs})', job_ids)
+        connection.execute(f'DELETE FROM main.{SavedJob.__tablename__} WHERE job_id IN ({in_jobs})', job_ids)
+        connection.execute(f'DELETE FROM main.{JobShard.__tablename__} WHERE job_id IN ({in_jobs})', job_ids)
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    return job_ids, applications
+
+
+def run(days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, max_batches=None):
+    """Archive jobs closed more than `days` ago on every shard.
+
+    Returns {'jobs': n, 'applications': n, 'job_ids': [...]}.
+    """
+    shard_set = current_app.extensions['shards']
+    cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S.%f')
+    result = {'jobs': 0, 'applications': 0, 'job_ids': []}
+    db.session.commit()
+
+    for name in shard_set.names:
+        connection = sqlite3.connect(shard_set.core_path, isolation_level=None, timeout=30)
+        try:
+            connection.execute('ATTACH DATABASE ? AS archive', (current_app.extensions['archive']['path'],))
+            src = 'main'
+            if name != shards.DEFAULT_SHARD:
+                connection.execute('ATTACH DATABASE ? AS src', (shard_set.paths[name],))
+                src = 'src'
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                job_ids, applications = _archive_batch(connection, src, shard_set.numbers[name],
+                                                       cutoff, batch_size)
+                if not job_ids:
+                    break
+                result['jobs'] += len(job_ids)
+                result['applications'] += applications
+                result['job_ids'].extend(job_ids)
+                batches += 1
+                time.sleep(BATCH_PAUSE)
+        finally:
+            connection.close()
+    for job_id in result['job_ids']:
+        skill_matcher.forget_job(job_id)
+    return result
+
+
+def stats():
+    """Row counts of the hot tables (all shards) and the archive."""
+    hot = shards.scatter(lambda: (JobPosting.query.count(), Application.query.count()))
+    with reading():
+        archived = (JobPosting.query.count(), Application.query.count())
+    return {
+        'hot': {'jobs': sum(jobs for jobs, _ in hot), 'applications': sum(count for _, count in hot)},
+        'archived': {'jobs': archived[0], 'applications': archived[1]},
+    }
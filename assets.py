@@ -0,0 +1,249 @@
+# assets.py - fingerprinted, precompressed static assets
+#
+# `flask assets-build` minifies the bundled CSS/JS, writes them to
+# static/dist with a content hash in the file name, precompresses each file
+# to .gz (and .br when the optional `brotli` package is installed) and
+# records the mapping in static/dist/manifest.json. Templates call
+# `asset_url('js/jobs.js')`, which resolves through the manifest and falls
+# back to the plain /static URL when no build exists (e.g. in development).
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants are built without it
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+BUNDLED_ASSETS = ['css/style.css', 'js/script.js', 'js/jobs.js']
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+# Characters after which a `/` starts a regex literal rather than a division
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'in', 'of', 'delete', 'void', 'throw', 'new')
+# Whitespace next to these characters can always be dropped
+_JS_TIGHT = set('{}()[];,:=<>!&|?')
+
+
+def _last_word(chars):
+    word = []
+    for ch in reversed(chars):
+        if ch.isalnum() or ch in '_$':
+            word.append(ch)
+        else:
+            break
+    return ''.join(reversed(word))
+
+
+def minify_js(source):
+    """Strip comments and redundant whitespace, leaving strings, template
+    literals and regex literals untouched. Newlines between statements are
+    kept so automatic semicolon insertion behaves as before."""
+    out = []
+    i, n = 0, len(source)
+    # Brace depth at which each enclosing `${` of a template literal closes
+    template_stack = []
+    depth = 0
+
+    def scan_template(i):
+        # Copy template literal text from `i` until the closing backtick or `${`
+        while i < n:
+            ch = source[i]
+            if ch == '\\':
+                out.append(source[i:i + 2])
+                i += 2
+            elif ch == '`':
+                out.append(ch)
+                return i + 1, False
+            elif ch == '$' and source[i + 1:i + 2] == '{':
+                out.append('${')
+                return i + 2, True
+            else:
+                out.append(ch)
+                i += 1
+        return i, False
+
+    while i < n:
+        ch = source[i]
+        nxt = source[i + 1:i + 2]
+
+        if ch in '\'"':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif ch == '`':
+            out.append(ch)
+            i, opened = scan_template(i + 1)
+            if opened:
+                template_stack.append(depth)
+        elif ch == '/' and nxt == '/':
+            while i < n and source[i] != '\n':
+                i += 1
+        elif ch == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            if out and not out[-1].isspace():
+                out.append(' ')
+        elif ch == '/':
+            prev = ''.join(out[-20:]).rstrip()
+            if not prev or prev[-1] in _REGEX_PREFIX or _last_word(prev) in _REGEX_KEYWORDS:
+                j = i + 1
+                in_class = False
+                while j < n:
+                    c = source[j]
+                    if c == '\\':
+                        j += 2
+                        continue
+                    if c == '[':
+                        in_class = True
+                    elif c == ']':
+                        in_class = False
+                    elif c == '/' and not in_class:
+                        break
+                    j += 1
+                j += 1
+                while j < n and (source[j].isalnum() or source[j] == '_'):
+                    j += 1
+                out.append(source[i:j])
+                i = j
+            else:
+                out.append(ch)
+                i += 1
+        elif ch.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            newline = '\n' in source[i:j]
+            prev = out[-1][-1] if out and out[-1] else ''
+            following = source[j:j + 1]
+            if not prev or prev.isspace():
+                pass
+            elif newline and prev not in '{;,([':
+                out.append('\n')
+            elif prev in _JS_TIGHT or following in _JS_TIGHT:
+                pass
+            else:
+                out.append(' ')
+            i = j
+        elif ch == '{':
+            depth += 1
+            out.append(ch)
+            i += 1
+        elif ch == '}':
+            if template_stack and template_stack[-1] == depth:
+                template_stack.pop()
+                out.append(ch)
+                i, opened = scan_template(i + 1)
+                if opened:
+                    template_stack.append(depth)
+            else:
+                depth -= 1
+                out.append(ch)
+                i += 1
+        else:
+            out.append(ch)
+            i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """Strip comments and collapse whitespace around CSS punctuation."""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    for index in range(0, len(parts), 2):
+        text = re.sub(r'/\*.*?\*/', '', parts[index], flags=re.S)
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        text = text.replace(';}', '}')
+        parts[index] = text
+    return ''.join(parts).strip() + '\n'
+
+
+def build(assets=BUNDLED_ASSETS):
+    """Minify, fingerprint and precompress `assets`; return the manifest."""
+    manifest = {}
+    for logical in assets:
+        with open(os.path.join(STATIC_DIR, logical), encoding='utf-8') as fh:
+            source = fh.read()
+        minified = minify_css(source) if logical.endswith('.css') else minify_js(source)
+        data = minified.encode('utf-8')
+
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(logical)
+        hashed = f'{stem}.{digest}{ext}'
+        target = os.path.join(DIST_DIR, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with open(target, 'wb') as fh:
+            fh.write(data)
+        with open(target + '.gz', 'wb') as fh:
+            # mtime=0 keeps the output byte-identical across builds
+            fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target + '.br', 'wb') as fh:
+                fh.write(brotli.compress(data, quality=11))
+
+        manifest[logical] = hashed
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    _manifest_cache.clear()
+    return manifest
+
+
+_manifest_cache = {}
+
+
+def load_manifest():
+    try:
+        mtime = os.path.getmtime(MANIFEST_PATH)
+    except OSError:
+        return {}
+    if _manifest_cache.get('mtime') != mtime:
+        with open(MANIFEST_PATH, encoding='utf-8') as fh:
+            _manifest_cache['manifest'] = json.load(fh)
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['manifest']
+
+
+def asset_url(filename):
+    """URL of the built, fingerprinted `filename`, or its plain static URL."""
+    hashed = load_manifest().get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('static_asset', filename=hashed)
+
+
+def send_asset(filename):
+    """Serve a built asset, preferring a precompressed variant the client accepts."""
+    path = safe_join(DIST_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            encoding = candidate
+            path += suffix
+            break
+
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
@@ -0,0 +1,267 @@
+# autocomplete.py - in-memory typeahead for job titles, locations and skills
+#
+# Each kind keeps a frequency per suggestion (how many active jobs carry
+# the title or location, how many jobs and candidates list the skill) and
+# a sorted array of (search key, suggestion) pairs. A prefix query is two
+# bisections into that array; the best `MAX_LIMIT` suggestions of a range
+# are computed once and cached per prefix, so repeated keystrokes are a
+# dict lookup and no query touches the database. Titles are also indexed
+# from every word, so "eng" suggests "Backend Engineer".
+#
+# The index is built lazily and rebuilt after MAX_AGE like candidate_index.
+# In between, ORM writes of jobs and candidates are applied incrementally
+# when their transaction commits: the old values are subtracted, the new
+# ones added, and only cached prefixes of the changed keys are dropped.
+# Bulk UPDATE statements bypass the ORM; callers invalidate() after them.
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from models import db, JobPosting, Candidate
+from skill_matcher import normalize_skills
+import geo
+import shards
+
+KINDS = ('title', 'location', 'skill')
+MAX_AGE = 600  # seconds before a lazy full rebuild
+MAX_LIMIT = 20
+MAX_TITLE_WORDS = 6
+MAX_SKILL_WORDS = 3
+MAX_SKILL_LENGTH = 40
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(re.sub(r'[^\w\s+#.]', ' ', text).split())
+
+
+# ---------------------- What a row contributes ----------------------
+def job_terms(title, location, requirements, status):
+    """[(kind, label)] a job contributes; inactive jobs contribute nothing."""
+    if status != 'active':
+        return []
+    terms = []
+    if title and title.strip():
+        terms.append(('title', ' '.join(title.split())))
+    if location and location.strip():
+        place = geo.lookup(location)
+        terms.append(('location', place.name if place else ' '.join(location.split())))
+    terms.extend(('skill', skill) for skill in _skills(requirements))
+    return terms
+
+
+def candidate_terms(skills):
+    return [('skill', skill) for skill in _skills(skills)]
+
+
+def _skills(text):
+    # Requirements are free text; keep only short, skill-like entries
+    return [skill for skill in normalize_skills(text)
+            if len(skill) <= MAX_SKILL_LENGTH and len(skill.split()) <= MAX_SKILL_WORDS]
+
+
+def _search_keys(kind, label):
+    key = normalize(label)
+    if not key:
+        return []
+    if kind != 'title':
+        return [key]
+    words = key.split()[:MAX_TITLE_WORDS]
+    return [' '.join(words[start:]) for start in range(len(words))]
+
+
+# ---------------------- Index ----------------------
+class _Kind:
+    __slots__ = ('counts', 'labels', 'keys', 'cache')
+
+    def __init__(self):
+        self.counts = {}   # suggestion key -> frequency
+        self.labels = {}   # suggestion key -> display label
+        self.keys = []     # sorted [(search key, suggestion key)]
+        self.cache = {}    # prefix -> [(count, suggestion key)], best first
+
+
+class AutocompleteIndex:
+    def __init__(self, max_age=MAX_AGE):
+        self._lock = threading.Lock()
+        self.max_age = max_age
+        self.built_at = None
+        self.kinds = {kind: _Kind() for kind in KINDS}
+
+    def _build(self):
+        totals = {kind: {} for kind in KINDS}
+        labels = {kind: {} for kind in KINDS}
+
+        def count(terms):
+            for kind, label in terms:
+                key = normalize(label)
+                if key:
+                    totals[kind][key] = totals[kind].get(key, 0) + 1
+                    labels[kind].setdefault(key, label)
+
+        def count_jobs():
+            rows = db.session.query(JobPosting.title, JobPosting.location,
+                                    JobPosting.requirements, JobPosting.status)\
+                .filter(JobPosting.status == 'active')\
+                .yield_per(5000)
+            for row in rows:
+                count(job_terms(*row))
+
+        shards.scatter(count_jobs)
+        for (skills,) in db.session.query(Candidate.skills)\
+                .filter(Candidate.skills.isnot(None))\
+                .yield_per(5000):
+            count(candidate_terms(skills))
+
+        kinds = {}
+        for kind in KINDS:
+            index = _Kind()
+            index.counts = totals[kind]
+            index.labels = labels[kind]
+            index.keys = sorted((search_key, key) for key, label in index.labels.items()
+                                for search_key in _search_keys(kind, label))
+            kinds[kind] = index
+        self.kinds = kinds
+        self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        with self._lock:
+            if self.built_at is None or time.monotonic() - self.built_at > self.max_age:
+                self._build()
+
+    def invalidate(self):
+        with self._lock:
+            self.built_at = None
+
+    def apply(self, changes):
+        """Apply [(delta, kind, label)] from committed writes; a no-op until first build."""
+        with self._lock:
+            if self.built_at is None:
+                return
+            for delta, kind, label in changes:
+                key = normalize(label)
+                if not key:
+                    continue
+                index = self.kinds[kind]
+                before = index.counts.get(key, 0)
+                after = max(before + delta, 0)
+                search_keys = _search_keys(kind, label)
+                if after and not before:
+                    index.labels[key] = label
+                    for search_key in search_keys:
+                        bisect.insort(index.keys, (search_key, key))
+                elif before and not after:
+                    for search_key in search_keys:
+                        position = bisect.bisect_left(index.keys, (search_key, key))
+                        if position < len(index.keys) and index.keys[position] == (search_key, key):
+                            del index.keys[position]
+                    index.labels.pop(key, None)
+                if after:
+                    index.counts[key] = after
+                else:
+                    index.counts.pop(key, None)
+                # Cached rankings of every prefix of the changed keys are stale
+                for search_key in search_keys:
+                    for end in range(1, len(search_key) + 1):
+                        index.cache.pop(search_key[:end], None)
+
+    def _top(self, index, prefix):
+        ranked = index.cache.get(prefix)
+        if ranked is None:
+            low = bisect.bisect_left(index.keys, (prefix,))
+            high = bisect.bisect_left(index.keys, (prefix + '\uffff',))
+            best = {}
+            for _search_key, key in index.keys[low:high]:
+                best[key] = index.counts[key]
+            ranked = heapq.nsmallest(MAX_LIMIT, ((-count, key) for key, count in best.items()))
+            ranked = [(-negative, key) for negative, key in ranked]
+            index.cache[prefix] = ranked
+        return ranked
+
+    def suggest(self, text, kinds=KINDS, limit=8):
+        """Most frequent suggestions starting with `text`, best first."""
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        self.ensure_fresh()
+        with self._lock:
+            results = []
+            for kind in kinds:
+                index = self.kinds[kind]
+                results.extend((count, kind, index.labels[key])
+                               for count, key in self._top(index, prefix)[:limit])
+        results.sort(key=lambda item: (-item[0], item[2]))
+        return [{'value': label, 'kind': kind, 'count': count} for count, kind, label in results[:limit]]
+
+
+index = AutocompleteIndex()
+
+
+# ---------------------- Incremental maintenance ----------------------
+def _previous(target, name):
+    history = inspect(target).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, name)
+
+
+def _pending(target):
+    return object_session(target).info.setdefault('autocomplete', [])
+
+
+def _job_values(job, old=False):
+    names = ('title', 'location', 'requirements', 'status')
+    return [(_previous(job, name) if old else getattr(job, name)) for name in names]
+
+
+@event.listens_for(JobPosting, 'after_insert')
+def _job_inserted(mapper, connection, job):
+    _pending(job).extend((1, kind, label) for kind, label in job_terms(*_job_values(job)))
+
+
+@event.listens_for(JobPosting, 'after_update')
+def _job_updated(mapper, connection, job):
+    changes = _pending(job)
+    changes.extend((-1, kind, label) for kind, label in job_terms(*_job_values(job, old=True)))
+    changes.extend((1, kind, label) for kind, label in job_terms(*_job_values(job)))
+
+
+@event.listens_for(JobPosting, 'after_delete')
+def _job_deleted(mapper, connection, job):
+    _pending(job).extend((-1, kind, label) for kind, label in job_terms(*_job_values(job, old=True)))
+
+
+@event.listens_for(Candidate, 'after_insert')
+def _candidate_inserted(mapper, connection, candidate):
+    _pending(candidate).extend((1, kind, label) for kind, label in candidate_terms(candidate.skills))
+
+
+@event.listens_for(Candidate, 'after_update')
+def _candidate_updated(mapper, connection, candidate):
+    changes = _pending(candidate)
+    changes.extend((-1, kind, label) for kind, label in candidate_terms(_previous(candidate, 'skills')))
+    changes.extend((1, kind, label) for kind, label in candidate_terms(candidate.skills))
+
+
+@event.listens_for(Candidate, 'after_delete')
+def _candidate_deleted(mapper, connection, candidate):
+    _pending(candidate).extend((-1, kind, label)
+                                for kind, label in candidate_terms(_previous(candidate, 'skills')))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    changes = session.info.pop('autocomplete', None)
+    if changes:
+        index.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop('autocomplete', None)
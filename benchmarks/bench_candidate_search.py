@@ -0,0 +1,62 @@
+# benchmarks/bench_candidate_search.py - boolean skill search latency at scale
+#
+# Usage: python benchmarks/bench_candidate_search.py [candidates] [hr_share]
+#
+# Fills a CandidateIndex directly (no database) with N synthetic candidates
+# whose skills follow a skewed popularity distribution, scopes an HR user to
+# `hr_share` of them and times a few boolean queries, first page ranked.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_index import Bitmap, CandidateIndex, _Postings, parse_query
+
+SKILLS = ['python', 'java', 'javascript', 'sql', 'react', 'django', 'flask', 'php', 'aws',
+          'docker', 'kubernetes', 'go', 'rust', 'c++', 'machine learning', 'excel', 'tableau',
+          'node.js', 'spring', 'angular'] + [f'skill{i}' for i in range(500)]
+QUERIES = [
+    'python',
+    'python AND (django OR flask) AND NOT php',
+    '(java OR spring) AND aws AND NOT angular',
+    '"machine learning" OR tableau OR excel',
+    'rust AND go AND kubernetes',
+]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    hr_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(SKILLS))]
+
+    index = CandidateIndex(max_age=float('inf'))
+    state = _Postings()
+    start = time.perf_counter()
+    applicants = Bitmap()
+    for candidate_id in range(1, count + 1):
+        for skill in set(rng.choices(SKILLS, weights, k=6)):
+            state.postings.setdefault(skill, Bitmap()).add(candidate_id)
+        if rng.random() < hr_share:
+            applicants.add(candidate_id)
+    state.hr_applicants[1] = applicants
+    index.state = state
+    index.built_at = time.monotonic()
+    print(f'built index for {count} candidates in {time.perf_counter() - start:.1f}s, '
+          f'HR scope {len(applicants)} applicants')
+
+    for text in QUERIES:
+        tree = parse_query(text)
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            total, hits = index.search(1, tree, page=1, per_page=20)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f'{text:<45} {total:>8} matches  best {min(timings):7.2f} ms  '
+              f'top score {hits[0][1] if hits else "-"}')
+
+
+if __name__ == '__main__':
+    main()
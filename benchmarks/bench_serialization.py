@@ -0,0 +1,116 @@
+# benchmarks/bench_serialization.py - ORM to_dict/jsonify vs column-projected encoding
+#
+# Usage: python benchmarks/bench_serialization.py [applications] [repeats]
+#
+# Seeds an in-memory database with one job and N applications, then
+# compares the old `/api/applications/<job_id>` serialization (hydrate ORM
+# objects, strftime, jsonify) with projection.select + projection.dumps
+# for the full default field set and for a list view projection.
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from models import db, User, JobPosting, Candidate, Application
+import projection
+
+LIST_VIEW_FIELDS = 'id,status,applied_at,candidate.name'
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(count):
+    hr = User(name='Bench HR', email='hr@bench.local', password='x', phone='0', user_type='hr')
+    db.session.add(hr)
+    db.session.flush()
+    job = JobPosting(title='Engineer', company='Bench', description='d' * 500,
+                     requirements='python, sql', job_type='fulltime', hr_id=hr.id)
+    db.session.add(job)
+    db.session.flush()
+    now = datetime.utcnow()
+    db.session.bulk_insert_mappings(Candidate, [{
+        'id': i, 'name': f'Candidate {i}', 'email': f'c{i}@bench.local', 'phone': '555-0100',
+        'skills': 'python, flask, sql, docker, aws, react', 'experience': '5 years',
+        'education': 'B.Tech Computer Science', 'resume_url': f'uploads/resumes/{i}.pdf',
+        'created_at': now
+    } for i in range(1, count + 1)])
+    db.session.bulk_insert_mappings(Application, [{
+        'candidate_id': i, 'job_id': job.id, 'status': 'pending', 'applied_at': now, 'match_score': 80
+    } for i in range(1, count + 1)])
+    db.session.commit()
+    return job.id
+
+
+def orm_payload(job_id):
+    applications = Application.query.filter_by(job_id=job_id)\
+        .options(db.joinedload(Application.candidate))\
+        .order_by(Application.applied_at.desc())\
+        .all()
+    data = [{
+        'id': app.id,
+        'candidate_id': app.candidate_id,
+        'job_id': app.job_id,
+        'status': app.status,
+        'applied_at': app.applied_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'candidate': {
+            'id': app.candidate.id,
+            'name': app.candidate.name,
+            'email': app.candidate.email,
+            'phone': app.candidate.phone,
+            'skills': app.candidate.skills,
+            'experience': app.candidate.experience,
+            'education': app.candidate.education,
+            'resume_url': app.candidate.resume_url
+        }
+    } for app in applications]
+    return jsonify({'applications': data, 'total': len(data)}).get_data()
+
+
+def projected_payload(job_id, raw_fields):
+    fields = projection.parse_fields(raw_fields, projection.APPLICATION_DETAIL_COLUMNS,
+                                     projection.APPLICATION_DETAIL_DEFAULT)
+    query = Application.query.filter_by(job_id=job_id)
+    if projection.needs_join(fields, 'candidate'):
+        query = query.join(Candidate, Application.candidate_id == Candidate.id)
+    data = projection.select(query.order_by(Application.applied_at.desc()),
+                             fields, projection.APPLICATION_DETAIL_COLUMNS)
+    return projection.dumps({'applications': data, 'total': len(data)})
+
+
+def measure(label, fn, repeats):
+    fn()  # warm up
+    db.session.expunge_all()
+    start = time.process_time()
+    for _ in range(repeats):
+        body = fn()
+        db.session.expunge_all()
+    cpu_ms = (time.process_time() - start) / repeats * 1000
+    print(f'{label:<50} {cpu_ms:9.2f} ms CPU/response {len(body) / 1024:10.1f} KiB')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        job_id = seed(count)
+        print(f'{count} applications, {repeats} repeats, encoder: '
+              f"{'orjson' if projection.orjson else 'json'}")
+        measure('ORM + jsonify', lambda: orm_payload(job_id), repeats)
+        measure('projection (all fields)', lambda: projected_payload(job_id, None), repeats)
+        measure(f'projection ({LIST_VIEW_FIELDS})',
+                lambda: projected_payload(job_id, LIST_VIEW_FIELDS), repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_skill_matching.py - substring loop vs whole-word skill matching
+#
+# Usage: python benchmarks/bench_skill_matching.py [jobs] [applications]
+#
+# Generates synthetic jobs and candidates from a skill vocabulary and scores
+# applications with the old `skill in job_text` loop and with
+# skill_matcher. Accuracy is measured against a whole-word regex oracle:
+# the old loop reports false positives for short skills such as "c" or "r".
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skill_matcher import SkillMatcher, WORD_CHARS, normalize_skills
+
+VOCABULARY = [
+    'python', 'java', 'javascript', 'typescript', 'c', 'c++', 'c#', 'r', 'go', 'rust', 'sql',
+    'mysql', 'postgresql', 'flask', 'django', 'react', 'angular', 'vue', 'node.js', 'docker',
+    'kubernetes', 'aws', 'azure', 'gcp', 'machine learning', 'deep learning', 'nlp', 'pandas',
+    'numpy', 'spark', 'hadoop', 'kafka', 'redis', 'graphql', 'rest', 'html', 'css', 'git',
+    'linux', 'excel', 'tableau', 'power bi', 'scala', 'swift', 'kotlin', 'php', 'ruby', 'rails',
+]
+FILLER = ('we are looking for an engineer to build reliable services for our customers and '
+          'partners across regions with strong ownership communication and care').split()
+
+
+def make_job(rng, job_id):
+    words = []
+    for _ in range(300):
+        words.append(rng.choice(VOCABULARY) if rng.random() < 0.05 else rng.choice(FILLER))
+    description = ' '.join(words)
+    requirements = ', '.join(rng.sample(VOCABULARY, 6))
+    return SimpleNamespace(id=job_id, updated_at=None, description=description, requirements=requirements)
+
+
+def substring_score(skills_text, job):
+    match_score = 70
+    skills = [s.strip().lower() for s in skills_text.split(',')]
+    job_text = (job.description + ' ' + job.requirements).lower()
+    matched_skills = sum(1 for skill in skills if skill in job_text)
+    if skills:
+        match_score += min(30, (matched_skills / len(skills)) * 30)
+    return match_score, {skill for skill in skills if skill in job_text}
+
+
+def oracle(skills, job):
+    text = ' '.join(f'{job.description} {job.requirements}'.lower().split())
+    word = ''.join(sorted(WORD_CHARS)).replace('#', r'\#').replace('+', r'\+')
+    found = set()
+    for skill in skills:
+        if re.search(rf'(?<![{word}]){re.escape(skill)}(?![{word}])', text):
+            found.add(skill)
+    return found
+
+
+def main():
+    job_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rng = random.Random(42)
+    jobs = [make_job(rng, i) for i in range(job_count)]
+    applications = [(', '.join(rng.sample(VOCABULARY, 8)), rng.choice(jobs)) for _ in range(app_count)]
+
+    start = time.perf_counter()
+    for skills_text, job in applications:
+        substring_score(skills_text, job)
+    loop_seconds = time.perf_counter() - start
+
+    matcher = SkillMatcher()
+    start = time.perf_counter()
+    for skills_text, job in applications:
+        matcher.match_score(skills_text, job)
+    matcher_seconds = time.perf_counter() - start
+
+    false_positives = false_negatives_loop = matcher_errors = total = 0
+    for skills_text, job in applications[:2000]:
+        skills = normalize_skills(skills_text)
+        expected = oracle(skills, job)
+        loop_found = substring_score(skills_text, job)[1]
+        false_positives += len(loop_found - expected)
+        false_negatives_loop += len(expected - loop_found)
+        matcher_errors += len(set(matcher.matched_skills(skills, job)) ^ expected)
+        total += len(skills)
+
+    print(f'{app_count} applications over {job_count} jobs')
+    print(f'substring loop : {app_count / loop_seconds:10.0f} applications/s')
+    print(f'skill_matcher  : {app_count / matcher_seconds:10.0f} applications/s')
+    print(f'accuracy on 2000 applications ({total} skill checks, whole-word oracle):')
+    print(f'  substring loop: {false_positives} false positives, {false_negatives_loop} false negatives')
+    print(f'  skill_matcher : {matcher_errors} mismatches')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+# benchmarks/load_test.py - end-to-end load test against a multi-worker server
+#
+# Usage: python benchmarks/load_test.py [--workers 4] [--clients 8] [--duration 30]
+#            [--mix login=1,hr_dashboard=3,job_search=4,jobs_api=4,apply=2,...]
+#            [--hrs 20] [--seekers 500] [--jobs 400] [--server auto|gunicorn|werkzeug]
+#
+# Seeds a throwaway SQLite database (CAREERSYNC_DATABASE_URI), starts the app
+# under gunicorn when installed (else werkzeug's forking server) with
+# `--workers` processes, and drives a weighted mix of routes from `--clients`
+# client processes for `--duration` seconds. Latencies go into HDR-style
+# log-linear histograms per route, merged across clients, and the report
+# shows throughput and p50/p95/p99/max per route. Client-side only: it
+# uses http.client and needs nothing beyond the app's own dependencies.
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'loadtest'
+SKILLS = ['python', 'java', 'javascript', 'sql', 'react', 'django', 'flask', 'php', 'aws',
+          'docker', 'kubernetes', 'go', 'excel', 'tableau', 'machine learning', 'node.js']
+LOCATIONS = ['Bengaluru', 'Pune', 'Remote', 'Mumbai', 'Hyderabad', 'Delhi']
+SALARIES = ['$40,000 - $60,000', '$70k - $90k', '$100,000 - $140,000', '12-18 LPA', '$160k+', '']
+
+DEFAULT_MIX = ('login=1,hr_dashboard=3,job_search=4,jobs_api=4,apply=2,'
+               'ranked_applications=2,analytics_api=1,candidate_search=2,hr_timeline=1')
+
+
+# ---------------------- Histogram ----------------------
+class Histogram:
+    """HDR-style latency histogram in microseconds.
+
+    Each power-of-two range is split into 2**SUB_BITS linear buckets, so
+    any recorded value is reported within 1/2**SUB_BITS (~0.8%) while the
+    bucket count grows only logarithmically with the range.
+    """
+
+    SUB_BITS = 7
+
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+
+    def _shift(self, value):
+        return max(0, value.bit_length() - self.SUB_BITS - 1)
+
+    def record(self, seconds):
+        value = max(1, int(seconds * 1e6))
+        shift = self._shift(value)
+        key = value >> shift << shift  # lowest value of the bucket
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def percentile(self, percent):
+        """Highest value equivalent to the `percent` percentile, in ms."""
+        total = self.total
+        if not total:
+            return 0.0
+        rank = max(1, int(round(percent / 100 * total)))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                return (key + (1 << self._shift(key)) - 1) / 1000
+        return self.max()
+
+    def max(self):
+        if not self.counts:
+            return 0.0
+        key = max(self.counts)
+        return (key + (1 << self._shift(key)) - 1) / 1000
+
+
+# ---------------------- Seeding ----------------------
+def seed(hrs, seekers, jobs, applications_per_seeker, rng):
+    from web import app
+    from models import db, bcrypt, User, Candidate, JobPosting, Application
+
+    with app.app_context():
+        password = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+        hr_users = [User(name=f'HR {i}', email=f'hr{i}@load.test', password=password,
+                         phone='0000000000', user_type='hr') for i in range(hrs)]
+        seeker_users = [User(name=f'Seeker {i}', email=f'seeker{i}@load.test', password=password,
+                             phone='0000000000', user_type='jobseeker') for i in range(seekers)]
+        db.session.add_all(hr_users + seeker_users)
+        db.session.commit()
+
+        db.session.add_all([
+            Candidate(id=user.id, name=user.name, email=user.email,
+                      skills=', '.join(rng.sample(SKILLS, 4)), experience=f'{rng.randint(0, 12)} years')
+            for user in seeker_users
+        ])
+        job_rows = []
+        for i in range(jobs):
+            skills = rng.sample(SKILLS, 3)
+            job_rows.append(JobPosting(
+                title=f'{skills[0].title()} Engineer {i}', company=f'Company {i % 50}',
+                location=rng.choice(LOCATIONS), salary_range=rng.choice(SALARIES),
+                experience=rng.choice(['Entry level', '2-4 years', '5+ years', 'Senior']),
+                description=f'Work with {skills[0]} and {skills[1]} on our platform.',
+                requirements=', '.join(skills), job_type=rng.choice(['fulltime', 'parttime', 'contract']),
+                status='active', hr_id=rng.choice(hr_users).id))
+        db.session.add_all(job_rows)
+        db.session.commit()
+
+        job_ids = [job.id for job in job_rows]
+        rows = []
+        for user in seeker_users:
+            for job_id in rng.sample(job_ids, min(applications_per_seeker, len(job_ids))):
+                rows.append({'candidate_id': user.id, 'job_id': job_id,
+                             'status': rng.choice(['pending', 'pending', 'shortlisted', 'rejected']),
+                             'match_score': rng.randint(50, 100)})
+        db.session.execute(Application.__table__.insert(), rows)
+        db.session.commit()
+
+        jobs_by_hr = {}
+        for job in job_rows:
+            jobs_by_hr.setdefault(job.hr_id, []).append(job.id)
+        return {
+            'hrs': [(user.email, jobs_by_hr.get(user.id, [])) for user in hr_users],
+            'seekers': [user.email for user in seeker_users],
+            'jobs': job_ids,
+        }
+
+
+# ---------------------- Server ----------------------
+def start_server(kind, workers, port, env):
+    if kind == 'auto':
+        kind = 'gunicorn' if shutil.which('gunicorn') else 'werkzeug'
+    if kind == 'gunicorn':
+        command = ['gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+                   '--log-level', 'warning', 'web:app']
+    else:
+        command = [sys.executable, '-c',
+                   'from werkzeug.serving import run_simple; import web; '
+                   f'run_simple("127.0.0.1", {port}, web.app, processes={workers}, threaded=False)']
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return process, kind
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError('Server exited during startup')
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Server did not start within 30s')
+
+
+# ---------------------- Clients ----------------------
+class Session:
+    """Keep-alive connection with a cookie jar of one."""
+
+    def __init__(self, port):
+        self.port = port
+        self.connection = None
+        self.cookie = None
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if body is not None:
+            body = urlencode(body)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        cookie = response.getheader('Set-Cookie')
+        if cookie and cookie.startswith('session='):
+            self.cookie = cookie.split(';', 1)[0]
+        if response.will_close:
+            self.connection.close()
+            self.connection = None
+        return response.status
+
+    def login(self, email):
+        self.cookie = None
+        return self.request('POST', '/login', {'email': email, 'password': PASSWORD})
+
+
+def _route_login(ctx, rng):
+    email = rng.choice(ctx['seekers']) if rng.random() < 0.5 else rng.choice(ctx['hrs'])[0]
+    return Session(ctx['port']).login(email)
+
+
+def _route_hr_dashboard(ctx, rng):
+    return ctx['hr'].request('GET', '/dashboard/hr')
+
+
+def _route_job_search(ctx, rng):
+    query = urlencode({'search': rng.choice(SKILLS), 'location': rng.choice(['', *LOCATIONS])})
+    return ctx['seeker'].request('GET', f'/dashboard/candidate/job-search?{query}')
+
+
+def _route_jobs_api(ctx, rng):
+    query = urlencode({'search': rng.choice(['', *SKILLS]), 'type': rng.choice(['', 'fulltime']),
+                       'page': rng.randint(1, 3)})
+    return ctx['seeker'].request('GET', f'/api/jobs?{query}')
+
+
+def _route_apply(ctx, rng):
+    return ctx['seeker'].request('GET', f"/dashboard/candidate/apply/{rng.choice(ctx['jobs'])}")
+
+
+def _route_ranked_applications(ctx, rng):
+    job_id = rng.choice(ctx['hr_jobs']) if ctx['hr_jobs'] else rng.choice(ctx['jobs'])
+    return ctx['hr'].request('GET', f'/api/job/{job_id}/ranked-applications?limit=20')
+
+
+def _route_analytics_api(ctx, rng):
+    return ctx['hr'].request('GET', '/api/analytics')
+
+
+def _route_candidate_search(ctx, rng):
+    skills = rng.sample(SKILLS, 2)
+    query = urlencode({'q': f'{skills[0]} AND NOT {skills[1]}'})
+    return ctx['hr'].request('GET', f'/api/hr/candidates/search?{query}')
+
+
+def _route_hr_timeline(ctx, rng):
+    return ctx['hr'].request('GET', '/api/hr/timeline')
+
+
+ROUTES = {name[len('_route_'):]: func for name, func in globals().items() if name.startswith('_route_')}
+
+
+def run_client(index, port, seeded, mix, duration):
+    rng = random.Random(index)
+    hr_email, hr_jobs = rng.choice(seeded['hrs'])
+    ctx = {'port': port, 'hrs': seeded['hrs'], 'seekers': seeded['seekers'],
+           'jobs': seeded['jobs'], 'hr_jobs': hr_jobs,
+           'hr': Session(port), 'seeker': Session(port)}
+    ctx['hr'].login(hr_email)
+    ctx['seeker'].login(rng.choice(seeded['seekers']))
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    histograms = {name: Histogram() for name in names}
+    errors = dict.fromkeys(names, 0)
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = ROUTES[name](ctx, rng)
+        except OSError:
+            status = 599
+        histograms[name].record(time.perf_counter() - start)
+        if status >= 400:
+            errors[name] += 1
+    return {name: histogram.counts for name, histogram in histograms.items()}, errors
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ROUTES:
+            raise SystemExit(f"Unknown route {name!r}; choose from: {', '.join(sorted(ROUTES))}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def report(results, elapsed):
+    merged = {}
+    errors = {}
+    for counts, client_errors in results:
+        for name, histogram_counts in counts.items():
+            merged.setdefault(name, Histogram()).merge(Histogram(histogram_counts))
+        for name, count in client_errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+    overall = Histogram()
+    print(f"\n{'route':<22}{'requests':>10}{'req/s':>9}{'errors':>8}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in sorted(merged, key=lambda key: -merged[key].total):
+        histogram = merged[name]
+        overall.merge(histogram)
+        print(f'{name:<22}{histogram.total:>10}{histogram.total / elapsed:>9.1f}{errors[name]:>8}'
+              f'{histogram.percentile(50):>10.2f}{histogram.percentile(95):>10.2f}'
+              f'{histogram.percentile(99):>10.2f}{histogram.max():>10.2f}')
+    print(f"{'all':<22}{overall.total:>10}{overall.total / elapsed:>9.1f}{sum(errors.values()):>8}"
+          f'{overall.percentile(50):>10.2f}{overall.percentile(95):>10.2f}'
+          f'{overall.percentile(99):>10.2f}{overall.max():>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4, help='server worker processes')
+    parser.add_argument('--clients', type=int, default=8, help='load generator processes')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='route=weight,... traffic mix')
+    parser.add_argument('--hrs', type=int, default=20)
+    parser.add_argument('--seekers', type=int, default=500)
+    parser.add_argument('--jobs', type=int, default=400)
+    parser.add_argument('--applications', type=int, default=5, help='applications per seeker')
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'werkzeug'], default='auto')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--rate-limit', choices=['off', 'memory', 'sqlite'], default='off',
+                        help='rate limit backend of the server under test')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix='careersync-load-')
+    env = dict(os.environ, CAREERSYNC_DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'load.db')}",
+               CAREERSYNC_RATE_LIMIT_BACKEND=args.rate_limit)
+    os.environ.update(env)
+    server = None
+    try:
+        start = time.perf_counter()
+        seeded = seed(args.hrs, args.seekers, args.jobs, args.applications, random.Random(1))
+        print(f'seeded {args.hrs} HR users, {args.seekers} job seekers, {args.jobs} jobs '
+              f'in {time.perf_counter() - start:.1f}s')
+
+        server, kind = start_server(args.server, args.workers, args.port, env)
+        print(f'{kind} running with {args.workers} workers; '
+              f'{args.clients} clients for {args.duration:.0f}s')
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.starmap(run_client, [(index, args.port, seeded, mix, args.duration)
+                                                for index in range(args.clients)])
+        report(results, time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
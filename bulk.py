@@ -0,0 +1,213 @@
+# bulk.py - batched HR operations over many jobs and applications
+#
+# Work is split into chunks of CHUNK_SIZE ids, each applied with set-wise
+# statements and committed on its own, so one request for hundreds of
+# jobs never holds the SQLite write lock for longer than a chunk takes.
+# Application rows of deleted jobs are removed in batches of at most
+# APPLICATION_BATCH rows per transaction for the same reason.
+#
+# Application status changes are checked against APPLICATION_TRANSITIONS
+# and applied with one UPDATE per chunk; the analytics rollups get one
+# bump per job in the same transaction.
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import case, func
+from models import db, JobPosting, Application, Candidate, SavedJob
+import rollups
+import events
+import shards
+
+CHUNK_SIZE = 200
+APPLICATION_BATCH = 5000
+MAX_BATCH_IDS = 5000
+
+# Allowed application status changes; 'hired' is final
+APPLICATION_TRANSITIONS = {
+    'pending': {'shortlisted', 'rejected'},
+    'shortlisted': {'pending', 'rejected', 'hired'},
+    'rejected': {'pending', 'shortlisted'},
+    'hired': set(),
+}
+
+JOB_ACTIONS = {
+    'close': 'closed',
+    'reopen': 'active',
+    'delete': None,
+}
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _owned_jobs(hr_id, job_ids):
+    return db.session.query(JobPosting.id, JobPosting.title, JobPosting.status)\
+        .filter(JobPosting.id.in_(job_ids), JobPosting.hr_id == hr_id)\
+        .order_by(JobPosting.id)\
+        .all()
+
+
+def _delete_applications(job_ids):
+    deleted = 0
+    while True:
+        batch = db.session.query(Application.id)\
+            .filter(Application.job_id.in_(job_ids))\
+            .limit(APPLICATION_BATCH)\
+            .scalar_subquery()
+        count = Application.query.filter(Application.id.in_(batch))\
+            .delete(synchronize_session=False)
+        db.session.commit()
+        deleted += count
+        if count < APPLICATION_BATCH:
+            return deleted
+
+
+def apply_job_action(hr_id, action, job_ids, chunk_size=CHUNK_SIZE):
+    """Close, reopen or delete the jobs of `hr_id` among `job_ids`.
+
+    Ids that do not exist or belong to another HR user are skipped.
+    Returns a summary with the ids each chunk actually changed; deletes
+    also list the candidates who had applied to the deleted jobs.
+    """
+    if action not in JOB_ACTIONS:
+        raise ValueError(f'Unknown action: {action}')
+    target = JOB_ACTIONS[action]
+    requested = list(dict.fromkeys(job_ids))
+
+    changed = []
+    skipped = []
+    applications_deleted = 0
+    applicant_ids = set()
+    for chunk in _chunks(requested, chunk_size):
+        owned = _owned_jobs(hr_id, chunk)
+        owned_set = {job.id for job in owned}
+        skipped.extend(job_id for job_id in chunk if job_id not in owned_set)
+        if not owned:
+            continue
+
+        try:
+            if target is not None:
+                ids = [job.id for job in owned if job.status != target]
+                if ids:
+                    JobPosting.query.filter(JobPosting.id.in_(ids))\
+                        .update({'status': target, 'updated_at': datetime.utcnow()},
+                                synchronize_session=False)
+            else:
+                ids = [job.id for job in owned]
+                applicant_ids.update(candidate_id for (candidate_id,) in
+                                     db.session.query(Application.candidate_id)
+                                     .filter(Application.job_id.in_(ids)).distinct())
+                applications_deleted += _delete_applications(ids)
+                rollups.forget_jobs(ids)
+                shards.forget_jobs(ids)
+                SavedJob.query.filter(SavedJob.job_id.in_(ids)).delete(synchronize_session=False)
+                JobPosting.query.filter(JobPosting.id.in_(ids))\
+                    .delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        changed.extend(ids)
+
+        ids = set(ids)
+        for job in owned:
+            if job.id in ids:
+                if target is None:
+                    events.record('job.deleted', hr_id, job_id=job.id, job_title=job.title)
+                else:
+                    events.record('job.status', hr_id, job_id=job.id, job_title=job.title,
+                                  status=target, previous=job.status)
+
+    return {
+        'action': action,
+        'requested': len(requested),
+        'changed': changed,
+        'unchanged': len(requested) - len(changed) - len(skipped),
+        'skipped': skipped,
+        'applications_deleted': applications_deleted,
+        'applicant_ids': sorted(applicant_ids),
+    }
+
+
+def transition_applications(hr_id, application_ids, status, chunk_size=CHUNK_SIZE):
+    """Move the applications of `hr_id`'s jobs among `application_ids` to `status`.
+
+    Applications already in `status` are left unchanged; those whose
+    current status cannot move to `status` are reported as invalid.
+    Returns a summary including per-job counts of changed applications.
+    """
+    if status not in APPLICATION_TRANSITIONS:
+        raise ValueError(f'Unknown status: {status}')
+    sources = [source for source, targets in APPLICATION_TRANSITIONS.items() if status in targets]
+    requested = list(dict.fromkeys(application_ids))
+
+    changed = []
+    unchanged = 0
+    invalid = []
+    skipped = []
+    jobs = defaultdict(int)
+    for chunk in _chunks(requested, chunk_size):
+        rows = db.session.query(Application.id, Application.job_id, Application.candidate_id,
+                                Application.status, Application.stages_reached, Application.applied_at,
+                                JobPosting.title, JobPosting.company, Candidate.name)\
+            .join(JobPosting, Application.job_id == JobPosting.id)\
+            .outerjoin(Candidate, Application.candidate_id == Candidate.id)\
+            .filter(Application.id.in_(chunk), JobPosting.hr_id == hr_id)\
+            .all()
+        found = {row.id for row in rows}
+        skipped.extend(application_id for application_id in chunk if application_id not in found)
+
+        groups = defaultdict(list)  # job_id -> [applied_at] of first entries into `status`
+        ids = []
+        moved = []
+        for row in rows:
+            if row.status == status:
+                unchanged += 1
+            elif row.status in sources:
+                ids.append(row.id)
+                moved.append(row)
+                if rollups.first_entry(row.stages_reached, row.status, status):
+                    groups[row.job_id].append(row.applied_at)
+            else:
+                invalid.append({'id': row.id, 'status': row.status})
+        if not ids:
+            continue
+
+        try:
+            # Re-check the source status in the UPDATE so a concurrent change is not overwritten
+            reached = func.coalesce(
+                Application.stages_reached,
+                case(rollups.STAGE_BITS, value=Application.status, else_=0).op('|')(rollups.STAGE_BITS['pending'])
+            ).op('|')(rollups.STAGE_BITS[status])
+            updated = Application.query\
+                .filter(Application.id.in_(ids), Application.status.in_(sources))\
+                .update({'status': status, 'stages_reached': reached}, synchronize_session=False)
+            if updated != len(ids):
+                raise RuntimeError('Applications changed concurrently, please retry')
+            now = datetime.utcnow()
+            for job_id, applied_ats in groups.items():
+                rollups.record_transitions(hr_id, job_id, status, applied_ats, at=now)
+            for row in moved:
+                jobs[row.job_id] += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        changed.extend(ids)
+
+        for row in moved:
+            events.record('application.status', hr_id, candidate_id=row.candidate_id,
+                          job_id=row.job_id, application_id=row.id, at=now,
+                          job_title=row.title, company=row.company, candidate_name=row.name,
+                          status=status, previous=row.status)
+
+    return {
+        'status': status,
+        'requested': len(requested),
+        'changed': changed,
+        'unchanged': unchanged,
+        'invalid': invalid,
+        'skipped': skipped,
+        'jobs': dict(jobs),
+    }
@@ -1,12 +1,26 @@
 # candidate_dashboard.py
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 import os
+import json
 import uuid
 from werkzeug.utils import secure_filename
-from models import db, User, JobPosting, Candidate as CandidateModel, Application
+from models import db, User, JobPosting, Candidate as CandidateModel, Application, SavedJob
+import rollups
+import live_feed
+import events
+import shards
+import geo
+from sqlalchemy import func, literal
+from sqlalchemy.orm import contains_eager
+import projection
+from skill_matcher import matcher as skill_matcher
+from candidate_index import index as candidate_index
+from projection import FieldError
 
 candidate_bp = Blueprint('candidate', __name__, url_prefix='/dashboard/candidate')
 
+JOB_SEARCH_PER_PAGE = 20
+
 # Candidate Dashboard Routes
 @candidate_bp.route('/')
 def candidate_dashboard():
@@ -15,18 +29,27 @@ def candidate_dashboard():
     
     user_id = session['user_id']
     
-    # Get candidate stats
-    total_applications = Application.query.filter_by(candidate_id=user_id).count()
-    pending_applications = Application.query.filter_by(candidate_id=user_id, status='pending').count()
-    shortlisted_applications = Application.query.filter_by(candidate_id=user_id, status='shortlisted').count()
-    rejected_applications = Application.query.filter_by(candidate_id=user_id, status='rejected').count()
+    # Application timeline, including status history, from the event log.
+    # Read first: it commits buffered events, which would expire the rows
+    # loaded from other shards below.
+    applications_timeline = [
+        dict(json.loads(event.data or '{}'), kind=event.kind, created_at=event.created_at)
+        for event in events.candidate_timeline(user_id, limit=10)
+    ]
     
-    # Get recent applications (last 5)
-    recent_apps = Application.query.filter_by(candidate_id=user_id)\
-        .join(JobPosting)\
-        .order_by(Application.applied_at.desc())\
-        .limit(5)\
-        .all()
+    # Get candidate stats
+    status_counts = _status_counts(user_id)
+    total_applications = sum(status_counts.values())
+    pending_applications = status_counts.get('pending', 0)
+    shortlisted_applications = status_counts.get('shortlisted', 0)
+    rejected_applications = status_counts.get('rejected', 0)
+    
+    # Get recent applications (last 5), top 5 of each shard merged
+    recent_apps = shards.gather(lambda: _own_applications(user_id)
+                                .order_by(Application.applied_at.desc())
+                                .limit(5)
+                                .all())
+    recent_apps = sorted(recent_apps, key=lambda app: app.applied_at, reverse=True)[:5]
     
     # Get recommended jobs (based on skills - simplified)
     candidate = CandidateModel.query.filter_by(id=user_id).first()
@@ -35,22 +58,15 @@ def candidate_dashboard():
         # Simple recommendation based on skills (in real app, use ML)
         skills = candidate.skills.lower().split(',')
         for skill in skills[:3]:  # Check first 3 skills
-            jobs = JobPosting.query.filter(
+            jobs = shards.gather(lambda: JobPosting.query.filter(
                 JobPosting.description.ilike(f'%{skill.strip()}%') |
                 JobPosting.requirements.ilike(f'%{skill.strip()}%')
-            ).filter_by(status='active').limit(3).all()
-            recommended_jobs.extend(jobs)
+            ).filter_by(status='active').limit(3).all())
+            recommended_jobs.extend(jobs[:3])
     
     # Remove duplicates
     recommended_jobs = list(set(recommended_jobs))[:5]
     
-    # Get application timeline
-    applications_timeline = Application.query.filter_by(candidate_id=user_id)\
-        .join(JobPosting)\
-        .order_by(Application.applied_at.desc())\
-        .limit(10)\
-        .all()
-    
     return render_template('candidate_dashboard.html',
                          user_name=session['user_name'],
                          total_applications=total_applications,
@@ -61,308 +77,23 @@ def candidate_dashboard():
                          recommended_jobs=recommended_jobs,
                          applications_timeline=applications_timeline)
 
-@candidate_bp.route('/applications')
-def applications():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    
-    # Get filter parameters
-    status_filter = request.args.get('status', 'all')
-    sort_by = request.args.get('sort', 'newest')
-    
-    # Base query
-    query = Application.query.filter_by(candidate_id=user_id).join(JobPosting)
-    
-    # Apply filters
-    if status_filter != 'all':
-        query = query.filter(Application.status == status_filter)
-    
-    # Apply sorting
-    if sort_by == 'newest':
-        query = query.order_by(Application.applied_at.desc())
-    elif sort_by == 'oldest':
-        query = query.order_by(Application.applied_at.asc())
-    elif sort_by == 'match':
-        # Assuming match_score column exists, otherwise adjust
-        query = query.order_by(Application.match_score.desc())
-    elif sort_by == 'status':
-        query = query.order_by(Application.status)
-    
-    applications = query.all()
-    
-    return render_template('candidate_applications.html',
-                         applications=applications,
-                         user_name=session['user_name'])
-
-@candidate_bp.route('/job-search')
-def job_search():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    # Get search parameters
-    search_query = request.args.get('search', '')
-    location_filter = request.args.get('location', '')
-    experience_filter = request.args.get('experience', 'all')
-    job_type_filter = request.args.get('job_type', 'all')
-    
-    # Base query for active jobs
-    query = JobPosting.query.filter_by(status='active')
-    
-    # Apply filters
-    if search_query:
-        query = query.filter(
-            JobPosting.title.ilike(f'%{search_query}%') |
-            JobPosting.company.ilike(f'%{search_query}%') |
-            JobPosting.description.ilike(f'%{search_query}%')
-        )
-    
-    if location_filter:
-        query = query.filter(JobPosting.location.ilike(f'%{location_filter}%'))
-    
-    if experience_filter != 'all':
-        query = query.filter(JobPosting.experience.ilike(f'%{experience_filter}%'))
-    
-    if job_type_filter != 'all':
-        query = query.filter(JobPosting.job_type == job_type_filter)
-    
-    # Get jobs
-    jobs = query.order_by(JobPosting.created_at.desc()).all()
-    
-    # Check which jobs are already applied
-    user_id = session['user_id']
-    applied_job_ids = [app.job_id for app in 
-                      Application.query.filter_by(candidate_id=user_id).all()]
-    
-    return render_template('candidate_job_search.html',
-                         jobs=jobs,
-                         applied_job_ids=applied_job_ids,
-                         user_name=session['user_name'])
-
-@candidate_bp.route('/profile')
-def profile():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    candidate = CandidateModel.query.filter_by(id=user_id).first()
-    
-    return render_template('candidate_profile.html',
-                         candidate=candidate,
-                         user_name=session['user_name'])
-
-@candidate_bp.route('/profile/update', methods=['POST'])
-def update_profile():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    candidate = CandidateModel.query.filter_by(id=user_id).first()
-    
-    if candidate:
-        candidate.name = request.form.get('name', candidate.name)
-        candidate.email = request.form.get('email', candidate.email)
-        candidate.phone = request.form.get('phone', candidate.phone)
-        candidate.skills = request.form.get('skills', candidate.skills)
-        candidate.experience = request.form.get('experience', candidate.experience)
-        candidate.education = request.form.get('education', candidate.education)
-        
-        # Handle resume upload
-        if 'resume' in request.files:
-            resume_file = request.files['resume']
-            if resume_file and resume_file.filename:
-                filename = secure_filename(f"{user_id}_{resume_file.filename}")
-                resume_path = os.path.join('uploads/resumes', filename)
-                os.makedirs('uploads/resumes', exist_ok=True)
-                resume_file.save(resume_path)
-                candidate.resume_url = resume_path
-        
-        db.session.commit()
-        flash('Profile updated successfully!', 'success')
-    
-    return redirect(url_for('candidate.profile'))
-
-@candidate_bp.route('/apply/<int:job_id>')
-def apply_job(job_id):
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    
-    # Check if already applied
-    existing_application = Application.query.filter_by(
-        candidate_id=user_id,
-        job_id=job_id
-    ).first()
-    
-    if existing_application:
-        flash('You have already applied for this job!', 'warning')
-    else:
-        # Create new application
-        # Calculate match score (simplified - in real app, use ML)
-        candidate = CandidateModel.query.get(user_id)
-        job = JobPosting.query.get(job_id)
-        
-        match_score = 70  # Base score
-        
-        if candidate and job:
-            if candidate.skills:
-                skills = [s.strip().lower() for s in candidate.skills.split(',')]
-                job_text = (job.description + ' ' + job.requirements).lower()
-                matched_skills = sum(1 for skill in skills if skill in job_text)
-                if skills:
-                    match_score += min(30, (matched_skills / len(skills)) * 30)
-        
-        new_application = Application(
-            candidate_id=user_id,
-            job_id=job_id,
-            status='pending',
-            match_score=match_score
-        )
-        
-        db.session.add(new_application)
-        db.session.commit()
-        
-        flash(f'Application submitted successfully! Match Score: {match_score}%', 'success')
-    
-    return redirect(url_for('candidate.job_search'))
-
-@candidate_bp.route('/resume-analysis')
-def resume_analysis():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    candidate = CandidateModel.query.filter_by(id=user_id).first()
-    
-    # Analyze resume (simplified)
-    analysis = {
-        'profile_strength': 75,
-        'skills_gap': ['Machine Learning', 'Cloud Computing'],
-        'suggested_improvements': [
-            'Add more quantifiable achievements',
-            'Include specific project details',
-            'Update skills section with latest technologies'
-        ],
-        'keyword_analysis': {
-            'technical_skills': 8,
-            'leadership': 3,
-            'achievements': 5
-        }
-    }
-    
-    return render_template('candidate_resume_analysis.html',
-                         candidate=candidate,
-                         analysis=analysis,
-                         user_name=session['user_name'])
+def _own_applications(user_id):
+    # Jobs are loaded in the same query, while the shard is still selected
+    return Application.query.filter_by(candidate_id=user_id)\
+        .join(JobPosting)\
+        .options(contains_eager(Application.job))
 
-# API Routes for candidate dashboard
-@candidate_bp.route('/api/applications/stats')
-def application_stats():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return jsonify({'error': 'Unauthorized'}), 401
-    
-    user_id = session['user_id']
-    
-    stats = {
-        'total': Application.query.filter_by(candidate_id=user_id).count(),
-        'pending': Application.query.filter_by(candidate_id=user_id, status='pending').count(),
-        'shortlisted': Application.query.filter_by(candidate_id=user_id, status='shortlisted').count(),
-        'rejected': Application.query.filter_by(candidate_id=user_id, status='rejected').count(),
-        'hired': Application.query.filter_by(candidate_id=user_id, status='hired').count()
-    }
-    
-    return jsonify(stats)
 
-@candidate_bp.route('/api/recommended-jobs')
-def recommended_jobs_api():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return jsonify({'error': 'Unauthorized'}), 401
-    
-    user_id = session['user_id']
-    candidate = CandidateModel.query.filter_by(id=user_id).first()
-    
-    # Get recommended jobs (simplified)
-    jobs = JobPosting.query.filter_by(status='active')\
-        .order_by(JobPosting.created_at.desc())\
-        .limit(10)\
-        .all()
-    
-    jobs_data = []
-    for job in jobs:
-        jobs_data.append({
-            'id': job.id,
-            'title': job.title,
-            'company': job.company,
-            'location': job.location,
-            'type': job.job_type,
-            'posted_date': job.created_at.strftime('%b %d, %Y')
-        })
-    
-    return jsonify({'jobs': jobs_data})
-# candidate_dashboard.py
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-import os
-import uuid
-from werkzeug.utils import secure_filename
-from models import db, User, JobPosting, Candidate as CandidateModel, Application
-
-candidate_bp = Blueprint('candidate', __name__, url_prefix='/dashboard/candidate')
+def _status_counts(user_id):
+    counts = {}
+    for rows in shards.scatter(lambda: db.session.query(Application.status, func.count(Application.id))
+                               .filter(Application.candidate_id == user_id)
+                               .group_by(Application.status)
+                               .all()):
+        for status, count in rows:
+            counts[status] = counts.get(status, 0) + count
+    return counts
 
-# Candidate Dashboard Routes
-@candidate_bp.route('/')
-def candidate_dashboard():
-    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    
-    # Get candidate stats
-    total_applications = Application.query.filter_by(candidate_id=user_id).count()
-    pending_applications = Application.query.filter_by(candidate_id=user_id, status='pending').count()
-    shortlisted_applications = Application.query.filter_by(candidate_id=user_id, status='shortlisted').count()
-    rejected_applications = Application.query.filter_by(candidate_id=user_id, status='rejected').count()
-    
-    # Get recent applications (last 5)
-    recent_apps = Application.query.filter_by(candidate_id=user_id)\
-        .join(JobPosting)\
-        .order_by(Application.applied_at.desc())\
-        .limit(5)\
-        .all()
-    
-    # Get recommended jobs (based on skills - simplified)
-    candidate = CandidateModel.query.filter_by(id=user_id).first()
-    recommended_jobs = []
-    if candidate and candidate.skills:
-        # Simple recommendation based on skills (in real app, use ML)
-        skills = candidate.skills.lower().split(',')
-        for skill in skills[:3]:  # Check first 3 skills
-            jobs = JobPosting.query.filter(
-                JobPosting.description.ilike(f'%{skill.strip()}%') |
-                JobPosting.requirements.ilike(f'%{skill.strip()}%')
-            ).filter_by(status='active').limit(3).all()
-            recommended_jobs.extend(jobs)
-    
-    # Remove duplicates
-    recommended_jobs = list(set(recommended_jobs))[:5]
-    
-    # Get application timeline
-    applications_timeline = Application.query.filter_by(candidate_id=user_id)\
-        .join(JobPosting)\
-        .order_by(Application.applied_at.desc())\
-        .limit(10)\
-        .all()
-    
-    return render_template('candidate_dashboard.html',
-                         user_name=session['user_name'],
-                         total_applications=total_applications,
-                         pending_applications=pending_applications,
-                         shortlisted_applications=shortlisted_applications,
-                         rejected_applications=rejected_applications,
-                         recent_apps=recent_apps,
-                         recommended_jobs=recommended_jobs,
-                         applications_timeline=applications_timeline)
 
 @candidate_bp.route('/applications')
 def applications():
@@ -376,24 +107,23 @@ def applications():
     sort_by = request.args.get('sort', 'newest')
     
     # Base query
-    query = Application.query.filter_by(candidate_id=user_id).join(JobPosting)
+    query = _own_applications(user_id)
     
     # Apply filters
     if status_filter != 'all':
         query = query.filter(Application.status == status_filter)
     
-    # Apply sorting
+    applications = shards.gather(query.all)
+    
+    # Apply sorting (after gathering, applications may come from several shards)
     if sort_by == 'newest':
-        query = query.order_by(Application.applied_at.desc())
+        applications.sort(key=lambda app: app.applied_at, reverse=True)
     elif sort_by == 'oldest':
-        query = query.order_by(Application.applied_at.asc())
+        applications.sort(key=lambda app: app.applied_at)
     elif sort_by == 'match':
-        # Assuming match_score column exists, otherwise adjust
-        query = query.order_by(Application.match_score.desc())
+        applications.sort(key=lambda app: app.match_score or 0, reverse=True)
     elif sort_by == 'status':
-        query = query.order_by(Application.status)
-    
-    applications = query.all()
+        applications.sort(key=lambda app: app.status)
     
     return render_template('candidate_applications.html',
                          applications=applications,
@@ -411,7 +141,8 @@ def job_search():
     job_type_filter = request.args.get('job_type', 'all')
     
     # Base query for active jobs
-    query = JobPosting.query.filter_by(status='active')
+    query = JobPosting.query
+    active = JobPosting.status == 'active'
     
     # Apply filters
     if search_query:
@@ -421,28 +152,85 @@ def job_search():
             JobPosting.description.ilike(f'%{search_query}%')
         )
     
-    if location_filter:
-        query = query.filter(JobPosting.location.ilike(f'%{location_filter}%'))
+    # Known places match by distance (Bangalore finds Bengaluru), anything
+    # else by substring
+    area = None
+    place = geo.lookup(location_filter)
+    if place:
+        radius_km = request.args.get('radius_km', type=float) or geo.DEFAULT_RADIUS_KM
+        area = geo.Area(place, min(max(radius_km, 1), geo.MAX_RADIUS_KM))
+        query = query.filter(area.filter(JobPosting.geohash, active))
+    else:
+        query = query.filter(active)
+        if location_filter:
+            query = query.filter(JobPosting.location.ilike(f'%{location_filter}%'))
     
     if experience_filter != 'all':
-        query = query.filter(JobPosting.experience.ilike(f'%{experience_filter}%'))
+        query = query.filter(JobPosting.experience_level == experience_filter)
     
     if job_type_filter != 'all':
         query = query.filter(JobPosting.job_type == job_type_filter)
     
-    # Get jobs
-    jobs = query.order_by(JobPosting.created_at.desc()).all()
-    
-    # Check which jobs are already applied
-    user_id = session['user_id']
-    applied_job_ids = [app.job_id for app in 
-                      Application.query.filter_by(candidate_id=user_id).all()]
+    # One page of jobs from every shard, newest first
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = JOB_SEARCH_PER_PAGE
+    if area is None:
+        total = sum(shards.scatter(query.count))
+        # Each shard returns its first `page` pages; the merged order decides the page
+        jobs = shards.gather(query.order_by(JobPosting.created_at.desc(), JobPosting.id.desc())
+                             .limit(page * per_page)
+                             .all)
+        jobs.sort(key=lambda job: (job.created_at, job.id), reverse=True)
+        jobs = jobs[(page - 1) * per_page:page * per_page]
+    else:
+        # The exact distance check needs coordinates: filter light rows, then
+        # load only the page's jobs
+        rows = shards.gather(query.with_entities(JobPosting.id, JobPosting.created_at,
+                                                 JobPosting.latitude, JobPosting.longitude).all)
+        rows = [row for row in rows if area.contains(row.latitude, row.longitude)]
+        total = len(rows)
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+        page_ids = [row.id for row in rows[(page - 1) * per_page:page * per_page]]
+        jobs = shards.gather(JobPosting.query.filter(JobPosting.id.in_(page_ids)).all) if page_ids else []
+        jobs.sort(key=lambda job: (job.created_at, job.id), reverse=True)
+    
+    # Which of this page's jobs were applied to or saved, as sets
+    applied_job_ids, saved_job_ids = _job_membership(session['user_id'], [job.id for job in jobs])
     
     return render_template('candidate_job_search.html',
                          jobs=jobs,
+                         total=total,
+                         page=page,
+                         pages=(total + per_page - 1) // per_page,
                          applied_job_ids=applied_job_ids,
+                         saved_job_ids=saved_job_ids,
                          user_name=session['user_name'])
 
+def _job_membership(user_id, job_ids):
+    """(applied, saved) sets of the ids in `job_ids` for one candidate.
+
+    Only the listed jobs are looked up, through the (candidate_id, job_id)
+    indexes, so the cost follows the page size rather than the history.
+    """
+    applied, saved = set(), set()
+    if not job_ids:
+        return applied, saved
+    
+    def rows():
+        query = db.session.query(literal('applied'), Application.job_id)\
+            .filter(Application.candidate_id == user_id, Application.job_id.in_(job_ids))
+        if shards.current() == shards.DEFAULT_SHARD:
+            # saved_job is in the core database: one UNION ALL, not a second query
+            query = query.union_all(
+                db.session.query(literal('saved'), SavedJob.job_id)
+                .filter(SavedJob.candidate_id == user_id, SavedJob.job_id.in_(job_ids))
+            )
+        return query.all()
+    
+    for kind, job_id in shards.gather(rows):
+        (applied if kind == 'applied' else saved).add(job_id)
+    return applied, saved
+
 @candidate_bp.route('/profile')
 def profile():
     if 'user_id' not in session or session.get('user_type') != 'jobseeker':
@@ -482,6 +270,7 @@ def update_profile():
                 candidate.resume_url = resume_path
         
         db.session.commit()
+        candidate_index.update_candidate(candidate.id, candidate.skills)
         flash('Profile updated successfully!', 'success')
     
     return redirect(url_for('candidate.profile'))
@@ -493,6 +282,11 @@ def apply_job(job_id):
     
     user_id = session['user_id']
     
+    # The application lives in the job's shard
+    with shards.using(shards.shard_for_job(job_id)):
+        return _apply(user_id, job_id)
+
+def _apply(user_id, job_id):
     # Check if already applied
     existing_application = Application.query.filter_by(
         candidate_id=user_id,
@@ -510,12 +304,8 @@ def apply_job(job_id):
         match_score = 70  # Base score
         
         if candidate and job:
-            if candidate.skills:
-                skills = [s.strip().lower() for s in candidate.skills.split(',')]
-                job_text = (job.description + ' ' + job.requirements).lower()
-                matched_skills = sum(1 for skill in skills if skill in job_text)
-                if skills:
-                    match_score += min(30, (matched_skills / len(skills)) * 30)
+            # Whole-word skill matches against the job's cached word index
+            match_score = skill_matcher.match_score(candidate.skills, job)
         
         new_application = Application(
             candidate_id=user_id,
@@ -525,8 +315,24 @@ def apply_job(job_id):
         )
         
         db.session.add(new_application)
+        if job:
+            rollups.record_status(job.hr_id, job_id, 'pending')
         db.session.commit()
         
+        if job:
+            candidate_index.add_applicant(job.hr_id, user_id)
+            events.record('application.created', job.hr_id, candidate_id=user_id,
+                          job_id=job.id, application_id=new_application.id,
+                          job_title=job.title, company=job.company,
+                          candidate_name=candidate.name if candidate else session['user_name'])
+        
+        if job and candidate:
+            live_feed.publish_activity(job.hr_id,
+                                       f'New application from {candidate.name}',
+                                       f'Applied for {job.title}',
+                                       event='application', job_id=job.id,
+                                       application_id=new_application.id)
+        
         flash(f'Application submitted successfully! Match Score: {match_score}%', 'success')
     
     return redirect(url_for('candidate.job_search'))
@@ -561,6 +367,22 @@ def resume_analysis():
                          user_name=session['user_name'])
 
 # API Routes for candidate dashboard
+@candidate_bp.route('/api/timeline')
+def timeline_api():
+    if 'user_id' not in session or session.get('user_type') != 'jobseeker':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    timeline = events.candidate_timeline(session['user_id'], limit=limit,
+                                         before_id=request.args.get('before_id', type=int))
+    return jsonify({
+        'events': [dict(json.loads(event.data or '{}'), id=event.id, kind=event.kind,
+                        job_id=event.job_id, application_id=event.application_id,
+                        created_at=event.created_at.isoformat())
+                   for event in timeline],
+        'next_before_id': timeline[-1].id if len(timeline) == limit else None
+    })
+
 @candidate_bp.route('/api/applications/stats')
 def application_stats():
     if 'user_id' not in session or session.get('user_type') != 'jobseeker':
@@ -568,16 +390,26 @@ def application_stats():
     
     user_id = session['user_id']
     
+    counts = _status_counts(user_id)
     stats = {
-        'total': Application.query.filter_by(candidate_id=user_id).count(),
-        'pending': Application.query.filter_by(candidate_id=user_id, status='pending').count(),
-        'shortlisted': Application.query.filter_by(candidate_id=user_id, status='shortlisted').count(),
-        'rejected': Application.query.filter_by(candidate_id=user_id, status='rejected').count(),
-        'hired': Application.query.filter_by(candidate_id=user_id, status='hired').count()
+        'total': sum(counts.values()),
+        'pending': counts.get('pending', 0),
+        'shortlisted': counts.get('shortlisted', 0),
+        'rejected': counts.get('rejected', 0),
+        'hired': counts.get('hired', 0)
     }
     
     return jsonify(stats)
 
+RECOMMENDED_JOB_COLUMNS = {
+    'id': JobPosting.id,
+    'title': JobPosting.title,
+    'company': JobPosting.company,
+    'location': JobPosting.location,
+    'type': JobPosting.job_type,
+    'posted_date': JobPosting.created_at
+}
+
 @candidate_bp.route('/api/recommended-jobs')
 def recommended_jobs_api():
     if 'user_id' not in session or session.get('user_type') != 'jobseeker':
@@ -586,21 +418,33 @@ def recommended_jobs_api():
     user_id = session['user_id']
     candidate = CandidateModel.query.filter_by(id=user_id).first()
     
-    # Get recommended jobs (simplified)
-    jobs = JobPosting.query.filter_by(status='active')\
-        .order_by(JobPosting.created_at.desc())\
-        .limit(10)\
-        .all()
-    
-    jobs_data = []
-    for job in jobs:
-        jobs_data.append({
-            'id': job.id,
-            'title': job.title,
-            'company': job.company,
-            'location': job.location,
-            'type': job.job_type,
-            'posted_date': job.created_at.strftime('%b %d, %Y')
-        })
-    
-    return jsonify({'jobs': jobs_data})
\ No newline at end of file
+    try:
+        fields = projection.parse_fields(request.args.get('fields'),
+                                         RECOMMENDED_JOB_COLUMNS, RECOMMENDED_JOB_COLUMNS)
+    except FieldError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Get recommended jobs (simplified): newest 10 across shards, then project
+    newest = shards.gather(lambda: [(created_at, job_id, shards.current()) for created_at, job_id in
+                                    db.session.query(JobPosting.created_at, JobPosting.id)
+                                    .filter_by(status='active')
+                                    .order_by(JobPosting.created_at.desc())
+                                    .limit(10)])
+    newest = sorted(newest, key=lambda row: (row[0], row[1]), reverse=True)[:10]
+    selected = fields if 'id' in fields else ['id'] + fields
+    by_id = {}
+    for shard in dict.fromkeys(row[2] for row in newest):
+        with shards.using(shard):
+            query = JobPosting.query.filter(JobPosting.id.in_([job_id for _, job_id, row_shard in newest
+                                                               if row_shard == shard]))
+            for job in projection.select(query, selected, RECOMMENDED_JOB_COLUMNS):
+                by_id[job['id']] = job
+    jobs_data = [by_id[job_id] for _, job_id, _ in newest if job_id in by_id]
+    if 'id' not in fields:
+        for job in jobs_data:
+            del job['id']
+    # Without `fields` the response keeps its original display date
+    if not request.args.get('fields'):
+        projection.format_times(jobs_data, {'posted_date': '%b %d, %Y'})
+    
+    return projection.json_response({'jobs': jobs_data})
@@ -0,0 +1,424 @@
+# candidate_index.py - boolean skill search over candidates with bitset postings
+#
+# Each skill maps to the set of candidate ids that list it, stored as a
+# chunked bitmap: one uncompressed 4096-bit Python int per chunk of ids,
+# with empty chunks left out, so sparse skills stay small and AND/OR/NOT
+# run as big-int operations over at most a few hundred chunks even at 1M
+# candidates.
+# Queries such as `python AND (django OR flask) AND NOT php` are parsed
+# into a tree and evaluated against the HR user's applicant bitmap.
+# Results are ranked by how many of the query's positive skills a
+# candidate has, using bit-sliced counters so ranking is also bitmap work.
+#
+# The index lives in process memory: it is built lazily from the database,
+# kept current by the write paths in this process, and reloaded after
+# MAX_AGE so other worker processes' writes are picked up. Reloads run in
+# a background thread and are swapped in when complete, replaying the
+# changes made meanwhile; searches keep using the previous generation.
+import re
+import threading
+import time
+from flask import current_app
+from models import db, Candidate, Application, JobPosting
+from skill_matcher import normalize_skills
+import shards
+
+CHUNK_BITS = 12
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_SIZE - 1
+
+MAX_AGE = 300  # seconds before a background reload
+
+
+class Bitmap:
+    """Set of non-negative ints stored as {chunk index: int bitset}."""
+
+    __slots__ = ('chunks',)
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks or {}
+
+    @classmethod
+    def from_ids(cls, ids):
+        bitmap = cls()
+        for value in ids:
+            bitmap.add(value)
+        return bitmap
+
+    def add(self, value):
+        key = value >> CHUNK_BITS
+        self.chunks[key] = self.chunks.get(key, 0) | (1 << (value & CHUNK_MASK))
+
+    def discard(self, value):
+        key = value >> CHUNK_BITS
+        bits = self.chunks.get(key, 0) & ~(1 << (value & CHUNK_MASK))
+        if bits:
+            self.chunks[key] = bits
+        else:
+            self.chunks.pop(key, None)
+
+    def __contains__(self, value):
+        return bool(self.chunks.get(value >> CHUNK_BITS, 0) >> (value & CHUNK_MASK) & 1)
+
+    def __and__(self, other):
+        small, large = (self, other) if len(self.chunks) <= len(other.chunks) else (other, self)
+        chunks = {}
+        for key, bits in small.chunks.items():
+            both = bits & large.chunks.get(key, 0)
+            if both:
+                chunks[key] = both
+        return Bitmap(chunks)
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for key, bits in other.chunks.items():
+            chunks[key] = chunks.get(key, 0) | bits
+        return Bitmap(chunks)
+
+    def __xor__(self, other):
+        chunks = dict(self.chunks)
+        for key, bits in other.chunks.items():
+            value = chunks.get(key, 0) ^ bits
+            if value:
+                chunks[key] = value
+            else:
+                chunks.pop(key, None)
+        return Bitmap(chunks)
+
+    def __sub__(self, other):
+        chunks = {}
+        for key, bits in self.chunks.items():
+            rest = bits & ~other.chunks.get(key, 0)
+            if rest:
+                chunks[key] = rest
+        return Bitmap(chunks)
+
+    def __bool__(self):
+        return bool(self.chunks)
+
+    def __len__(self):
+        return sum(bits.bit_count() for bits in self.chunks.values())
+
+    def iter_desc(self):
+        """Yield members from largest to smallest."""
+        for key in sorted(self.chunks, reverse=True):
+            bits = self.chunks[key]
+            base = key << CHUNK_BITS
+            while bits:
+                top = bits.bit_length() - 1
+                yield base + top
+                bits ^= 1 << top
+
+
+EMPTY = Bitmap()
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# ---------------------- Query parsing ----------------------
+class QueryError(ValueError):
+    pass
+
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+_OPERATORS = {'AND', 'OR', 'NOT'}
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    bare_term = False  # whether the last token is an unquoted skill
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise QueryError(f'Unexpected character at position {position}')
+        position = match.end()
+        lparen, rparen, quoted, word = match.groups()
+        if lparen or rparen:
+            tokens.append((lparen or rparen, None))
+        elif quoted is not None:
+            tokens.append(('TERM', quoted))
+        elif word.upper() in _OPERATORS:
+            tokens.append((word.upper(), None))
+        elif bare_term:
+            # Adjacent bare words form one multi-word skill: machine learning
+            tokens[-1] = ('TERM', f'{tokens[-1][1]} {word}')
+        else:
+            tokens.append(('TERM', word))
+        bare_term = word is not None and word.upper() not in _OPERATORS
+    return tokens
+
+
+def parse_query(text):
+    """Parse into a tree of ('term', skill) / ('not', x) / ('and'|'or', a, b).
+
+    Precedence is NOT > AND > OR; multi-word skills may be quoted or written
+    as adjacent words.
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        raise QueryError('Empty query')
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def take(kind):
+        nonlocal position
+        if peek() != kind:
+            raise QueryError(f'Expected {kind}' if kind != 'TERM' else 'Expected a skill')
+        position += 1
+        return tokens[position - 1][1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            take('OR')
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() == 'AND':
+            take('AND')
+            node = ('and', node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == 'NOT':
+            take('NOT')
+            return ('not', parse_not())
+        if peek() == '(':
+            take('(')
+            node = parse_or()
+            take(')')
+            return node
+        skills = normalize_skills(take('TERM'))
+        if not skills:
+            raise QueryError('Empty skill')
+        return ('term', skills[0])
+
+    tree = parse_or()
+    if position != len(tokens):
+        raise QueryError('Expected AND, OR or end of query')
+    return tree
+
+
+def positive_terms(node, negated=False):
+    """Skills a match is rewarded for (terms not under a NOT)."""
+    kind = node[0]
+    if kind == 'term':
+        return [] if negated else [node[1]]
+    if kind == 'not':
+        return positive_terms(node[1], not negated)
+    return positive_terms(node[1], negated) + positive_terms(node[2], negated)
+
+
+# ---------------------- Index ----------------------
+class _Postings:
+    """One generation of the index: skill postings and applicant scopes."""
+
+    def __init__(self):
+        self.postings = {}
+        self.candidate_skills = {}
+        self.hr_applicants = {}
+
+    @classmethod
+    def load(cls):
+        state = cls()
+        rows = db.session.query(Candidate.id, Candidate.skills)\
+            .filter(Candidate.skills.isnot(None))\
+            .yield_per(5000)
+        for candidate_id, skills_text in rows:
+            state.update_candidate(candidate_id, skills_text)
+
+        def add_pairs():
+            pairs = db.session.query(JobPosting.hr_id, Application.candidate_id)\
+                .join(JobPosting, Application.job_id == JobPosting.id)\
+                .distinct()\
+                .yield_per(5000)
+            for hr_id, candidate_id in pairs:
+                state.add_applicant(hr_id, candidate_id)
+
+        shards.scatter(add_pairs)
+        return state
+
+    # Every change is idempotent, so replaying one the load already saw is harmless
+    def update_candidate(self, candidate_id, skills_text):
+        for skill in self.candidate_skills.pop(candidate_id, []):
+            posting = self.postings.get(skill)
+            if posting is not None:
+                posting.discard(candidate_id)
+        skills = normalize_skills(skills_text)
+        if skills:
+            self.candidate_skills[candidate_id] = skills
+        for skill in skills:
+            self.postings.setdefault(skill, Bitmap()).add(candidate_id)
+
+    def remove_candidate(self, candidate_id):
+        self.update_candidate(candidate_id, None)
+        for applicants in self.hr_applicants.values():
+            applicants.discard(candidate_id)
+
+    def add_applicant(self, hr_id, candidate_id):
+        self.hr_applicants.setdefault(hr_id, Bitmap()).add(candidate_id)
+
+    def remove_applicants(self, hr_id, candidate_ids):
+        applicants = self.hr_applicants.get(hr_id)
+        if applicants is not None:
+            for candidate_id in candidate_ids:
+                applicants.discard(candidate_id)
+
+
+class CandidateIndex:
+    def __init__(self, max_age=MAX_AGE):
+        self._lock = threading.Lock()  # guards `state` and `_changes`
+        self._build_lock = threading.Lock()  # one load at a time
+        self._changes = None  # changes made while a load runs, replayed onto it
+        self._refreshing = False
+        self.max_age = max_age
+        self.built_at = None
+        self.state = _Postings()
+
+    def _rebuild(self, if_missing=False):
+        """Load a new generation without blocking searches, then swap it in."""
+        with self._build_lock:
+            if if_missing and self.built_at is not None:
+                return
+            with self._lock:
+                self._changes = []
+            try:
+                state = _Postings.load()
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+            with self._lock:
+                # Writes made during the load may or may not be in it
+                for name, args in self._changes:
+                    getattr(state, name)(*args)
+                self._changes = None
+                self.state = state
+                self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Build on first use; later, refresh in the background once MAX_AGE has passed."""
+        if self.built_at is None:
+            self._rebuild(if_missing=True)
+            return
+        if time.monotonic() - self.built_at <= self.max_age:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    self._rebuild()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name='candidate-index-refresh', daemon=True).start()
+
+    def invalidate(self):
+        """Refresh on the next search; searches meanwhile use the current generation."""
+        with self._lock:
+            if self.built_at is not None:
+                self.built_at = time.monotonic() - self.max_age - 1
+
+    # Incremental maintenance from write paths; a no-op until first build
+    def _apply(self, name, *args):
+        with self._lock:
+            if self.built_at is None and self._changes is None:
+                return
+            getattr(self.state, name)(*args)
+            if self._changes is not None:
+                self._changes.append((name, args))
+
+    def update_candidate(self, candidate_id, skills_text):
+        self._apply('update_candidate', candidate_id, skills_text)
+
+    def remove_candidate(self, candidate_id):
+        self._apply('remove_candidate', candidate_id)
+
+    def add_applicant(self, hr_id, candidate_id):
+        self._apply('add_applicant', hr_id, candidate_id)
+
+    def remove_applications(self, hr_id, candidate_ids):
+        """Update `hr_id`'s applicant scope after some of their applications were deleted.
+
+        Call after the delete commits, with the routing of the HR user's
+        shard; candidates who still have another application stay.
+        """
+        candidate_ids = set(candidate_ids)
+        if not candidate_ids or self.built_at is None:
+            return
+        remaining = set()
+        for chunk in _chunks(sorted(candidate_ids), 500):
+            remaining.update(candidate_id for (candidate_id,) in db.session.query(Application.candidate_id)
+                             .join(JobPosting, Application.job_id == JobPosting.id)
+                             .filter(JobPosting.hr_id == hr_id, Application.candidate_id.in_(chunk))
+                             .distinct())
+        self._apply('remove_applicants', hr_id, candidate_ids - remaining)
+
+    def _evaluate(self, state, node, universe):
+        kind = node[0]
+        if kind == 'term':
+            return state.postings.get(node[1], EMPTY) & universe
+        if kind == 'not':
+            return universe - self._evaluate(state, node[1], universe)
+        left = self._evaluate(state, node[1], universe)
+        if kind == 'and':
+            return left & self._evaluate(state, node[2], universe) if left else Bitmap()
+        return left | self._evaluate(state, node[2], universe)
+
+    def search(self, hr_id, tree, page=1, per_page=20):
+        """Return (total, [(candidate_id, score)]) for one page of matches."""
+        self.ensure_fresh()
+        with self._lock:
+            state = self.state
+            universe = state.hr_applicants.get(hr_id, EMPTY)
+            result = self._evaluate(state, tree, universe)
+            total = len(result)
+
+            # Bit-sliced counters: slice i holds bit i of each candidate's score
+            slices = []
+            for skill in dict.fromkeys(positive_terms(tree)):
+                carry = state.postings.get(skill, EMPTY) & result
+                for index, current in enumerate(slices):
+                    if not carry:
+                        break
+                    slices[index], carry = current ^ carry, current & carry
+                if carry:
+                    slices.append(carry)
+
+            hits = []
+            skip = (page - 1) * per_page
+            for score in range((1 << len(slices)) - 1, -1, -1):
+                level = result
+                for index, current in enumerate(slices):
+                    level = level & current if score >> index & 1 else level - current
+                    if not level:
+                        break
+                size = len(level) if level else 0
+                if skip >= size:
+                    skip -= size
+                    continue
+                for candidate_id in level.iter_desc():
+                    if skip:
+                        skip -= 1
+                        continue
+                    hits.append((candidate_id, score))
+                    if len(hits) == per_page:
+                        return total, hits
+            return total, hits
+
+
+index = CandidateIndex()
@@ -0,0 +1,195 @@
+# events.py - append-only event log of job and application changes
+#
+# Write paths call record() after their commit; events collect in an
+# in-process buffer and are written with one multi-row INSERT when the
+# buffer reaches FLUSH_SIZE (checked after every request) or its oldest
+# event is FLUSH_INTERVAL old (checked by a background thread, so an idle
+# process does not hold events back from other processes' timelines), and
+# before any timeline read in this process. Events are never updated, so status history survives status
+# overwrites. Timelines read newest-first through the (hr_id, id) and
+# (candidate_id, id) indexes. compact() thins out old history.
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import func
+from models import db, Event, Application, JobPosting, Candidate
+import shards
+
+FLUSH_SIZE = 100
+FLUSH_INTERVAL = 2.0  # seconds
+COMPACT_AFTER = timedelta(days=90)
+
+_lock = threading.Lock()
+_buffer = []
+_oldest = None
+_flusher = None
+
+
+def record(kind, hr_id, candidate_id=None, job_id=None, application_id=None, at=None, **data):
+    """Buffer one event; it is written on the next flush."""
+    global _oldest
+    row = {
+        'kind': kind,
+        'hr_id': hr_id,
+        'candidate_id': candidate_id,
+        'job_id': job_id,
+        'application_id': application_id,
+        'data': json.dumps(data),
+        'created_at': at or datetime.utcnow(),
+    }
+    with _lock:
+        if not _buffer:
+            _oldest = time.monotonic()
+        _buffer.append(row)
+    if _flusher is None or not _flusher.is_alive():
+        _start_flusher()
+
+
+def _start_flusher():
+    """Start the thread that writes events once they are FLUSH_INTERVAL old."""
+    global _flusher
+    if not has_app_context():
+        return
+    app = current_app._get_current_object()
+
+    def flush_loop():
+        while True:
+            time.sleep(FLUSH_INTERVAL / 2)
+            with app.app_context():
+                try:
+                    flush_if_due()
+                except Exception:
+                    app.logger.exception('Writing buffered events failed; retrying')
+
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=flush_loop, name='events-flusher', daemon=True)
+        _flusher.start()
+
+
+def pending():
+    with _lock:
+        return len(_buffer)
+
+
+def flush():
+    """Write all buffered events in one INSERT and commit."""
+    global _oldest
+    with _lock:
+        rows = _buffer[:]
+        del _buffer[:]
+        _oldest = None
+    if not rows:
+        return 0
+    try:
+        db.session.execute(Event.__table__.insert(), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Put the events back in front so a later flush retries them
+        with _lock:
+            _buffer[:0] = rows
+            _oldest = time.monotonic()
+        raise
+    return len(rows)
+
+
+def flush_if_due():
+    with _lock:
+        due = bool(_buffer) and (len(_buffer) >= FLUSH_SIZE or
+                                 time.monotonic() - _oldest >= FLUSH_INTERVAL)
+    if due:
+        flush()
+
+
+def _timeline(column, owner_id, limit, before_id):
+    flush()
+    query = Event.query.filter(column == owner_id)
+    if before_id:
+        query = query.filter(Event.id < before_id)
+    return query.order_by(Event.id.desc()).limit(limit).all()
+
+
+def hr_timeline(hr_id, limit=20, before_id=None):
+    """Newest events of `hr_id`'s jobs; page with `before_id`."""
+    return _timeline(Event.hr_id, hr_id, limit, before_id)
+
+
+def candidate_timeline(candidate_id, limit=20, before_id=None):
+    """Newest events of `candidate_id`'s applications; page with `before_id`."""
+    return _timeline(Event.candidate_id, candidate_id, limit, before_id)
+
+
+def describe(event):
+    """Title and description of an event for activity feeds."""
+    data = json.loads(event.data or '{}')
+    job_title = data.get('job_title', 'a job')
+    if event.kind == 'application.created':
+        return f"New application from {data.get('candidate_name', 'a candidate')}", f'Applied for {job_title}'
+    if event.kind == 'application.status':
+        return (f"{data.get('candidate_name', 'Candidate')} {data.get('status')}",
+                f"{job_title}: {data.get('previous')} → {data.get('status')}")
+    if event.kind == 'job.created':
+        return 'Job posted', job_title
+    if event.kind == 'job.status':
+        return f"Job {data.get('status')}", f"{job_title} is now {data.get('status')}"
+    if event.kind == 'job.deleted':
+        return 'Job deleted', job_title
+    return event.kind, ''
+
+
+def backfill():
+    """Seed the log from existing applications when it is empty."""
+    if db.session.query(Event.id).first() is not None:
+        return 0
+
+    def record_shard():
+        rows = db.session.query(Application.id, Application.candidate_id, Application.job_id,
+                                Application.applied_at, JobPosting.hr_id, JobPosting.title,
+                                JobPosting.company, Candidate.name)\
+            .join(JobPosting, Application.job_id == JobPosting.id)\
+            .join(Candidate, Application.candidate_id == Candidate.id)\
+            .order_by(Application.applied_at, Application.id)\
+            .yield_per(1000)
+        count = 0
+        for row in rows:
+            record('application.created', row.hr_id, candidate_id=row.candidate_id,
+                   job_id=row.job_id, application_id=row.id, at=row.applied_at,
+                   job_title=row.title, company=row.company, candidate_name=row.name)
+            count += 1
+            if pending() >= FLUSH_SIZE * 10:
+                flush()
+        flush()
+        return count
+
+    return sum(shards.scatter(record_shard))
+
+
+def compact(now=None):
+    """Thin out history older than COMPACT_AFTER.
+
+    Old events of jobs deleted before the cutoff are dropped, and of each
+    application's old status changes only the latest is kept.
+    """
+    cutoff = (now or datetime.utcnow()) - COMPACT_AFTER
+    flush()
+    # The log's own 'job.deleted' entries identify deleted jobs, so this
+    # does not need to look at job rows (which may live in other shards)
+    deleted_jobs = db.session.query(Event.job_id)\
+        .filter(Event.kind == 'job.deleted', Event.created_at < cutoff)
+    removed = Event.query.filter(Event.created_at < cutoff,
+                                 Event.job_id.in_(deleted_jobs))\
+        .delete(synchronize_session=False)
+
+    latest = db.session.query(func.max(Event.id))\
+        .filter(Event.kind == 'application.status', Event.created_at < cutoff)\
+        .group_by(Event.application_id)
+    removed += Event.query.filter(Event.kind == 'application.status',
+                                  Event.created_at < cutoff,
+                                  Event.id.notin_(latest))\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return removed
@@ -0,0 +1,137 @@
+# exports.py - streaming CSV/JSONL exports of applications and candidates
+#
+# Rows are read with yield_per() so SQLAlchemy fetches them from the cursor
+# in batches of FETCH_SIZE, encoded as they arrive and emitted in chunks
+# of about CHUNK_BYTES, optionally through an incremental gzip compressor.
+# Memory use depends on the batch and chunk sizes, not on the row count.
+import csv
+import io
+import zlib
+from datetime import datetime
+from sqlalchemy import func
+from models import db, JobPosting, Candidate, Application
+import projection
+
+FETCH_SIZE = 1000
+CHUNK_BYTES = 64 * 1024
+FORMATS = ('csv', 'jsonl')
+
+APPLICATION_EXPORT_COLUMNS = {
+    'application_id': Application.id,
+    'job_id': Application.job_id,
+    'job_title': JobPosting.title,
+    'candidate_id': Application.candidate_id,
+    'candidate_name': Candidate.name,
+    'candidate_email': Candidate.email,
+    'candidate_phone': Candidate.phone,
+    'skills': Candidate.skills,
+    'experience': Candidate.experience,
+    'education': Candidate.education,
+    'status': Application.status,
+    'match_score': Application.match_score,
+    'applied_at': Application.applied_at,
+}
+
+CANDIDATE_EXPORT_COLUMNS = {
+    'candidate_id': Candidate.id,
+    'name': Candidate.name,
+    'email': Candidate.email,
+    'phone': Candidate.phone,
+    'skills': Candidate.skills,
+    'experience': Candidate.experience,
+    'education': Candidate.education,
+    'resume_url': Candidate.resume_url,
+}
+# Per-candidate aggregates over the HR user's applications
+CANDIDATE_EXPORT_STATS = ['applications', 'best_match_score', 'last_applied_at']
+
+
+def application_rows(hr_id, job_id=None):
+    """Stream (names, rows) of `hr_id`'s applications, optionally for one job."""
+    query = db.session.query(*APPLICATION_EXPORT_COLUMNS.values())\
+        .join(JobPosting, Application.job_id == JobPosting.id)\
+        .outerjoin(Candidate, Application.candidate_id == Candidate.id)\
+        .filter(JobPosting.hr_id == hr_id)
+    if job_id is not None:
+        query = query.filter(Application.job_id == job_id)
+    query = query.order_by(Application.id)\
+        .execution_options(stream_results=True)\
+        .yield_per(FETCH_SIZE)
+    return list(APPLICATION_EXPORT_COLUMNS), query
+
+
+def candidate_rows(hr_id):
+    """Stream (names, rows) of candidates who applied to `hr_id`'s jobs."""
+    stats = db.session.query(
+        Application.candidate_id.label('candidate_id'),
+        func.count(Application.id).label('applications'),
+        func.max(Application.match_score).label('best_match_score'),
+        func.max(Application.applied_at).label('last_applied_at')
+    ).join(JobPosting, Application.job_id == JobPosting.id)\
+        .filter(JobPosting.hr_id == hr_id)\
+        .group_by(Application.candidate_id)\
+        .subquery()
+    query = db.session.query(*CANDIDATE_EXPORT_COLUMNS.values(),
+                             *[stats.c[name] for name in CANDIDATE_EXPORT_STATS])\
+        .join(stats, stats.c.candidate_id == Candidate.id)\
+        .order_by(Candidate.id)\
+        .execution_options(stream_results=True)\
+        .yield_per(FETCH_SIZE)
+    return list(CANDIDATE_EXPORT_COLUMNS) + CANDIDATE_EXPORT_STATS, query
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    return value
+
+
+def _csv_chunks(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _jsonl_chunks(names, rows):
+    parts = []
+    size = 0
+    for row in rows:
+        line = projection.dumps(dict(zip(names, row))) + b'\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield b''.join(parts)
+            parts = []
+            size = 0
+    yield b''.join(parts)
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode(names, rows, fmt='csv', gzip=False):
+    """Yield the export as byte chunks in `fmt`, optionally gzip-compressed."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    chunks = _csv_chunks(names, rows) if fmt == 'csv' else _jsonl_chunks(names, rows)
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+    return (chunk for chunk in chunks if chunk)
+
+
+def download_name(prefix, fmt, gzip=False):
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    return f"{prefix}-{stamp}.{fmt}{'.gz' if gzip else ''}"
@@ -0,0 +1,118 @@
+# fragments.py - template bytecode cache and fragment caching
+#
+# Compiled templates are stored in instance/jinja_cache by Jinja's
+# FileSystemBytecodeCache, keyed by template name and source checksum, so a
+# fresh worker process loads bytecode instead of parsing and compiling every
+# page it renders (`flask templates-warm` fills the cache at deploy time).
+#
+# `{% cache 'job-row', job, count %}...{% endcache %}` keeps the rendered
+# block in a per-process LRU. The key is the fragment name plus a version
+# of every other part: model instances contribute their class, identity
+# and a digest of their column values, anything else is used as is. An
+# entity changed by any process therefore yields a new key on its next
+# render and the stale entry ages out, with no explicit invalidation.
+# Key parts must be hashable and must cover everything the block shows.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from sqlalchemy import inspect
+from sqlalchemy.exc import NoInspectionAvailable
+from sqlalchemy.orm import InstanceState
+
+MAX_FRAGMENTS = 5000
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered fragments."""
+
+    def __init__(self, max_entries=MAX_FRAGMENTS):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+cache = FragmentCache()
+
+
+def entity_version(value):
+    """Key part for `value`: (class, identity, column digest) for model instances."""
+    try:
+        state = inspect(value)
+    except NoInspectionAvailable:
+        return value
+    if not isinstance(state, InstanceState):
+        return value
+    columns = tuple(getattr(value, attr.key) for attr in state.mapper.column_attrs)
+    digest = hashlib.blake2b(repr(columns).encode(), digest_size=16).hexdigest()
+    return (state.mapper.class_.__name__, state.identity, digest)
+
+
+class FragmentCacheExtension(Extension):
+    """The {% cache name, part, ... %}...{% endcache %} tag."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(parts)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        key = tuple(entity_version(part) for part in parts)
+        html = cache.get(key)
+        if html is None:
+            html = caller()
+            cache.set(key, html)
+        return html
+
+
+def init_app(app):
+    """Enable the bytecode cache and the {% cache %} tag on app.jinja_env."""
+    cache_dir = app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    cache.max_entries = app.config.get('FRAGMENT_CACHE_SIZE', MAX_FRAGMENTS)
+
+
+def warm(app):
+    """Compile every template into the bytecode cache; returns the count."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
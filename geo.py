@@ -0,0 +1,163 @@
+# geo.py - offline gazetteer lookup and geohash radius search
+#
+# Free-text job locations are matched against gazetteer.csv (city name,
+# country, coordinates and alternative names such as Bangalore/Bengaluru)
+# when a job is saved; job_fields.extract() stores the coordinates and a
+# geohash on the job. A radius search turns the circle into the few
+# geohash cells that cover it, which are prefix ranges on the indexed
+# geohash column, and the caller refines the candidates by exact
+# haversine distance, so nothing outside those cells is read.
+import csv
+import math
+import os
+import re
+import unicodedata
+from sqlalchemy import and_, or_
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv')
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+DEFAULT_RADIUS_KM = 25  # a location search without a radius matches the metro area
+MAX_RADIUS_KM = 500
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_SPLIT = re.compile(r'\s*[,/;|()]\s*|\s+-\s+')
+
+_places = None
+
+
+class Place:
+    __slots__ = ('name', 'country', 'latitude', 'longitude')
+
+    def __init__(self, name, country, latitude, longitude):
+        self.name = name
+        self.country = country
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def __repr__(self):
+        return f'Place({self.name!r}, {self.country!r})'
+
+
+def _key(text):
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+def _load():
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            place = Place(row['name'], row['country'], float(row['latitude']), float(row['longitude']))
+            for alias in [row['name']] + (row['aliases'] or '').split('|'):
+                if alias.strip():
+                    places.setdefault(_key(alias), place)
+    return places
+
+
+def lookup(location):
+    """Gazetteer place for free text like "Bangalore, Karnataka", or None."""
+    global _places
+    if not location:
+        return None
+    if _places is None:
+        _places = _load()
+    key = _key(location)
+    if key in _places:
+        return _places[key]
+    # "Bengaluru, India", "Remote / London", "Pune - Hinjewadi": try each part
+    for part in _SPLIT.split(location):
+        place = _places.get(_key(part))
+        if place:
+            return place
+    return None
+
+
+# ---------------------- Geohash ----------------------
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True  # bits alternate longitude, latitude, starting with longitude
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = value << 1 | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells together contain the circle."""
+    # The finest precision whose cells are still at least radius_km on each
+    # side; then the center cell and its 8 neighbours cover the circle
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(candidate)
+        width_km = width * 111.32 * max(math.cos(math.radians(latitude)), 0.01)
+        if height * 110.57 >= radius_km and width_km >= radius_km:
+            precision = candidate
+            break
+    height, width = _cell_size(precision)
+    cells = set()
+    for dlat in (-height, 0, height):
+        for dlon in (-width, 0, width):
+            lat = min(max(latitude + dlat, -90.0), 90.0 - 1e-9)
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def cell_filter(column, cells, *conditions):
+    """SQL condition: `column` starts with one of `cells` (index range scans).
+
+    `conditions` (equality on the index columns before `column`) are
+    repeated inside each branch of the OR, so SQLite runs one index range
+    scan per cell instead of filtering a scan on those columns alone.
+    """
+    # '{' sorts right after 'z', the last geohash character
+    return or_(*[and_(*conditions, column >= cell, column < cell + '{') for cell in cells])
+
+
+class Area:
+    """Circle of `radius_km` around a gazetteer place, with its covering cells."""
+
+    def __init__(self, place, radius_km=DEFAULT_RADIUS_KM):
+        self.place = place
+        self.radius_km = radius_km
+        self.cells = covering_cells(place.latitude, place.longitude, radius_km)
+
+    def filter(self, column, *conditions):
+        return cell_filter(column, self.cells, *conditions)
+
+    def distance(self, latitude, longitude):
+        return distance_km(self.place.latitude, self.place.longitude, latitude, longitude)
+
+    def contains(self, latitude, longitude):
+        return latitude is not None and self.distance(latitude, longitude) <= self.radius_km
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
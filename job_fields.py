@@ -0,0 +1,148 @@
+# job_fields.py - structured salary/experience fields extracted on write
+#
+# JobPosting.salary_range and JobPosting.experience are free text. Before
+# every insert/update they are parsed into numeric, indexed columns
+# (salary_min/max/currency, experience_level/min/max years) so search can
+# filter with range predicates instead of string matching. The location is
+# resolved against the offline gazetteer into latitude/longitude/geohash
+# for radius search (geo.py).
+import re
+from sqlalchemy import event
+from models import db, JobPosting
+import geo
+
+EXPERIENCE_LEVELS = ('entry', 'mid', 'senior')
+
+_CURRENCY_SYMBOLS = [
+    ('₹', 'INR'), ('rs', 'INR'), ('inr', 'INR'), ('lpa', 'INR'), ('lakh', 'INR'), ('lac', 'INR'),
+    ('€', 'EUR'), ('eur', 'EUR'),
+    ('£', 'GBP'), ('gbp', 'GBP'),
+    ('$', 'USD'), ('usd', 'USD'),
+]
+
+# Number with an optional magnitude suffix, e.g. "80,000", "120k", "12 lpa", "1.5 cr"
+_AMOUNT = re.compile(
+    r'(\d[\d,]*(?:\.\d+)?)\s*(k|m|lpa|lakhs?|lacs?|l|cr|crores?)?\b',
+    re.IGNORECASE
+)
+_MULTIPLIERS = {
+    'k': 1000, 'm': 1000000, 'lpa': 100000, 'lakh': 100000, 'lakhs': 100000,
+    'lac': 100000, 'lacs': 100000, 'l': 100000, 'cr': 10000000, 'crore': 10000000,
+    'crores': 10000000
+}
+# Rates are normalised to yearly amounts
+_PERIODS = [
+    (re.compile(r'(/|per\s+)(hr|hour)\b|hourly', re.IGNORECASE), 2080),
+    (re.compile(r'(/|per\s+)(mo|month)\b|monthly', re.IGNORECASE), 12),
+]
+
+_YEARS_RANGE = re.compile(r'(\d+)\s*(?:-|–|to)\s*(\d+)\s*\+?\s*(?:years?|yrs?)', re.IGNORECASE)
+_YEARS_MIN = re.compile(r'(\d+)\s*\+?\s*(?:years?|yrs?)', re.IGNORECASE)
+_LEVEL_WORDS = [
+    ('senior', re.compile(r'\b(senior|sr\.?|lead|principal|staff|architect|head|manager)\b', re.IGNORECASE)),
+    ('entry', re.compile(r'\b(entry|junior|jr\.?|graduate|fresher|intern|trainee)\b', re.IGNORECASE)),
+    ('mid', re.compile(r'\b(mid|intermediate|associate)\b', re.IGNORECASE)),
+]
+
+
+def parse_salary(text):
+    """Return (min, max, currency) as yearly integers, or Nones."""
+    if not text:
+        return None, None, None
+
+    parsed = [(float(number.replace(',', '')), _MULTIPLIERS.get(suffix.lower(), 1))
+              for number, suffix in _AMOUNT.findall(text)]
+    if not parsed:
+        return None, None, None
+
+    # A suffix on the upper bound applies to a bare lower bound ("80-120k")
+    if len(parsed) >= 2 and parsed[0][1] == 1 and parsed[1][1] > 1 and parsed[0][0] < 1000:
+        parsed[0] = (parsed[0][0], parsed[1][1])
+    amounts = [value * multiplier for value, multiplier in parsed]
+
+    for pattern, factor in _PERIODS:
+        if pattern.search(text):
+            amounts = [value * factor for value in amounts]
+            break
+
+    lowered = text.lower()
+    currency = None
+    for symbol, code in _CURRENCY_SYMBOLS:
+        if symbol.isalpha():
+            if re.search(rf'\b{symbol}\b', lowered):
+                currency = code
+                break
+        elif symbol in lowered:
+            currency = code
+            break
+
+    low = int(amounts[0])
+    high = int(amounts[1]) if len(amounts) > 1 else low
+    return min(low, high), max(low, high), currency
+
+
+def parse_experience(text):
+    """Return (level, min_years, max_years) from free text, or Nones."""
+    if not text:
+        return None, None, None
+
+    min_years = max_years = None
+    match = _YEARS_RANGE.search(text)
+    if match:
+        min_years, max_years = sorted((int(match.group(1)), int(match.group(2))))
+    else:
+        match = _YEARS_MIN.search(text)
+        if match:
+            min_years = int(match.group(1))
+
+    level = None
+    for name, pattern in _LEVEL_WORDS:
+        if pattern.search(text):
+            level = name
+            break
+    if level is None and min_years is not None:
+        level = 'entry' if min_years < 2 else 'mid' if min_years < 5 else 'senior'
+
+    return level, min_years, max_years
+
+
+def extract(job):
+    """Fill the structured columns of `job` from its free-text fields."""
+    job.salary_min, job.salary_max, job.salary_currency = parse_salary(job.salary_range)
+
+    # Fall back to the title and requirements when no explicit experience is given
+    source = job.experience or ' '.join(filter(None, [job.title, job.requirements]))
+    job.experience_level, job.experience_min_years, job.experience_max_years = parse_experience(source)
+
+    place = geo.lookup(job.location)
+    if place:
+        job.latitude, job.longitude = place.latitude, place.longitude
+        job.geohash = geo.encode(place.latitude, place.longitude)
+    else:
+        job.latitude = job.longitude = job.geohash = None
+
+
+@event.listens_for(JobPosting, 'before_insert')
+@event.listens_for(JobPosting, 'before_update')
+def _extract_on_write(mapper, connection, job):
+    extract(job)
+
+
+def backfill(batch_size=500):
+    """Re-extract structured fields for every job, committing per batch."""
+    processed = 0
+    last_id = 0
+    while True:
+        jobs = JobPosting.query.filter(JobPosting.id > last_id)\
+            .order_by(JobPosting.id)\
+            .limit(batch_size)\
+            .all()
+        if not jobs:
+            break
+        for job in jobs:
+            extract(job)
+        # Only rows whose extracted values changed are written
+        db.session.commit()
+        processed += len(jobs)
+        last_id = jobs[-1].id
+    return processed
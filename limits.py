@@ -0,0 +1,195 @@
+# limits.py - per-user rate limiting and load shedding for expensive routes
+#
+# Endpoints are grouped into route classes (ROUTE_CLASSES). Each class has
+# a token bucket per user (or per client address when logged out) that
+# refills at `rate` tokens a second up to `burst`; a request spends one
+# token or is refused with 429 and a Retry-After of the time until the
+# next token. Buckets live in process memory by default; with the sqlite
+# backend they are rows in instance/ratelimit.db, updated by one atomic
+# UPSERT ... RETURNING, so the limits hold across worker processes.
+#
+# Independently, each class may run at most `concurrency` requests at a
+# time per process. Excess requests are shed with 503 immediately rather
+# than queueing behind slow ones, which keeps threads free for the
+# unlimited routes (HR dashboards). Every decision is counted for metrics().
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+ROUTE_CLASSES = {
+    'search': {
+        'endpoints': ['candidate.job_search', 'jobs_search_api'],
+        'rate': 2.0, 'burst': 20, 'concurrency': 8,
+    },
+    'recommend': {
+        'endpoints': ['candidate.recommended_jobs_api'],
+        'rate': 0.5, 'burst': 10, 'concurrency': 4,
+    },
+    'apply': {
+        'endpoints': ['candidate.apply_job'],
+        'rate': 0.1, 'burst': 5, 'concurrency': 4,
+    },
+}
+SHED_RETRY_AFTER = 1  # seconds suggested to clients refused by the shedder
+# Buckets idle this long are full again and are dropped, checked every
+# PURGE_INTERVAL; burst / rate of every class must stay below IDLE_SECONDS
+IDLE_SECONDS = 3600
+PURGE_INTERVAL = 300
+
+
+class Refused(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class MemoryBuckets:
+    """Token buckets in process memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated)
+        self._purged = time.time()
+
+    def take(self, key, rate, burst, now=None):
+        """Spend one token; returns 0 on success, else seconds until one is available."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now - self._purged >= PURGE_INTERVAL:
+                self._buckets = {name: bucket for name, bucket in self._buckets.items()
+                                 if now - bucket[1] < IDLE_SECONDS}
+                self._purged = now
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+class SQLiteBuckets:
+    """Token buckets shared by all processes through one SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._purged = time.time()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_bucket '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        params = {'key': key, 'rate': rate, 'burst': burst, 'now': now}
+        connection = self._connection()
+        if now - self._purged >= PURGE_INTERVAL:
+            self._purged = now
+            with connection:
+                connection.execute('DELETE FROM rate_bucket WHERE updated < ?', (now - IDLE_SECONDS,))
+        with connection:
+            # Refill and spend in one statement; no row comes back when the
+            # bucket holds less than one token
+            row = connection.execute(
+                'INSERT INTO rate_bucket (key, tokens, updated) VALUES (:key, :burst - 1, :now) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'tokens = min(:burst, tokens + (:now - updated) * :rate) - 1, updated = :now '
+                'WHERE min(:burst, tokens + (:now - updated) * :rate) >= 1 '
+                'RETURNING tokens', params).fetchone()
+            if row is not None:
+                return 0
+            tokens, updated = connection.execute(
+                'SELECT tokens, updated FROM rate_bucket WHERE key = :key', params).fetchone()
+        tokens = min(burst, tokens + (now - updated) * rate)
+        return max(0.0, (1 - tokens) / rate)
+
+
+class Limiter:
+    def __init__(self, buckets, route_classes=ROUTE_CLASSES):
+        self.buckets = buckets
+        self.route_classes = route_classes
+        self.classes_by_endpoint = {endpoint: name for name, spec in route_classes.items()
+                                    for endpoint in spec['endpoints']}
+        self._lock = threading.Lock()
+        self.in_flight = Counter()
+        self.decisions = Counter()  # (class, decision) -> count
+
+    def _count(self, route_class, decision):
+        with self._lock:
+            self.decisions[route_class, decision] += 1
+
+    def admit(self, endpoint, client):
+        """Admit one request; returns its route class (or None) or raises Refused."""
+        route_class = self.classes_by_endpoint.get(endpoint)
+        if route_class is None:
+            return None
+        spec = self.route_classes[route_class]
+        # Shed before spending a token, so refused requests cost the user nothing
+        with self._lock:
+            if self.in_flight[route_class] >= spec['concurrency']:
+                self.decisions[route_class, 'shed'] += 1
+                raise Refused(503, 'Server busy, try again shortly', SHED_RETRY_AFTER)
+            self.in_flight[route_class] += 1
+        try:
+            wait = self.buckets.take(f'{route_class}:{client}', spec['rate'], spec['burst'])
+        except Exception:
+            self.release(route_class)
+            raise
+        if wait:
+            self.release(route_class)
+            self._count(route_class, 'limited')
+            raise Refused(429, 'Too many requests', wait)
+        self._count(route_class, 'allowed')
+        return route_class
+
+    def release(self, route_class):
+        with self._lock:
+            self.in_flight[route_class] -= 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'backend': type(self.buckets).__name__,
+                'classes': {
+                    name: {
+                        'rate': spec['rate'],
+                        'burst': spec['burst'],
+                        'concurrency': spec['concurrency'],
+                        'in_flight': self.in_flight[name],
+                        'allowed': self.decisions[name, 'allowed'],
+                        'limited': self.decisions[name, 'limited'],
+                        'shed': self.decisions[name, 'shed'],
+                    }
+                    for name, spec in self.route_classes.items()
+                },
+            }
+
+
+def init_app(app):
+    """Create the limiter from RATE_LIMIT_BACKEND ('memory', 'sqlite' or 'off')."""
+    backend = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+    route_classes = app.config.get('RATE_LIMITS') or ROUTE_CLASSES
+    if backend == 'off':
+        buckets, route_classes = MemoryBuckets(), {}
+    elif backend == 'sqlite':
+        buckets = SQLiteBuckets(os.path.join(app.instance_path, 'ratelimit.db'))
+    elif backend == 'memory':
+        buckets = MemoryBuckets()
+    else:
+        raise ValueError(f'Unknown rate limit backend: {backend}')
+    app.extensions['limiter'] = Limiter(buckets, route_classes)
+    return app.extensions['limiter']
@@ -0,0 +1,90 @@
+# live_feed.py - in-process pub/sub feeding the HR dashboard activity stream
+#
+# Each open Server-Sent Events connection subscribes to its HR user's
+# channel and gets a bounded queue. Publishers never block: when a slow
+# subscriber's queue is full the oldest event is dropped.
+import json
+import queue
+import threading
+from datetime import datetime
+
+SUBSCRIBER_BUFFER = 100
+HEARTBEAT_SECONDS = 15
+
+
+class Broker:
+    def __init__(self, buffer_size=SUBSCRIBER_BUFFER):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._next_id = 0
+
+    def subscribe(self, channel):
+        q = queue.Queue(maxsize=self.buffer_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(q)
+        return q
+
+    def unsubscribe(self, channel, q):
+        with self._lock:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._channels.get(channel, ()))
+
+    def publish(self, channel, event, data):
+        with self._lock:
+            self._next_id += 1
+            message = (self._next_id, event, data)
+            subscribers = list(self._channels.get(channel, ()))
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(message)
+                    break
+                except queue.Full:
+                    # Drop the oldest event so a stalled client cannot grow memory
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+
+broker = Broker()
+
+
+def publish_activity(hr_id, title, description, event='activity', **extra):
+    """Push a dashboard activity to every open stream of `hr_id`."""
+    data = {
+        'title': title,
+        'description': description,
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    data.update(extra)
+    broker.publish(hr_id, event, data)
+
+
+def format_sse(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(channel, heartbeat=HEARTBEAT_SECONDS):
+    """Generator of SSE frames for `channel`, with comment heartbeats."""
+    q = broker.subscribe(channel)
+    try:
+        # Tell EventSource how long to wait before reconnecting
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event_id, event, data = q.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event_id, event, data)
+    finally:
+        broker.unsubscribe(channel, q)
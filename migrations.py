@@ -0,0 +1,29 @@
+# migrations.py - additive schema upgrades for existing databases
+#
+# db.create_all() only creates missing tables. When a model gains columns
+# or indexes, ensure_schema() adds them to tables that already exist, so
+# an old careersync.db keeps working without a migration framework.
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+
+
+def ensure_schema(db, *models, engine=None):
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for model in models:
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                )
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
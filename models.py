@@ -1,9 +1,37 @@
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_bcrypt import Bcrypt
 from datetime import datetime
 
+
+class RoutingSession(Session):
+    """Session that sends statements to the shard selected in `g.shard`.
+
+    See shards.py; without configured shards every statement uses the
+    default engine as before. Inside snapshot.reading() statements go to
+    the read-only snapshot of that shard instead, and inside
+    archive.reading() to the archive database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            shard = g.get('shard')
+            if g.get('archive'):
+                # Archived rows, inside archive.reading()
+                return current_app.extensions['archive']['engine']
+            if g.get('snapshot'):
+                # Reporting reads inside snapshot.reading()
+                return current_app.extensions['snapshot'].engine_for(shard)
+            if shard is not None:
+                engine = current_app.extensions['shards'].engines.get(shard)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
 # Initialize extensions (will be initialized with app in web.py)
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 
 
@@ -49,9 +77,28 @@ class JobPosting(db.Model):
     hr_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    experience = db.Column(db.String(100))
+
+    # Structured fields extracted from salary_range/experience on write (see job_fields.py)
+    salary_min = db.Column(db.Integer)
+    salary_max = db.Column(db.Integer)
+    salary_currency = db.Column(db.String(3))
+    experience_level = db.Column(db.String(10))
+    experience_min_years = db.Column(db.Integer)
+    experience_max_years = db.Column(db.Integer)
+    # Gazetteer coordinates of `location` (see geo.py)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))
 
     applications = db.relationship('Application', backref='job', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_job_posting_status_salary', 'status', 'salary_min', 'salary_max'),
+        db.Index('ix_job_posting_status_experience', 'status', 'experience_level', 'experience_min_years'),
+        db.Index('ix_job_posting_status_geohash', 'status', 'geohash'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -63,6 +110,13 @@ class JobPosting(db.Model):
             'requirements': self.requirements,
             'job_type': self.job_type,
             'status': self.status,
+            'experience': self.experience,
+            'salary_min': self.salary_min,
+            'salary_max': self.salary_max,
+            'salary_currency': self.salary_currency,
+            'experience_level': self.experience_level,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
         }
@@ -111,5 +165,115 @@ class Application(db.Model):
     status = db.Column(db.String(20), default='pending')
     applied_at = db.Column(db.DateTime, default=datetime.utcnow)
     match_score = db.Column(db.Integer, default=0)
+    # Statuses entered so far, as rollups.STAGE_BITS; 1 is 'pending'
+    stages_reached = db.Column(db.Integer, default=1)
 
     candidate = db.relationship('Candidate', backref='applications')
+
+    # Back top-N ranking per job: ORDER BY match_score DESC, id LIMIT n is an index scan
+    __table_args__ = (
+        db.Index('ix_application_job_score', 'job_id', db.desc('match_score'), 'id'),
+        db.Index('ix_application_job_status_score', 'job_id', 'status', db.desc('match_score'), 'id'),
+        # "Has this candidate applied to any of these jobs?" for a page of results
+        db.Index('ix_application_candidate_job', 'candidate_id', 'job_id'),
+    )
+
+
+class SavedJob(db.Model):
+    """A job bookmarked by a candidate; one row per (candidate, job)."""
+    __tablename__ = 'saved_job'
+    id = db.Column(db.Integer, primary_key=True)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id'), nullable=False)
+    job_id = db.Column(db.Integer, nullable=False)  # may live in any shard
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('candidate_id', 'job_id', name='uq_saved_job_candidate_job'),
+        db.Index('ix_saved_job_job', 'job_id'),
+    )
+
+
+class ApplicationRollup(db.Model):
+    """Pre-aggregated application counts per (hr, job, status) time bucket."""
+    __tablename__ = 'application_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    hr_id = db.Column(db.Integer, nullable=False)
+    granularity = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    job_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # Sum of seconds between applying and entering this status, for time-to-X stats
+    latency_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+    latency_samples = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('hr_id', 'granularity', 'bucket_start', 'job_id', 'status',
+                            name='uq_application_rollup_bucket'),
+        db.Index('ix_application_rollup_job', 'job_id'),
+    )
+
+
+class Task(db.Model):
+    """Background task row; recurring tasks keep one row that is rescheduled."""
+    __tablename__ = 'task'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    args = db.Column(db.Text)  # JSON object of keyword arguments
+    # Dedupe key: recurring tasks use their name, so there is one row each
+    key = db.Column(db.String(200), unique=True)
+    schedule = db.Column(db.String(100))  # cron expression, None for one-shot
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/failed
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    lease_owner = db.Column(db.String(100))
+    lease_expires = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Of the last run: seconds from due to start, and from start to finish
+    latency_seconds = db.Column(db.Float)
+    duration_seconds = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index('ix_task_due', 'status', 'run_at'),
+        db.Index('ix_task_lease', 'status', 'lease_expires'),
+    )
+
+
+class Event(db.Model):
+    """Append-only log of job and application changes."""
+    __tablename__ = 'event'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)  # e.g. 'application.created', 'job.status'
+    hr_id = db.Column(db.Integer, nullable=False)
+    candidate_id = db.Column(db.Integer)
+    job_id = db.Column(db.Integer)
+    application_id = db.Column(db.Integer)
+    data = db.Column(db.Text)  # JSON: titles, names and statuses at the time of the event
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Timelines read the newest events of one HR user or candidate
+    __table_args__ = (
+        db.Index('ix_event_hr_timeline', 'hr_id', 'id'),
+        db.Index('ix_event_candidate_timeline', 'candidate_id', 'id'),
+        db.Index('ix_event_application', 'application_id', 'id'),
+        db.Index('ix_event_created', 'created_at'),
+    )
+
+
+class ShardAssignment(db.Model):
+    """Shard holding an HR user's jobs and applications (default if absent)."""
+    __tablename__ = 'shard_assignment'
+    hr_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.String(50), nullable=False)
+    assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class JobShard(db.Model):
+    """Directory of jobs stored outside the default shard."""
+    __tablename__ = 'job_shard'
+    job_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.String(50), nullable=False)
@@ -0,0 +1,274 @@
+# profiler.py - on-demand sampling profiler for slow requests
+#
+# Disarmed, the only per-request cost is a clock read; the arming file is
+# re-read at most once per CHECK_INTERVAL. Arming (admin endpoint) writes
+# instance/profiler/arm.json, so every worker process picks it up, with an
+# optional endpoint filter, a latency threshold and an expiry time.
+#
+# While armed, each matching request registers its thread and a sampler
+# thread reads sys._current_frames() every `interval_ms`, recording the
+# stack of each profiled request. Requests that end at or above the
+# threshold are written to the profile directory as JSON; exports merge
+# them into collapsed stacks (flamegraph.pl / speedscope import) or a
+# speedscope file with one sampled profile per request.
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+CHECK_INTERVAL = 1.0  # seconds between arm-file checks per process
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_SECONDS = 300
+DEFAULT_MAX_PROFILES = 200
+MAX_STACK_DEPTH = 128
+
+_lock = threading.Lock()
+_directory = None
+_config = None
+_config_mtime = None
+_next_check = 0.0
+_active = {}  # thread ident -> _RequestProfile
+_sampler = None
+
+
+class _RequestProfile:
+    __slots__ = ('endpoint', 'method', 'path', 'started', 'started_at', 'samples')
+
+    def __init__(self, endpoint, method, path):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.samples = []  # [(seconds since start, stack root-first)]
+
+
+def init_app(app):
+    global _directory
+    _directory = os.path.join(app.instance_path, 'profiler')
+    os.makedirs(_directory, exist_ok=True)
+
+
+def _arm_path():
+    return os.path.join(_directory, 'arm.json')
+
+
+# ---------------------- Arming ----------------------
+def arm(endpoint=None, min_duration_ms=0, interval_ms=DEFAULT_INTERVAL_MS,
+        seconds=DEFAULT_SECONDS, max_profiles=DEFAULT_MAX_PROFILES):
+    """Start profiling requests to `endpoint` (all if None) slower than `min_duration_ms`."""
+    global _next_check
+    config = {
+        'endpoint': endpoint,
+        'min_duration_ms': min_duration_ms,
+        'interval_ms': interval_ms,
+        'max_profiles': max_profiles,
+        'armed_at': time.time(),
+        'expires_at': time.time() + seconds,
+    }
+    temporary = _arm_path() + f'.{os.getpid()}'
+    with open(temporary, 'w') as handle:
+        json.dump(config, handle)
+    os.replace(temporary, _arm_path())
+    _next_check = 0.0
+    return config
+
+
+def disarm():
+    global _next_check
+    try:
+        os.remove(_arm_path())
+    except FileNotFoundError:
+        pass
+    _next_check = 0.0
+
+
+def _load_config():
+    """Re-read the arm file if it changed; returns the active config or None."""
+    global _config, _config_mtime, _next_check
+    _next_check = time.monotonic() + CHECK_INTERVAL
+    try:
+        mtime = os.stat(_arm_path()).st_mtime_ns
+    except FileNotFoundError:
+        _config = _config_mtime = None
+        return None
+    if mtime != _config_mtime:
+        try:
+            with open(_arm_path()) as handle:
+                _config = json.load(handle)
+        except (OSError, ValueError):
+            _config = None
+        _config_mtime = mtime
+    if _config and _config['expires_at'] <= time.time():
+        disarm()
+        _config = _config_mtime = None
+    return _config
+
+
+def current_config():
+    return _load_config()
+
+
+# ---------------------- Request hooks ----------------------
+def start_request(endpoint, method, path):
+    config = _config
+    if time.monotonic() >= _next_check:
+        config = _load_config()
+    if config is None or (config['endpoint'] and config['endpoint'] != endpoint):
+        return
+    with _lock:
+        _active[threading.get_ident()] = _RequestProfile(endpoint, method, path)
+        _ensure_sampler(config['interval_ms'] / 1000.0)
+
+
+def end_request(status_code):
+    if not _active:
+        return
+    with _lock:
+        profile = _active.pop(threading.get_ident(), None)
+    if profile is None:
+        return
+    duration_ms = (time.perf_counter() - profile.started) * 1000
+    config = _config
+    if config and profile.samples and duration_ms >= config['min_duration_ms']:
+        _save(profile, duration_ms, status_code, config)
+
+
+def _ensure_sampler(interval):
+    global _sampler
+    if _sampler is None or not _sampler.is_alive():
+        _sampler = threading.Thread(target=_sample_loop, args=(interval,),
+                                    name='profiler-sampler', daemon=True)
+        _sampler.start()
+
+
+def _sample_loop(interval):
+    """Sample the profiled threads until none are left."""
+    global _sampler
+    while True:
+        time.sleep(interval)
+        with _lock:
+            if not _active:
+                _sampler = None
+                return
+            profiles = list(_active.items())
+        frames = sys._current_frames()
+        now = time.perf_counter()
+        for ident, profile in profiles:
+            frame = frames.get(ident)
+            if frame is not None:
+                profile.samples.append((now - profile.started, _stack(frame)))
+
+
+def _stack(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _save(profile, duration_ms, status_code, config):
+    names = [name for name in os.listdir(_directory) if name.endswith('.profile.json')]
+    if len(names) >= config['max_profiles']:
+        return
+    frames = {}
+    samples = []
+    for _, stack in profile.samples:
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+    record = {
+        'endpoint': profile.endpoint,
+        'method': profile.method,
+        'path': profile.path,
+        'status': status_code,
+        'started_at': profile.started_at.isoformat(timespec='milliseconds'),
+        'duration_ms': round(duration_ms, 3),
+        'interval_ms': config['interval_ms'],
+        'frames': list(frames),
+        'samples': samples,
+        'times': [round(offset * 1000, 3) for offset, _ in profile.samples],
+    }
+    name = f"{int(time.time() * 1000)}-{os.getpid()}-{threading.get_ident()}.profile.json"
+    with open(os.path.join(_directory, name), 'w') as handle:
+        json.dump(record, handle)
+
+
+# ---------------------- Captured profiles ----------------------
+def profiles(endpoint=None):
+    """Captured request profiles, oldest first, optionally for one endpoint."""
+    records = []
+    for name in sorted(os.listdir(_directory)):
+        if not name.endswith('.profile.json'):
+            continue
+        try:
+            with open(os.path.join(_directory, name)) as handle:
+                record = json.load(handle)
+        except (OSError, ValueError):
+            continue  # being written by another process
+        if endpoint is None or record['endpoint'] == endpoint:
+            record['id'] = name[:-len('.profile.json')]
+            records.append(record)
+    return records
+
+
+def summary(endpoint=None):
+    return [{key: record[key] for key in ('id', 'endpoint', 'method', 'path', 'status',
+                                           'started_at', 'duration_ms')}
+            | {'samples': len(record['samples'])}
+            for record in profiles(endpoint)]
+
+
+def clear():
+    removed = 0
+    for name in os.listdir(_directory):
+        if name.endswith('.profile.json'):
+            os.remove(os.path.join(_directory, name))
+            removed += 1
+    return removed
+
+
+def _frame_label(frame):
+    name, filename, line = frame
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapsed(records):
+    """Folded stacks, one `frame;frame;... count` line per distinct stack."""
+    counts = Counter()
+    for record in records:
+        labels = [_frame_label(frame) for frame in record['frames']]
+        for sample in record['samples']:
+            counts[';'.join(labels[index] for index in sample)] += 1
+    return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
+
+
+def speedscope(records):
+    """speedscope file with one sampled profile per captured request."""
+    frames = {}
+    documents = []
+    for record in records:
+        indexes = [frames.setdefault(tuple(frame), len(frames)) for frame in record['frames']]
+        times = record['times']
+        documents.append({
+            'type': 'sampled',
+            'name': f"{record['method']} {record['path']} ({record['duration_ms']:.0f} ms)",
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': record['duration_ms'],
+            'samples': [[indexes[index] for index in sample] for sample in record['samples']],
+            # Each sample stands for the time since the previous one
+            'weights': [round(end - start, 3) for start, end in zip([0] + times, times)],
+        })
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': [{'name': name, 'file': filename, 'line': line}
+                              for name, filename, line in frames]},
+        'profiles': documents,
+        'name': 'CareerSync request profiles',
+        'exporter': 'careersync-profiler',
+    }
@@ -0,0 +1,140 @@
+# projection.py - column-projected, fast JSON serialization for the API routes
+#
+# API routes accept `?fields=a,b,c`. Only the requested columns are put in
+# the SELECT list, so no ORM objects are hydrated, and rows are encoded
+# straight to JSON bytes. Dotted names (`candidate.name`) nest the value
+# under the prefix. Timestamps are emitted as ISO 8601; responses without
+# `fields` keep the display formats they had before (format_times()).
+import json
+from datetime import date, datetime
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
+from models import JobPosting, Candidate, Application
+
+
+JOB_COLUMNS = {
+    'id': JobPosting.id,
+    'title': JobPosting.title,
+    'company': JobPosting.company,
+    'location': JobPosting.location,
+    'salary_range': JobPosting.salary_range,
+    'description': JobPosting.description,
+    'requirements': JobPosting.requirements,
+    'job_type': JobPosting.job_type,
+    'status': JobPosting.status,
+    'experience': JobPosting.experience,
+    'salary_min': JobPosting.salary_min,
+    'salary_max': JobPosting.salary_max,
+    'salary_currency': JobPosting.salary_currency,
+    'experience_level': JobPosting.experience_level,
+    'experience_min_years': JobPosting.experience_min_years,
+    'experience_max_years': JobPosting.experience_max_years,
+    'latitude': JobPosting.latitude,
+    'longitude': JobPosting.longitude,
+    'created_at': JobPosting.created_at,
+    'updated_at': JobPosting.updated_at
+}
+
+CANDIDATE_COLUMNS = {
+    'id': Candidate.id,
+    'name': Candidate.name,
+    'email': Candidate.email,
+    'phone': Candidate.phone,
+    'skills': Candidate.skills,
+    'experience': Candidate.experience,
+    'education': Candidate.education,
+    'resume_url': Candidate.resume_url,
+    'created_at': Candidate.created_at
+}
+
+APPLICATION_COLUMNS = {
+    'id': Application.id,
+    'candidate_id': Application.candidate_id,
+    'job_id': Application.job_id,
+    'status': Application.status,
+    'applied_at': Application.applied_at,
+    'match_score': Application.match_score
+}
+
+# Application fields plus nested `candidate.*` fields
+APPLICATION_DETAIL_COLUMNS = dict(APPLICATION_COLUMNS)
+APPLICATION_DETAIL_COLUMNS.update({
+    f'candidate.{name}': column for name, column in CANDIDATE_COLUMNS.items()
+})
+APPLICATION_DETAIL_DEFAULT = ['id', 'candidate_id', 'job_id', 'status', 'applied_at'] + [
+    f'candidate.{name}' for name in ('id', 'name', 'email', 'phone', 'skills',
+                                     'experience', 'education', 'resume_url')
+]
+
+
+class FieldError(ValueError):
+    pass
+
+
+def parse_fields(raw, allowed, default):
+    """Validate a comma separated `fields` argument against `allowed`."""
+    if not raw:
+        return list(default)
+    fields = []
+    for name in raw.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in allowed:
+            raise FieldError(f'Unknown field: {name}')
+        if name not in fields:
+            fields.append(name)
+    return fields or list(default)
+
+
+def needs_join(fields, prefix):
+    return any(name.startswith(prefix + '.') for name in fields)
+
+
+def select(query, fields, columns):
+    """Run `query` selecting only the columns for `fields`; return dicts."""
+    rows = query.with_entities(*[columns[name] for name in fields]).all()
+    nested = [name.split('.', 1) if '.' in name else None for name in fields]
+    result = []
+    for row in rows:
+        item = {}
+        for name, parts, value in zip(fields, nested, row):
+            if parts:
+                item.setdefault(parts[0], {})[parts[1]] = value
+            else:
+                item[name] = value
+        result.append(item)
+    return result
+
+
+def format_times(rows, formats):
+    """Format the datetime fields of `rows` in place, {field: strftime format}."""
+    for row in rows:
+        for name, fmt in formats.items():
+            if row.get(name) is not None:
+                row[name] = row[name].strftime(fmt)
+    return rows
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """Encode `payload` to JSON bytes, ISO formatting datetimes."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_OMIT_MICROSECONDS)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
@@ -0,0 +1,242 @@
+# rollups.py - time-bucketed application counters for HR analytics
+#
+# Every application write bumps an hourly bucket keyed by
+# (hr_id, job_id, status). `compact()` folds hourly buckets older than
+# HOURLY_RETENTION into daily buckets, so each event lives in exactly one
+# bucket and range queries can simply sum both granularities.
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, and_
+from sqlalchemy.dialects.sqlite import insert
+from models import db, ApplicationRollup, Application, JobPosting
+
+HOURLY_RETENTION = timedelta(hours=48)
+
+# Order in which applications move through the hiring funnel
+FUNNEL_STAGES = ['pending', 'shortlisted', 'hired']
+# Application.stages_reached bits. An application is counted once per
+# status it enters, so moving it back and forth does not inflate the funnel
+STAGE_BITS = {'pending': 1, 'shortlisted': 2, 'rejected': 4, 'hired': 8}
+
+
+def _hour(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _day(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bump(granularity, bucket_start, hr_id, job_id, status,
+          count=1, latency_seconds=0, latency_samples=0):
+    stmt = insert(ApplicationRollup).values(
+        hr_id=hr_id,
+        granularity=granularity,
+        bucket_start=bucket_start,
+        job_id=job_id,
+        status=status,
+        count=count,
+        latency_seconds=latency_seconds,
+        latency_samples=latency_samples
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['hr_id', 'granularity', 'bucket_start', 'job_id', 'status'],
+        set_={
+            'count': ApplicationRollup.count + stmt.excluded.count,
+            'latency_seconds': ApplicationRollup.latency_seconds + stmt.excluded.latency_seconds,
+            'latency_samples': ApplicationRollup.latency_samples + stmt.excluded.latency_samples,
+        }
+    )
+    db.session.execute(stmt)
+
+
+def record_status(hr_id, job_id, status, applied_at=None, at=None, count=1):
+    """Count `count` applications entering `status`. The caller commits.
+
+    New applications are recorded as 'pending'. Pass `applied_at` on status
+    changes so time-to-status (e.g. time-to-shortlist) can be reported.
+    """
+    at = at or datetime.utcnow()
+    latency_seconds = 0
+    latency_samples = 0
+    if applied_at and status != 'pending':
+        latency_seconds = max(0, int((at - applied_at).total_seconds())) * count
+        latency_samples = count
+    _bump('hour', _hour(at), hr_id, job_id, status,
+          count=count, latency_seconds=latency_seconds, latency_samples=latency_samples)
+
+
+def stages_reached(mask, status):
+    """Bitmask of the statuses an application has entered.
+
+    Rows from before the column existed (NULL) have entered 'pending' and
+    their current status.
+    """
+    if mask is None:
+        return STAGE_BITS['pending'] | STAGE_BITS.get(status, 0)
+    return mask
+
+
+def first_entry(mask, current, status):
+    """Whether moving an application from `current` to `status` enters it for the first time."""
+    return not stages_reached(mask, current) & STAGE_BITS.get(status, 0)
+
+
+def record_transitions(hr_id, job_id, status, applied_ats, at=None):
+    """Count a batch of applications entering `status` in one bucket bump.
+
+    `applied_ats` holds the applied_at of each application, for the
+    time-to-status totals; include only first entries (see first_entry()).
+    The caller commits.
+    """
+    at = at or datetime.utcnow()
+    latency_seconds = 0
+    latency_samples = 0
+    if status != 'pending':
+        for applied_at in applied_ats:
+            if applied_at:
+                latency_seconds += max(0, int((at - applied_at).total_seconds()))
+                latency_samples += 1
+    _bump('hour', _hour(at), hr_id, job_id, status, count=len(applied_ats),
+          latency_seconds=latency_seconds, latency_samples=latency_samples)
+
+
+def forget_job(job_id):
+    """Drop all buckets of a deleted job. The caller commits."""
+    forget_jobs([job_id])
+
+
+def forget_jobs(job_ids):
+    """Drop all buckets of several deleted jobs. The caller commits."""
+    ApplicationRollup.query.filter(ApplicationRollup.job_id.in_(job_ids))\
+        .delete(synchronize_session=False)
+
+
+def compact(now=None):
+    """Fold hourly buckets older than HOURLY_RETENTION into daily buckets."""
+    now = now or datetime.utcnow()
+    cutoff = _hour(now - HOURLY_RETENTION)
+
+    day_col = func.date(ApplicationRollup.bucket_start)
+    rows = db.session.query(
+        ApplicationRollup.hr_id,
+        ApplicationRollup.job_id,
+        ApplicationRollup.status,
+        day_col,
+        func.sum(ApplicationRollup.count),
+        func.sum(ApplicationRollup.latency_seconds),
+        func.sum(ApplicationRollup.latency_samples)
+    ).filter(
+        ApplicationRollup.granularity == 'hour',
+        ApplicationRollup.bucket_start < cutoff
+    ).group_by(
+        ApplicationRollup.hr_id, ApplicationRollup.job_id, ApplicationRollup.status, day_col
+    ).all()
+
+    for hr_id, job_id, status, day, count, latency_seconds, latency_samples in rows:
+        _bump('day', datetime.strptime(day, '%Y-%m-%d'), hr_id, job_id, status,
+              count=count, latency_seconds=latency_seconds, latency_samples=latency_samples)
+
+    ApplicationRollup.query.filter(
+        ApplicationRollup.granularity == 'hour',
+        ApplicationRollup.bucket_start < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return len(rows)
+
+
+def rebuild():
+    """Recreate all buckets from the current Application rows.
+
+    Only the statuses each application has entered are known, not when, so
+    they are attributed to the application day and carry no time-to-status
+    data.
+    """
+    # Buckets of archived jobs (see archive.py) have no applications left
+    # to rebuild them from, so they are kept
+    ApplicationRollup.query.filter(ApplicationRollup.job_id.in_(db.session.query(JobPosting.id)))\
+        .delete(synchronize_session=False)
+
+    day_col = func.date(Application.applied_at)
+    rows = db.session.query(
+        JobPosting.hr_id,
+        Application.job_id,
+        Application.status,
+        Application.stages_reached,
+        day_col,
+        func.count(Application.id)
+    ).join(JobPosting, Application.job_id == JobPosting.id)\
+        .filter(Application.applied_at.isnot(None))\
+        .group_by(JobPosting.hr_id, Application.job_id, Application.status,
+                  Application.stages_reached, day_col)\
+        .all()
+
+    for hr_id, job_id, status, mask, day, count in rows:
+        bucket = datetime.strptime(day, '%Y-%m-%d')
+        reached = stages_reached(mask, status) | STAGE_BITS['pending']
+        for stage, bit in STAGE_BITS.items():
+            if reached & bit:
+                _bump('day', bucket, hr_id, job_id, stage, count=count)
+
+    db.session.commit()
+    return len(rows)
+
+
+def query_range(hr_id, start, end, job_id=None, granularity='day'):
+    """Aggregate buckets for `hr_id` in [start, end) into an analytics report."""
+    in_range = or_(
+        and_(ApplicationRollup.granularity == 'day',
+             ApplicationRollup.bucket_start >= _day(start)),
+        and_(ApplicationRollup.granularity == 'hour',
+             ApplicationRollup.bucket_start >= _hour(start))
+    )
+    query = ApplicationRollup.query.filter(
+        ApplicationRollup.hr_id == hr_id,
+        ApplicationRollup.bucket_start < end,
+        in_range
+    )
+    if job_id is not None:
+        query = query.filter(ApplicationRollup.job_id == job_id)
+
+    bucket_of = _hour if granularity == 'hour' else _day
+    fmt = '%Y-%m-%d %H:00' if granularity == 'hour' else '%Y-%m-%d'
+
+    series = {}
+    per_job = {}
+    totals = {}
+    latency = {}
+    for row in query.all():
+        key = bucket_of(row.bucket_start).strftime(fmt)
+        series.setdefault(key, {})
+        series[key][row.status] = series[key].get(row.status, 0) + row.count
+        job_totals = per_job.setdefault(row.job_id, {})
+        job_totals[row.status] = job_totals.get(row.status, 0) + row.count
+        totals[row.status] = totals.get(row.status, 0) + row.count
+        seconds, samples = latency.get(row.status, (0, 0))
+        latency[row.status] = (seconds + row.latency_seconds, samples + row.latency_samples)
+
+    funnel = []
+    previous = None
+    for stage in FUNNEL_STAGES:
+        count = totals.get(stage, 0)
+        funnel.append({
+            'stage': 'applied' if stage == 'pending' else stage,
+            'count': count,
+            'conversion': round(count / previous, 4) if previous else None
+        })
+        previous = count
+
+    def avg_hours(status):
+        seconds, samples = latency.get(status, (0, 0))
+        return round(seconds / samples / 3600, 2) if samples else None
+
+    return {
+        'start': start.strftime('%Y-%m-%d %H:%M:%S'),
+        'end': end.strftime('%Y-%m-%d %H:%M:%S'),
+        'granularity': granularity,
+        'series': [{'bucket': key, 'counts': series[key]} for key in sorted(series)],
+        'jobs': [{'job_id': key, 'counts': per_job[key]} for key in sorted(per_job)],
+        'totals': totals,
+        'funnel': funnel,
+        'avg_hours_to_shortlist': avg_hours('shortlisted'),
+        'avg_hours_to_hire': avg_hours('hired')
+    }
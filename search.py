@@ -0,0 +1,198 @@
+# search.py - faceted job search backing /api/jobs
+#
+# Facet counts come from one grouped query over the active jobs matching
+# the free-text search, grouped by (job_type, location, salary band).
+# Each facet is counted with every *other* facet filter applied, so the
+# counts show how many results picking that value would give. The same
+# rows also yield the total for the page, so a search costs one grouped
+# query plus the page query (per shard; see shards.py).
+#
+# Salary bands and `min_salary` are amounts in one currency (`currency`,
+# USD by default; postings without a recognised currency count as USD).
+# Postings in other currencies are never compared against those amounts:
+# they get their own OTHER_CURRENCY_BAND facet instead.
+#
+# A radius search (`near`, a geo.Area) restricts both queries to the
+# geohash cells covering the circle. Grouped rows carry each location's
+# coordinates, so the exact distance check runs on the grouped rows and
+# the page query keeps only the geohashes that passed it.
+from sqlalchemy import case, func
+from models import db, JobPosting, Application
+import shards
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# (key, label, lower bound inclusive, upper bound exclusive) in yearly salary units
+SALARY_BANDS = [
+    ('0-50k', 'Under 50k', 0, 50000),
+    ('50k-100k', '50k - 100k', 50000, 100000),
+    ('100k-150k', '100k - 150k', 100000, 150000),
+    ('150k+', '150k+', 150000, None),
+]
+UNSPECIFIED_BAND = 'unspecified'
+OTHER_CURRENCY_BAND = 'other-currency'
+DEFAULT_CURRENCY = 'USD'
+
+
+def _in_currency(currency):
+    condition = JobPosting.salary_currency == currency
+    if currency == DEFAULT_CURRENCY:
+        condition = condition | JobPosting.salary_currency.is_(None)
+    return condition
+
+
+def _band_expression(currency):
+    # Bands are computed from the extracted, indexed salary_min column
+    return case(
+        (JobPosting.salary_min.is_(None), UNSPECIFIED_BAND),
+        (~_in_currency(currency), OTHER_CURRENCY_BAND),
+        *[((JobPosting.salary_min >= low) & (JobPosting.salary_min < high) if high is not None
+           else JobPosting.salary_min >= low, key)
+          for key, _label, low, high in SALARY_BANDS],
+        else_=UNSPECIFIED_BAND
+    )
+
+
+def _band_filter(salary, currency):
+    for key, _label, low, high in SALARY_BANDS:
+        if key == salary:
+            condition = _in_currency(currency) & (JobPosting.salary_min >= low)
+            if high is not None:
+                condition = condition & (JobPosting.salary_min < high)
+            return condition
+    if salary == OTHER_CURRENCY_BAND:
+        return JobPosting.salary_min.isnot(None) & ~_in_currency(currency)
+    return JobPosting.salary_min.is_(None)
+
+
+def _base_filter(query, search, experience, min_salary, currency, near=None):
+    active = JobPosting.status == 'active'
+    if near is not None:
+        query = query.filter(near.filter(JobPosting.geohash, active))
+    else:
+        query = query.filter(active)
+    if search:
+        query = query.filter(
+            JobPosting.title.ilike(f'%{search}%') |
+            JobPosting.company.ilike(f'%{search}%') |
+            JobPosting.description.ilike(f'%{search}%')
+        )
+    if experience:
+        query = query.filter(JobPosting.experience_level == experience)
+    if min_salary:
+        query = query.filter(_in_currency(currency), JobPosting.salary_max >= min_salary)
+    return query
+
+
+def _facet_rows(search, experience, min_salary, currency, near=None):
+    band = _band_expression(currency)
+    query = db.session.query(
+        JobPosting.job_type,
+        JobPosting.location,
+        band,
+        func.count(JobPosting.id),
+        JobPosting.geohash,
+        JobPosting.latitude,
+        JobPosting.longitude
+    )
+    # The coordinates follow from the location, so they add no groups
+    query = _base_filter(query, search, experience, min_salary, currency, near)\
+        .group_by(JobPosting.job_type, JobPosting.location, band,
+                  JobPosting.geohash, JobPosting.latitude, JobPosting.longitude)
+    # Rows of different shards are summed by the caller like any other rows
+    return shards.gather(query.all)
+
+
+def search_jobs(search='', job_type='', location='', salary='', experience='', min_salary=None,
+                near=None, page=1, per_page=DEFAULT_PER_PAGE, currency=DEFAULT_CURRENCY):
+    """Return a page of active jobs plus per-facet counts.
+
+    `near` is an optional geo.Area limiting results to jobs within it;
+    salary bands and `min_salary` are amounts in `currency`.
+    """
+    location_key = location.strip().lower()
+
+    facets = {'job_type': {}, 'location': {}, 'salary': {}}
+    location_labels = {}
+    geohashes = set()
+    total = 0
+
+    for row_type, row_location, band, count, geohash, latitude, longitude in \
+            _facet_rows(search, experience, min_salary, currency, near):
+        if near is not None:
+            if not near.contains(latitude, longitude):
+                continue
+            geohashes.add(geohash)
+        row_location_key = (row_location or '').strip().lower()
+        type_ok = not job_type or row_type == job_type
+        location_ok = not location_key or location_key in row_location_key
+        salary_ok = not salary or band == salary
+
+        if location_ok and salary_ok:
+            facets['job_type'][row_type] = facets['job_type'].get(row_type, 0) + count
+        if type_ok and salary_ok and row_location_key:
+            facets['location'][row_location_key] = facets['location'].get(row_location_key, 0) + count
+            location_labels.setdefault(row_location_key, row_location.strip())
+        if type_ok and location_ok:
+            facets['salary'][band] = facets['salary'].get(band, 0) + count
+        if type_ok and location_ok and salary_ok:
+            total += count
+
+    jobs = []
+    if total:
+        query = _base_filter(JobPosting.query, search, experience, min_salary, currency)
+        if near is not None:
+            query = query.filter(JobPosting.geohash.in_(geohashes))
+        if job_type:
+            query = query.filter(JobPosting.job_type == job_type)
+        if location_key:
+            query = query.filter(JobPosting.location.ilike(f'%{location_key}%'))
+        if salary:
+            query = query.filter(_band_filter(salary, currency))
+        # Each shard returns its first `page` pages; the merged order decides the page
+        candidates = shards.gather(query.order_by(JobPosting.created_at.desc(), JobPosting.id.desc())
+                                   .limit(page * per_page)
+                                   .all)
+        candidates.sort(key=lambda job: (job.created_at, job.id), reverse=True)
+        page_jobs = candidates[(page - 1) * per_page:page * per_page]
+
+        page_ids = [job.id for job in page_jobs]
+        counts = {}
+        if page_ids:
+            for rows in shards.scatter(lambda: db.session.query(Application.job_id, func.count(Application.id))
+                                       .filter(Application.job_id.in_(page_ids))
+                                       .group_by(Application.job_id)
+                                       .all()):
+                counts.update(rows)
+        for job in page_jobs:
+            data = job.to_dict()
+            data['applications'] = counts.get(job.id, 0)
+            if near is not None:
+                data['distance_km'] = round(near.distance(job.latitude, job.longitude), 1)
+            jobs.append(data)
+
+    band_labels = {key: label for key, label, _low, _high in SALARY_BANDS}
+    band_labels[OTHER_CURRENCY_BAND] = 'Other currencies'
+    band_labels[UNSPECIFIED_BAND] = 'Not specified'
+
+    result = {
+        'jobs': jobs,
+        'count': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'currency': currency,
+        'facets': {
+            'job_type': [{'value': key, 'count': count}
+                         for key, count in sorted(facets['job_type'].items(), key=lambda kv: -kv[1])],
+            'location': [{'value': key, 'label': location_labels[key], 'count': count}
+                         for key, count in sorted(facets['location'].items(), key=lambda kv: -kv[1])],
+            'salary': [{'value': key, 'label': band_labels[key], 'count': facets['salary'][key]}
+                       for key in list(band_labels) if key in facets['salary']]
+        }
+    }
+    if near is not None:
+        result['near'] = {'place': near.place.name, 'country': near.place.country,
+                          'radius_km': near.radius_km}
+    return result
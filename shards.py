@@ -0,0 +1,296 @@
+# shards.py - per-company SQLite shards for jobs and applications
+#
+# Each HR user (company) is assigned to a shard. A shard is a separate
+# SQLite file holding that group's job_posting, application and
+# application_rollup tables, so bulk writes of one employer only lock
+# their own file. Every other table stays in the core database
+# (careersync.db), which each shard connection ATTACHes: unqualified
+# table names resolve to the shard file first and then to core, so the
+# existing queries and joins (application -> candidate, job -> user) run
+# unchanged against a shard.
+#
+# Routing: HR requests select their shard for the whole request (g.shard,
+# read by models.RoutingSession). Job seeker views span all shards and
+# use scatter()/gather(); writes to one job use using(shard_for_job()).
+# Rows created in shard number n get ids starting at n * ID_SPAN, so ids
+# stay globally unique and one session can hold rows from every shard.
+# The core database (number 0) has the same id sequence: ids only grow,
+# so an id freed by archive.py is never handed to a new row.
+#
+# Shards are configured with SHARDS = {name: sqlite path}. Without it
+# there is only the default shard (the core database) and nothing changes.
+import os
+import sqlite3
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context
+from sqlalchemy import create_engine, event, func, text
+from models import db, User, JobPosting, Application, ApplicationRollup, ShardAssignment, JobShard
+from migrations import ensure_schema
+
+DEFAULT_SHARD = 'default'
+SHARDED_MODELS = (JobPosting, Application, ApplicationRollup)
+ID_SPAN = 1 << 40
+
+
+class ShardSet:
+    def __init__(self, core_path, paths):
+        self.core_path = core_path
+        self.paths = dict(paths)
+        self.numbers = {name: number for number, name in enumerate(sorted(self.paths), start=1)}
+        self.numbers[DEFAULT_SHARD] = 0
+        self.engines = {name: self._routing_engine(path) for name, path in self.paths.items()}
+
+    def _routing_engine(self, path):
+        engine = create_engine(f'sqlite:///{path}')
+        core_path = self.core_path
+
+        @event.listens_for(engine, 'connect')
+        def _attach_core(dbapi_connection, connection_record):
+            dbapi_connection.execute('ATTACH DATABASE ? AS core', (core_path,))
+
+        return engine
+
+    @property
+    def names(self):
+        return [DEFAULT_SHARD] + sorted(self.paths)
+
+
+def _prepare(path, number):
+    """Create or upgrade the sharded tables and id sequence of one shard file."""
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        db.metadata.create_all(engine, tables=[model.__table__ for model in SHARDED_MODELS])
+        ensure_schema(db, *SHARDED_MODELS, engine=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                'CREATE TABLE IF NOT EXISTS shard_sequence (name VARCHAR(50) PRIMARY KEY, next_id INTEGER NOT NULL)'
+            )
+            for model in (JobPosting, Application):
+                conn.execute(text('INSERT OR IGNORE INTO shard_sequence (name, next_id) VALUES (:name, :next_id)'),
+                             {'name': model.__tablename__, 'next_id': number * ID_SPAN + 1})
+    finally:
+        engine.dispose()
+
+
+def init_app(app):
+    """Load SHARDS from the config and prepare each shard file. Call after create_all()."""
+    paths = {name: os.path.join(app.instance_path, path)
+             for name, path in (app.config.get('SHARDS') or {}).items()}
+    if DEFAULT_SHARD in paths:
+        raise ValueError(f'{DEFAULT_SHARD!r} is the core database and cannot be configured')
+    with app.app_context():
+        shard_set = ShardSet(db.engine.url.database, paths)
+    _prepare(shard_set.core_path, 0)
+    for name, path in paths.items():
+        _prepare(path, shard_set.numbers[name])
+    app.extensions['shards'] = shard_set
+
+
+def _shard_set():
+    return current_app.extensions['shards']
+
+
+def names():
+    return _shard_set().names
+
+
+def enabled():
+    return bool(_shard_set().paths)
+
+
+def current():
+    return g.get('shard') or DEFAULT_SHARD
+
+
+@contextmanager
+def using(name):
+    """Route statements in this block to shard `name`."""
+    previous = g.get('shard')
+    g.shard = name
+    try:
+        yield
+    finally:
+        g.shard = previous
+
+
+def scatter(fn):
+    """Call fn() once per shard and return the results in shard order."""
+    results = []
+    for name in names():
+        with using(name):
+            results.append(fn())
+    return results
+
+
+def gather(fn):
+    """Concatenate the lists fn() returns on every shard."""
+    return [item for part in scatter(fn) for item in part]
+
+
+# ---------------------- Shard map ----------------------
+def shard_for_hr(hr_id):
+    if not enabled():
+        return DEFAULT_SHARD
+    with using(DEFAULT_SHARD):
+        assignment = db.session.get(ShardAssignment, hr_id)
+    return assignment.shard if assignment else DEFAULT_SHARD
+
+
+def shard_for_job(job_id):
+    if not enabled():
+        return DEFAULT_SHARD
+    with using(DEFAULT_SHARD):
+        entry = db.session.get(JobShard, job_id)
+    return entry.shard if entry else DEFAULT_SHARD
+
+
+def assign(hr_id):
+    """Place a new HR user on the configured shard with the fewest users. The caller commits."""
+    if not enabled():
+        return DEFAULT_SHARD
+    with using(DEFAULT_SHARD):
+        counts = dict(db.session.query(ShardAssignment.shard, func.count(ShardAssignment.hr_id))
+                      .group_by(ShardAssignment.shard).all())
+        shard = min(_shard_set().paths, key=lambda name: (counts.get(name, 0), name))
+        db.session.merge(ShardAssignment(hr_id=hr_id, shard=shard))
+    return shard
+
+
+def forget_jobs(job_ids):
+    """Drop directory entries of deleted jobs. The caller commits."""
+    if enabled():
+        JobShard.query.filter(JobShard.job_id.in_(job_ids)).delete(synchronize_session=False)
+
+
+def _routed_shard():
+    if not has_app_context():
+        return None
+    shard = g.get('shard')
+    if shard in (None, DEFAULT_SHARD) or shard not in current_app.extensions['shards'].paths:
+        return None
+    return shard
+
+
+@event.listens_for(JobPosting, 'before_insert')
+@event.listens_for(Application, 'before_insert')
+def _allocate_id(mapper, connection, target):
+    if target.id is None and has_app_context() and 'shards' in current_app.extensions:
+        number = current_app.extensions['shards'].numbers[_routed_shard() or DEFAULT_SHARD]
+        table = mapper.local_table.name
+        # Rows written without the sequence (older databases, raw inserts)
+        # may already sit above next_id; never hand out an id at or below them
+        target.id = connection.execute(
+            text(f'UPDATE shard_sequence SET next_id = max(next_id, '
+                 f'(SELECT coalesce(max(id), 0) FROM {table} WHERE id < :upper) + 1) + 1 '
+                 f'WHERE name = :name RETURNING next_id - 1'),
+            {'name': table, 'upper': (number + 1) * ID_SPAN}
+        ).scalar_one()
+
+
+@event.listens_for(JobPosting, 'after_insert')
+def _register_job(mapper, connection, target):
+    shard = _routed_shard()
+    if shard:
+        connection.execute(JobShard.__table__.insert().values(job_id=target.id, shard=shard))
+
+
+@event.listens_for(JobPosting, 'after_delete')
+def _unregister_job(mapper, connection, target):
+    if _routed_shard():
+        connection.execute(JobShard.__table__.delete().where(JobShard.job_id == target.id))
+
+
+# ---------------------- Rebalancing ----------------------
+def _columns(model, skip=()):
+    return ', '.join(f'"{column.name}"' for column in model.__table__.columns if column.name not in skip)
+
+
+def move_hr(hr_id, target):
+    """Move all jobs, applications and rollups of `hr_id` to shard `target`.
+
+    Runs as one transaction over the core, source and target files, so the
+    HR user's data is visible in exactly one shard at any time; writers to
+    the two shards wait for it to finish. Returns the number of jobs moved.
+    """
+    shard_set = _shard_set()
+    if target != DEFAULT_SHARD and target not in shard_set.paths:
+        raise ValueError(f'Unknown shard: {target}')
+    source = shard_for_hr(hr_id)
+    if source == target:
+        return 0
+    db.session.commit()
+
+    connection = sqlite3.connect(shard_set.core_path, isolation_level=None, timeout=30)
+    try:
+        schemas = {DEFAULT_SHARD: 'main'}
+        for alias, name in (('src', source), ('dst', target)):
+            if name != DEFAULT_SHARD:
+                connection.execute('ATTACH DATABASE ? AS ' + alias, (shard_set.paths[name],))
+                schemas[name] = alias
+        src, dst = schemas[source], schemas[target]
+        in_jobs = f'job_id IN (SELECT id FROM {src}.job_posting WHERE hr_id = ?)'
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            moved = connection.execute(f'SELECT COUNT(*) FROM {src}.job_posting WHERE hr_id = ?',
+                                       (hr_id,)).fetchone()[0]
+            columns = _columns(JobPosting)
+            connection.execute(f'INSERT INTO {dst}.job_posting ({columns}) '
+                               f'SELECT {columns} FROM {src}.job_posting WHERE hr_id = ?', (hr_id,))
+            columns = _columns(Application)
+            connection.execute(f'INSERT INTO {dst}.application ({columns}) '
+                               f'SELECT {columns} FROM {src}.application WHERE {in_jobs}', (hr_id,))
+            # Rollup ids are per file; let the target assign new ones
+            columns = _columns(ApplicationRollup, skip=('id',))
+            connection.execute(f'INSERT INTO {dst}.application_rollup ({columns}) '
+                               f'SELECT {columns} FROM {src}.application_rollup WHERE hr_id = ?', (hr_id,))
+
+            connection.execute(f'DELETE FROM {src}.application WHERE {in_jobs}', (hr_id,))
+            connection.execute(f'DELETE FROM {src}.application_rollup WHERE hr_id = ?', (hr_id,))
+            connection.execute(f'DELETE FROM {src}.job_posting WHERE hr_id = ?', (hr_id,))
+
+            if target == DEFAULT_SHARD:
+                connection.execute('DELETE FROM main.job_shard WHERE job_id IN '
+                                   '(SELECT id FROM main.job_posting WHERE hr_id = ?)', (hr_id,))
+            else:
+                connection.execute(f'INSERT OR REPLACE INTO main.job_shard (job_id, shard) '
+                                   f'SELECT id, ? FROM {dst}.job_posting WHERE hr_id = ?', (target, hr_id))
+            connection.execute('INSERT OR REPLACE INTO main.shard_assignment (hr_id, shard, assigned_at) '
+                               "VALUES (?, ?, datetime('now'))", (hr_id, target))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+    finally:
+        connection.close()
+    return moved
+
+
+def migrate():
+    """Spread HR users without a shard across the configured shards.
+
+    Returns [(hr_id, shard, jobs moved)].
+    """
+    if not enabled():
+        return []
+    with using(DEFAULT_SHARD):
+        assigned = {hr_id for (hr_id,) in db.session.query(ShardAssignment.hr_id)}
+        hr_ids = [hr_id for (hr_id,) in db.session.query(User.id)
+                  .filter(User.user_type == 'hr').order_by(User.id)
+                  if hr_id not in assigned]
+    moved = []
+    for hr_id in hr_ids:
+        target = assign(hr_id)
+        db.session.rollback()  # move_hr() records the assignment itself
+        moved.append((hr_id, target, move_hr(hr_id, target)))
+    return moved
+
+
+def status():
+    """Per-shard HR, job and application counts."""
+    with using(DEFAULT_SHARD):
+        assigned = dict(db.session.query(ShardAssignment.shard, func.count(ShardAssignment.hr_id))
+                        .group_by(ShardAssignment.shard).all())
+    counts = scatter(lambda: (JobPosting.query.count(), Application.query.count()))
+    return [{'shard': name, 'hr_users': assigned.get(name, 0), 'jobs': jobs, 'applications': applications}
+            for name, (jobs, applications) in zip(names(), counts)]
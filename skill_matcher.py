@@ -0,0 +1,111 @@
+# skill_matcher.py - whole-word skill matching for application scoring
+#
+# A job's description + requirements is normalized once and indexed by
+# word: each maximal run of WORD_CHARS maps to the positions where it
+# starts. The entry is cached per (job id, updated_at). Scoring an
+# application looks up the first word of each candidate skill and checks
+# only those positions for the rest of the skill and a word boundary, so
+# the cost depends on the candidate's skills, not on every skill seen so
+# far, and new skills never invalidate cached jobs.
+import re
+import threading
+from collections import OrderedDict
+
+# Characters that continue a token, so "c" does not match inside "c++" or "react"
+WORD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789_+#')
+WORD_RE = re.compile(r'[a-z0-9_+#]+')
+
+JOB_CACHE_SIZE = 1024
+
+BASE_SCORE = 70
+SKILL_POINTS = 30
+
+
+def normalize_skills(skills_text):
+    """Split a comma separated skills field into unique lowercase skills."""
+    if not skills_text:
+        return []
+    seen = []
+    for skill in skills_text.split(','):
+        skill = ' '.join(skill.lower().split())
+        if skill and skill not in seen:
+            seen.append(skill)
+    return seen
+
+
+class JobText:
+    """A job's normalized text with the positions where each word starts."""
+
+    __slots__ = ('text', 'starts')
+
+    def __init__(self, text):
+        self.text = text
+        self.starts = {}
+        for match in WORD_RE.finditer(text):
+            self.starts.setdefault(match.group(), []).append(match.start())
+
+    def mentions(self, skill):
+        """Whether `skill` occurs in the text as whole words."""
+        text = self.text
+        first = WORD_RE.match(skill)
+        if first is None:
+            # Starts with punctuation (".net"): scan for it
+            positions = []
+            index = text.find(skill)
+            while index != -1:
+                positions.append(index)
+                index = text.find(skill, index + 1)
+        else:
+            # The skill's first word must be a whole word of the text
+            positions = self.starts.get(first.group(), ())
+        for start in positions:
+            end = start + len(skill)
+            if (text.startswith(skill, start)
+                    and (start == 0 or text[start - 1] not in WORD_CHARS)
+                    and (end == len(text) or text[end] not in WORD_CHARS)):
+                return True
+        return False
+
+
+class SkillMatcher:
+    def __init__(self, cache_size=JOB_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # job id -> (updated_at, JobText)
+        self._cache_size = cache_size
+
+    def job_text(self, job):
+        """`job`'s description + requirements as a JobText, cached until the job changes."""
+        key = job.id
+        stamp = job.updated_at
+        with self._lock:
+            entry = self._jobs.get(key)
+            if entry and entry[0] == stamp:
+                self._jobs.move_to_end(key)
+                return entry[1]
+        # Collapse whitespace so multi-word skills match across line breaks
+        job_text = JobText(' '.join(f'{job.description or ""} {job.requirements or ""}'.lower().split()))
+        with self._lock:
+            self._jobs[key] = (stamp, job_text)
+            self._jobs.move_to_end(key)
+            while len(self._jobs) > self._cache_size:
+                self._jobs.popitem(last=False)
+        return job_text
+
+    def forget_job(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def matched_skills(self, skills, job):
+        job_text = self.job_text(job)
+        return [skill for skill in skills if job_text.mentions(skill)]
+
+    def match_score(self, skills_text, job):
+        """Application match score: base score plus up to 30 for skill overlap."""
+        skills = normalize_skills(skills_text)
+        if not skills:
+            return BASE_SCORE
+        matched = self.matched_skills(skills, job)
+        return BASE_SCORE + min(SKILL_POINTS, len(matched) / len(skills) * SKILL_POINTS)
+
+
+matcher = SkillMatcher()
@@ -0,0 +1,232 @@
+# snapshot.py - read-only reporting snapshot of the databases
+#
+# Analytics, funnel reports and exports scan many rows; run against the
+# live careersync.db they hold read locks that apply_job commits have to
+# wait for. refresh() copies the core database and every shard file into
+# instance/snapshots/ with the SQLite online backup API. The live files
+# use a rollback journal, so a read blocks writers for as long as it
+# lasts: the copy goes STEP_PAGES pages per step, each step its own short
+# read, with STEP_SLEEP between steps for writers to take the lock. A
+# commit by another connection restarts the copy; after MAX_RESTARTS
+# restarts the attempt is abandoned and, after a pause, tried again, up to
+# COPY_ATTEMPTS times, so a busy database delays or fails one refresh
+# instead of keeping it copying forever. Each copy goes to a temporary
+# file that is renamed over the previous one once complete. The
+# snapshot.refresh task does this every few minutes.
+#
+# Reporting code wraps its queries in reading(): inside the block the
+# session (models.RoutingSession) sends statements for the current shard
+# to a read-only connection on its snapshot file. When the snapshot is
+# missing or older than SNAPSHOT_MAX_AGE the block reads live data
+# instead, so a stopped refresher never serves arbitrarily old figures.
+# Either way the block yields the age of what it reads (0 when live) for
+# the page to show.
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import quote
+from flask import current_app, g
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from models import db
+from shards import DEFAULT_SHARD
+
+DEFAULT_MAX_AGE = 900  # seconds; three refresh intervals
+STEP_PAGES = 256  # pages copied per backup step (1 MiB at the default page size)
+STEP_SLEEP = 0.005  # seconds writers get between steps
+MAX_RESTARTS = 5  # restarts by concurrent writes before an attempt is abandoned
+COPY_ATTEMPTS = 3
+RETRY_PAUSE = 0.5  # seconds before retrying, times the attempt number
+CHECK_INTERVAL = 1.0  # seconds between manifest checks per process
+
+
+class CopyRestarted(Exception):
+    """Concurrent writes kept restarting a backup."""
+
+
+class SnapshotSet:
+    def __init__(self, directory, sources, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.sources = dict(sources)  # shard name -> live database path
+        self.max_age = max_age
+        self.paths = {name: os.path.join(directory, f'{name}.db') for name in self.sources}
+        self.manifest_path = os.path.join(directory, 'snapshot.json')
+        self.engines = {name: self._engine(name) for name in self.sources}
+        self._manifest = None
+        self._manifest_mtime = None
+        self._next_check = 0.0
+
+    def _engine(self, name):
+        path = self.paths[name]
+        core = self.paths[DEFAULT_SHARD]
+
+        def connect():
+            connection = sqlite3.connect(f'file:{quote(path)}?mode=ro', uri=True,
+                                         check_same_thread=False)
+            if name != DEFAULT_SHARD:
+                connection.execute('ATTACH DATABASE ? AS core', (f'file:{quote(core)}?mode=ro',))
+            return connection
+
+        # No pool: every checkout opens the file currently in place, so a
+        # refreshed snapshot is picked up without restarting the process
+        return create_engine('sqlite://', creator=connect, poolclass=NullPool)
+
+    def engine_for(self, shard):
+        return self.engines.get(shard or DEFAULT_SHARD)
+
+    def manifest(self):
+        """The last completed refresh ({'taken_at', 'duration_ms', ...}) or None."""
+        if time.monotonic() < self._next_check:
+            return self._manifest
+        self._next_check = time.monotonic() + CHECK_INTERVAL
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            self._manifest = self._manifest_mtime = None
+            return None
+        if mtime != self._manifest_mtime:
+            try:
+                with open(self.manifest_path) as handle:
+                    self._manifest = json.load(handle)
+            except (OSError, ValueError):
+                self._manifest = None
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def age(self):
+        """Seconds since the snapshot was taken, or None without one."""
+        manifest = self.manifest()
+        if manifest is None:
+            return None
+        return max(0.0, time.time() - manifest['taken_at'])
+
+
+def init_app(app):
+    """Set up snapshot files for the core database and each shard. Call after shards.init_app()."""
+    directory = os.path.join(app.instance_path, 'snapshots')
+    os.makedirs(directory, exist_ok=True)
+    with app.app_context():
+        sources = {DEFAULT_SHARD: db.engine.url.database}
+    sources.update(app.extensions['shards'].paths)
+    max_age = app.config.get('SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE)
+    app.extensions['snapshot'] = SnapshotSet(directory, sources, max_age)
+
+
+def _snapshot_set():
+    return current_app.extensions['snapshot']
+
+
+def _copy(source, target):
+    """Back up `source` into a new file and rename it over `target`."""
+    temporary = f'{target}.{os.getpid()}.tmp'
+    for attempt in range(1, COPY_ATTEMPTS + 1):
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        live = sqlite3.connect(source, timeout=30)
+        copy = sqlite3.connect(temporary)
+        last_remaining = None
+        restarts = 0
+
+        def progress(status, remaining, total):
+            # Remaining pages go back up when a write restarted the copy
+            nonlocal last_remaining, restarts
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > MAX_RESTARTS:
+                    raise CopyRestarted(f'{source} changed {restarts} times during the copy')
+            last_remaining = remaining
+
+        try:
+            live.backup(copy, pages=STEP_PAGES, progress=progress, sleep=STEP_SLEEP)
+            # The copy inherits the live journal mode; read-only opens of a WAL
+            # file need its -shm file, so switch back to a rollback journal
+            copy.execute('PRAGMA journal_mode=DELETE')
+            break
+        except (CopyRestarted, sqlite3.OperationalError):
+            if attempt == COPY_ATTEMPTS:
+                raise
+        finally:
+            copy.close()
+            live.close()
+        time.sleep(RETRY_PAUSE * attempt)
+    os.replace(temporary, target)
+
+
+def refresh():
+    """Copy every live database into the snapshot directory; returns the manifest."""
+    snapshots = _snapshot_set()
+    started = time.time()
+    # Shards first: their files are smaller and the core copy finishing last
+    # keeps the candidate and user rows at least as new as the applications
+    for name in sorted(snapshots.sources, key=lambda name: name == DEFAULT_SHARD):
+        _copy(snapshots.sources[name], snapshots.paths[name])
+    manifest = {
+        'taken_at': started,
+        'duration_ms': round((time.time() - started) * 1000, 1),
+        'shards': sorted(snapshots.sources),
+    }
+    temporary = f'{snapshots.manifest_path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(manifest, handle)
+    os.replace(temporary, snapshots.manifest_path)
+    snapshots._next_check = 0.0
+    return manifest
+
+
+def status():
+    snapshots = _snapshot_set()
+    manifest = snapshots.manifest()
+    age = snapshots.age()
+    return {
+        'available': manifest is not None,
+        'taken_at': datetime.utcfromtimestamp(manifest['taken_at']).isoformat(timespec='seconds')
+        if manifest else None,
+        'age_seconds': round(age, 1) if age is not None else None,
+        'max_age_seconds': snapshots.max_age,
+        'fresh': age is not None and age <= snapshots.max_age,
+        'duration_ms': manifest['duration_ms'] if manifest else None,
+    }
+
+
+@contextmanager
+def reading(max_age=None):
+    """Route reads in this block to the snapshot if it is at most `max_age` seconds old.
+
+    Yields the age in seconds of the data read: the snapshot's, or 0 when
+    it is missing or too stale and the block reads the live databases.
+    """
+    snapshots = _snapshot_set()
+    max_age = snapshots.max_age if max_age is None else max_age
+    manifest = snapshots.manifest()
+    age = snapshots.age()
+    # A shard configured after the last refresh has no snapshot file yet
+    if age is None or age > max_age or (g.get('shard') or DEFAULT_SHARD) not in manifest['shards']:
+        yield 0
+        return
+    previous = g.get('snapshot')
+    g.snapshot = True
+    try:
+        yield age
+    finally:
+        g.snapshot = previous
+
+
+def stream(rows):
+    """Iterate the lazy query `rows` later with reads routed as in this reading() block.
+
+    Streamed exports run their query after the view has returned.
+    """
+    routed = g.get('snapshot')
+
+    def generate():
+        previous = g.get('snapshot')
+        g.snapshot = routed
+        try:
+            yield from rows
+        finally:
+            g.snapshot = previous
+
+    return generate()
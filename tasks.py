@@ -0,0 +1,487 @@
+# tasks.py - persistent background task scheduler
+#
+# Tasks are rows in the `task` table: one-shot tasks run once at `run_at`,
+# recurring tasks carry a cron expression and are rescheduled after every
+# run. Workers (`flask tasks-worker`) claim a due task by taking a lease
+# with a conditional UPDATE, so several worker processes can share the
+# table; a task whose lease expires (crashed worker) is claimed again.
+# Failures are retried with exponential backoff until max_attempts.
+#
+# Handlers are registered with @task('name') and called with the task's
+# JSON args as keyword arguments inside an app context.
+import json
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, or_, and_
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Task, JobPosting, Application, Candidate
+import events
+import shards
+
+DEFAULT_LEASE = 300  # seconds
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30  # seconds, doubled per failed attempt
+BACKOFF_MAX = 3600
+POLL_INTERVAL = 1.0
+
+_registry = {}
+
+
+def task(name, lease=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register a handler under `name`."""
+    def decorator(func):
+        _registry[name] = {'func': func, 'lease': lease, 'max_attempts': max_attempts}
+        return func
+    return decorator
+
+
+# ---------------------- Cron expressions ----------------------
+_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+# (low, high) of minute, hour, day of month, month, day of week (0 = Sunday)
+_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f'Invalid step in {text!r}')
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f'Value out of range in {text!r}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(expression):
+    """Parse a 5-field cron expression into sets of allowed values."""
+    expression = _ALIASES.get(expression.strip(), expression)
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError('Cron expression needs 5 fields: minute hour day month weekday')
+    minutes, hours, days, months, weekdays = (
+        _parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELD_RANGES)
+    )
+    if 7 in weekdays:
+        weekdays = (weekdays - {7}) | {0}
+    # As in cron, a restricted day of month OR day of week matches
+    return {
+        'minutes': minutes, 'hours': hours, 'days': days, 'months': months, 'weekdays': weekdays,
+        'any_day': fields[2] == '*', 'any_weekday': fields[4] == '*',
+    }
+
+
+def next_run(expression, after):
+    """First minute strictly after `after` matching `expression`."""
+    cron = parse_cron(expression)
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = after + timedelta(days=366 * 5)
+    while moment <= limit:
+        if moment.month not in cron['months']:
+            year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+            moment = datetime(year, month, 1)
+            continue
+        day_ok = moment.day in cron['days']
+        weekday_ok = (moment.weekday() + 1) % 7 in cron['weekdays']
+        if cron['any_day'] or cron['any_weekday']:
+            day_match = day_ok and weekday_ok
+        else:
+            day_match = day_ok or weekday_ok
+        if not day_match:
+            moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if moment.hour not in cron['hours']:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+            continue
+        if moment.minute not in cron['minutes']:
+            moment += timedelta(minutes=1)
+            continue
+        return moment
+    raise ValueError(f'Cron expression {expression!r} never matches')
+
+
+# ---------------------- Queueing ----------------------
+def enqueue(name, args=None, run_at=None, key=None, max_attempts=None):
+    """Queue a one-shot task. The caller commits.
+
+    With `key`, a task that is still queued under the same key is left
+    in place instead of queueing a duplicate.
+    """
+    if name not in _registry:
+        raise KeyError(f'Unknown task {name!r}')
+    now = datetime.utcnow()
+    stmt = insert(Task).values(
+        name=name,
+        args=json.dumps(args or {}),
+        key=key,
+        status='queued',
+        run_at=run_at or now,
+        attempts=0,
+        max_attempts=max_attempts or _registry[name]['max_attempts'],
+        created_at=now
+    )
+    if key is not None:
+        # Finished tasks free their key so the same work can be queued again
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['key'],
+            set_={
+                'args': stmt.excluded.args,
+                'status': 'queued',
+                'run_at': stmt.excluded.run_at,
+                'attempts': 0,
+                'last_error': None,
+            },
+            where=Task.status.in_(['done', 'failed'])
+        )
+    db.session.execute(stmt)
+
+
+def schedule(name, expression, args=None):
+    """Create or update the recurring task `name`. The caller commits."""
+    if name not in _registry:
+        raise KeyError(f'Unknown task {name!r}')
+    now = datetime.utcnow()
+    run_at = next_run(expression, now)
+    stmt = insert(Task).values(
+        name=name,
+        args=json.dumps(args or {}),
+        key=name,
+        schedule=expression,
+        status='queued',
+        run_at=run_at,
+        attempts=0,
+        max_attempts=_registry[name]['max_attempts'],
+        created_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={
+            'args': stmt.excluded.args,
+            'schedule': expression,
+            # Keep the pending run unless the schedule changed
+            'run_at': func.iif(Task.schedule == expression, Task.run_at, run_at),
+        }
+    )
+    db.session.execute(stmt)
+
+
+# Recurring tasks installed by every worker on start
+DEFAULT_SCHEDULES = [
+    ('rollups.compact', '5 * * * *', None),
+    ('tasks.purge', '0 3 * * *', None),
+    ('events.compact', '0 4 * * 0', None),
+    ('snapshot.refresh', '*/5 * * * *', None),
+    ('archive.run', '0 5 * * *', None),
+]
+
+
+# Closing jobs nobody has touched is a policy choice, so it only runs when
+# the app sets CLOSE_STALE_JOBS_AFTER_DAYS
+CLOSE_STALE_SCHEDULE = '30 2 * * *'
+
+
+def unschedule(name):
+    """Remove the recurring task `name`, if it is scheduled."""
+    Task.query.filter(Task.key == name, Task.schedule.isnot(None))\
+        .delete(synchronize_session=False)
+
+
+def install_defaults():
+    for name, expression, args in DEFAULT_SCHEDULES:
+        schedule(name, expression, args)
+    stale_days = current_app.config.get('CLOSE_STALE_JOBS_AFTER_DAYS')
+    if stale_days:
+        schedule('jobs.close_stale', CLOSE_STALE_SCHEDULE, {'days': stale_days})
+    else:
+        unschedule('jobs.close_stale')
+    db.session.commit()
+
+
+# ---------------------- Workers ----------------------
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _claimable(now):
+    return or_(
+        and_(Task.status == 'queued', Task.run_at <= now),
+        and_(Task.status == 'running', Task.lease_expires < now)
+    )
+
+
+def claim(owner, now=None):
+    """Lease the most overdue task for `owner`, or return None."""
+    for _ in range(5):
+        now = now or datetime.utcnow()
+        row = db.session.query(Task.id, Task.name)\
+            .filter(_claimable(now))\
+            .order_by(Task.run_at, Task.id)\
+            .first()
+        if row is None:
+            db.session.rollback()
+            return None
+        lease = _registry.get(row.name, {}).get('lease', DEFAULT_LEASE)
+        # Conditional update: only one worker wins a task another worker also saw
+        claimed = Task.query.filter(Task.id == row.id, _claimable(now))\
+            .update({
+                'status': 'running',
+                'lease_owner': owner,
+                'lease_expires': now + timedelta(seconds=lease),
+                'attempts': Task.attempts + 1,
+                'started_at': now,
+            }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(Task, row.id, populate_existing=True)
+        now = None
+    return None
+
+
+def backoff(attempts):
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1))
+
+
+def run(job):
+    """Run a claimed task and record the outcome."""
+    task_id = job.id
+    name = job.name
+    args = json.loads(job.args or '{}')
+    due = job.run_at
+    started = job.started_at
+    spec = _registry.get(name)
+    error = None
+    try:
+        if spec is None:
+            raise KeyError(f'Unknown task {name!r}')
+        spec['func'](**args)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+
+    job = db.session.get(Task, task_id, populate_existing=True)
+    now = datetime.utcnow()
+    job.latency_seconds = max(0.0, (started - due).total_seconds())
+    job.duration_seconds = (now - started).total_seconds()
+    job.finished_at = now
+    job.lease_owner = None
+    job.lease_expires = None
+    job.last_error = error
+    if error is None or job.attempts >= job.max_attempts:
+        if job.schedule:
+            job.status = 'queued'
+            job.run_at = next_run(job.schedule, now)
+            job.attempts = 0
+        else:
+            job.status = 'done' if error is None else 'failed'
+    else:
+        job.status = 'queued'
+        job.run_at = now + timedelta(seconds=backoff(job.attempts))
+    db.session.commit()
+    return error is None
+
+
+def work(owner=None, poll_interval=POLL_INTERVAL, max_tasks=None, stop=None):
+    """Claim and run tasks until `stop()` is true or `max_tasks` have run."""
+    owner = owner or worker_name()
+    processed = 0
+    while not (stop and stop()):
+        if max_tasks is not None and processed >= max_tasks:
+            break
+        job = claim(owner)
+        if job is None:
+            if max_tasks is not None:
+                break
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        events.flush()
+        processed += 1
+    return processed
+
+
+def _worker_process(app_import, poll_interval):
+    module_name, _, attribute = app_import.partition(':')
+    module = __import__(module_name)
+    app = getattr(module, attribute or 'app')
+    with app.app_context():
+        try:
+            work(poll_interval=poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def run_workers(app_import, processes=2, poll_interval=POLL_INTERVAL):
+    """Run `processes` worker processes until interrupted."""
+    import multiprocessing
+    # Spawn, not fork: the parent has already used the database, and pooled
+    # SQLite connections (core, shard, snapshot and archive engines) must
+    # not be shared with children. Each child imports the app afresh.
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=_worker_process, args=(app_import, poll_interval), daemon=True)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+# ---------------------- Metrics ----------------------
+def metrics(now=None, window=timedelta(hours=1)):
+    """Queue depth per status, due backlog and recent task latency."""
+    now = now or datetime.utcnow()
+    depth = dict(db.session.query(Task.status, func.count(Task.id)).group_by(Task.status).all())
+    due, oldest_due = db.session.query(func.count(Task.id), func.min(Task.run_at))\
+        .filter(_claimable(now))\
+        .one()
+    recent = db.session.query(
+        Task.name,
+        func.count(Task.id),
+        func.avg(Task.latency_seconds),
+        func.max(Task.latency_seconds),
+        func.avg(Task.duration_seconds),
+        func.max(Task.duration_seconds)
+    ).filter(Task.finished_at >= now - window)\
+        .group_by(Task.name)\
+        .all()
+    return {
+        'depth': {status: depth.get(status, 0) for status in ('queued', 'running', 'done', 'failed')},
+        'due': due,
+        'oldest_due_seconds': round((now - oldest_due).total_seconds(), 1) if oldest_due else 0,
+        'recent': {
+            name: {
+                'runs': runs,
+                'avg_latency_seconds': round(avg_latency or 0, 3),
+                'max_latency_seconds': round(max_latency or 0, 3),
+                'avg_duration_seconds': round(avg_duration or 0, 3),
+                'max_duration_seconds': round(max_duration or 0, 3),
+            }
+            for name, runs, avg_latency, max_latency, avg_duration, max_duration in recent
+        }
+    }
+
+
+# ---------------------- Built-in tasks ----------------------
+STALE_JOB_DAYS = 90
+DONE_RETENTION_DAYS = 7
+
+
+@task('rollups.compact')
+def _rollups_compact():
+    import rollups
+    shards.scatter(rollups.compact)
+
+
+@task('rollups.rebuild', lease=3600)
+def _rollups_rebuild():
+    import rollups
+    shards.scatter(rollups.rebuild)
+
+
+@task('jobs.backfill_fields', lease=3600)
+def _jobs_backfill_fields():
+    import job_fields
+    shards.scatter(job_fields.backfill)
+
+
+@task('jobs.close_stale')
+def _jobs_close_stale(days=STALE_JOB_DAYS):
+    """Close active jobs that have not been updated for `days`."""
+    shards.scatter(lambda: _close_stale(days))
+
+
+def _close_stale(days):
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    stale = db.session.query(JobPosting.id, JobPosting.hr_id, JobPosting.title)\
+        .filter(JobPosting.status == 'active', JobPosting.updated_at < cutoff)\
+        .all()
+    if not stale:
+        return
+    JobPosting.query.filter(JobPosting.id.in_([job.id for job in stale]))\
+        .update({'status': 'closed', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    for job in stale:
+        events.record('job.status', job.hr_id, job_id=job.id, job_title=job.title,
+                      status='closed', previous='active')
+
+
+@task('applications.rescore', lease=1800)
+def _applications_rescore(job_id, batch_size=1000):
+    """Recompute match scores for every application to `job_id`."""
+    with shards.using(shards.shard_for_job(job_id)):
+        _rescore(job_id, batch_size)
+
+
+def _rescore(job_id, batch_size):
+    from skill_matcher import matcher
+    job = db.session.get(JobPosting, job_id)
+    if job is None:
+        return
+    last_id = 0
+    while True:
+        rows = db.session.query(Application.id, Candidate.skills)\
+            .join(Candidate, Application.candidate_id == Candidate.id)\
+            .filter(Application.job_id == job_id, Application.id > last_id)\
+            .order_by(Application.id)\
+            .limit(batch_size)\
+            .all()
+        if not rows:
+            break
+        db.session.bulk_update_mappings(Application, [
+            {'id': application_id, 'match_score': matcher.match_score(skills, job)}
+            for application_id, skills in rows
+        ])
+        db.session.commit()
+        last_id = rows[-1][0]
+
+
+@task('events.compact', lease=1800)
+def _events_compact():
+    events.compact()
+
+
+@task('snapshot.refresh', lease=600)
+def _snapshot_refresh():
+    import snapshot
+    snapshot.refresh()
+
+
+@task('archive.run', lease=3600)
+def _archive_run(days=None):
+    """Move jobs closed for longer than ARCHIVE_AFTER_DAYS to the archive."""
+    import archive
+    archive.run(current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days)
+
+
+@task('tasks.purge')
+def _tasks_purge(days=DONE_RETENTION_DAYS):
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    Task.query.filter(Task.status == 'done', Task.schedule.is_(None), Task.finished_at < cutoff)\
+        .delete(synchronize_session=False)
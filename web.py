@@ -1,19 +1,61 @@
 # web.py - Updated with modal routes
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context, g
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timedelta
 import os
+import json
+import atexit
+import hmac
+import time
+import click
 from flask_bcrypt import Bcrypt
 
 
 app = Flask(__name__)
 
 app.config['SECRET_KEY'] = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///careersync.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('CAREERSYNC_DATABASE_URI', 'sqlite:///careersync.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Per-company shards as "name=path,name=path" (paths relative to instance/)
+app.config['SHARDS'] = dict(item.split('=', 1) for item in
+                            os.environ.get('CAREERSYNC_SHARDS', '').split(',') if item)
+# Rate limit buckets: 'memory' (per process), 'sqlite' (shared by all workers) or 'off'
+app.config['RATE_LIMIT_BACKEND'] = os.environ.get('CAREERSYNC_RATE_LIMIT_BACKEND', 'memory')
+# Reports read a snapshot at most this many seconds old, else live data (0: always live)
+app.config['SNAPSHOT_MAX_AGE'] = int(os.environ.get('CAREERSYNC_SNAPSHOT_MAX_AGE', 900))
+# Closed jobs are moved to instance/archive.db this many days after closing
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('CAREERSYNC_ARCHIVE_AFTER_DAYS', 365))
+# Active jobs not updated for this many days are closed nightly (0: never)
+app.config['CLOSE_STALE_JOBS_AFTER_DAYS'] = int(os.environ.get('CAREERSYNC_CLOSE_STALE_JOBS_AFTER_DAYS', 0))
+# Token for the /api/admin/profiler endpoints; they are disabled when unset
+app.config['PROFILER_TOKEN'] = os.environ.get('CAREERSYNC_PROFILER_TOKEN')
 
 # Use centralized models and extensions to avoid circular imports
-from models import db, bcrypt, User, JobPosting, Candidate, Application
+from models import db, bcrypt, User, JobPosting, Candidate, Application, Task, Event, SavedJob
+import rollups
+import live_feed
+import projection
+import assets
+import search
+import job_fields
+import tasks
+import bulk
+import events
+import exports
+import shards
+import fragments
+import profiler
+import limits
+import geo
+import autocomplete
+import snapshot
+import archive
+from migrations import ensure_schema
+from skill_matcher import matcher as skill_matcher
+from candidate_index import index as candidate_index, parse_query, QueryError
+from projection import FieldError
 
 # Initialize extensions with the app
 db.init_app(app)
@@ -22,6 +64,68 @@ bcrypt.init_app(app)
 # Create tables
 with app.app_context():
     db.create_all()
+    ensure_schema(db, JobPosting, Application, Task, Event)
+shards.init_app(app)
+snapshot.init_app(app)
+archive.init_app(app)
+
+profiler.init_app(app)
+
+# Sampling profiler hooks; a clock read per request while disarmed
+@app.before_request
+def start_profile():
+    profiler.start_request(request.endpoint, request.method, request.path)
+
+@app.after_request
+def end_profile(response):
+    profiler.end_request(response.status_code)
+    return response
+
+@app.teardown_request
+def end_failed_profile(exc):
+    profiler.end_request(500)
+
+limiter = limits.init_app(app)
+
+# Rate limiting and load shedding for the expensive job seeker routes
+@app.before_request
+def admit_request():
+    client = session.get('user_id') or request.remote_addr
+    try:
+        g.route_class = limiter.admit(request.endpoint, client)
+    except limits.Refused as refused:
+        response = jsonify({'error': refused.reason, 'retry_after': refused.retry_after})
+        response.status_code = refused.status
+        response.headers['Retry-After'] = str(refused.retry_after)
+        return response
+
+@app.teardown_request
+def release_request(exc):
+    route_class = g.pop('route_class', None)
+    if route_class is not None:
+        limiter.release(route_class)
+
+# HR requests only touch their own company's shard
+@app.before_request
+def select_shard():
+    if session.get('user_type') == 'hr' and 'user_id' in session:
+        g.shard = shards.shard_for_hr(session['user_id'])
+
+# Write buffered event log entries in batches; the request itself has
+# already committed, so a failed flush is logged and retried later
+@app.after_request
+def flush_events(response):
+    try:
+        events.flush_if_due()
+    except Exception:
+        app.logger.exception('Writing buffered events failed; retrying')
+    return response
+
+def _flush_events_at_exit():
+    with app.app_context():
+        events.flush()
+
+atexit.register(_flush_events_at_exit)
 
 # ---------------------- import candidates.py----------------
 # Add at the top with other imports
@@ -32,6 +136,28 @@ app.register_blueprint(candidate_bp)
 
 # Note: `jobseeker_dashboard` route is defined later to render the jobseeker view
 
+# Fingerprinted static assets (built with `flask assets-build`)
+app.add_template_global(assets.asset_url, 'asset_url')
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    return assets.send_asset(filename)
+
+@app.cli.command('assets-build')
+def assets_build_command():
+    """Minify, fingerprint and precompress the bundled CSS/JS."""
+    manifest = assets.build()
+    for logical, hashed in sorted(manifest.items()):
+        print(f'{logical} -> {hashed}')
+
+# Template bytecode cache and the {% cache %} fragment tag
+fragments.init_app(app)
+
+@app.cli.command('templates-warm')
+def templates_warm_command():
+    """Compile all templates into the bytecode cache."""
+    print(f'Compiled {fragments.warm(app)} templates')
+
 # --------------------- Routes -------------------------
 @app.route('/')
 def home():
@@ -93,6 +219,9 @@ def signup():
         
         try:
             db.session.add(new_user)
+            db.session.flush()
+            if user_type == 'hr':
+                shards.assign(new_user.id)
             db.session.commit()
             
             session['user_id'] = new_user.id
@@ -124,30 +253,55 @@ def job_api(job_id):
     if 'user_id' not in session or session['user_type'] != 'hr':
         return jsonify({'error': 'Unauthorized'}), 401
     
-    job = JobPosting.query.get_or_404(job_id)
+    job, archived = archive.lookup_or_404(JobPosting, job_id)
     
     # Check if user owns this job
     if job.hr_id != session['user_id']:
         return jsonify({'error': 'Forbidden'}), 403
     
+    if archived and request.method != 'GET':
+        return jsonify({'error': 'Archived jobs cannot be changed'}), 409
+    
     if request.method == 'GET':
-        return jsonify(job.to_dict())
+        if not request.args.get('fields'):
+            return jsonify(job.to_dict() | {'archived': archived})
+        try:
+            fields = projection.parse_fields(request.args['fields'], projection.JOB_COLUMNS, ())
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        with archive.reading(archived):
+            rows = projection.select(JobPosting.query.filter_by(id=job_id), fields, projection.JOB_COLUMNS)
+        return projection.json_response(rows[0])
     
     elif request.method == 'PUT':
         data = request.get_json()
+        job_text = (job.description, job.requirements)
+        previous_status = job.status
         
         # Update job fields
         job.title = data.get('title', job.title)
         job.company = data.get('company', job.company)
         job.location = data.get('location', job.location)
         job.salary_range = data.get('salary_range', job.salary_range)
+        job.experience = data.get('experience', job.experience)
         job.description = data.get('description', job.description)
         job.requirements = data.get('requirements', job.requirements)
         job.job_type = data.get('job_type', job.job_type)
         job.status = data.get('status', job.status)
         
         try:
+            # Match scores depend on the job text; rescore applicants in a worker
+            if (job.description, job.requirements) != job_text:
+                tasks.enqueue('applications.rescore', {'job_id': job_id},
+                              key=f'applications.rescore:{job_id}')
             db.session.commit()
+            if job.status != previous_status:
+                events.record('job.status', job.hr_id, job_id=job.id, job_title=job.title,
+                              status=job.status, previous=previous_status)
+                live_feed.publish_activity(job.hr_id,
+                                           f'Job {job.status}',
+                                           f'{job.title} is now {job.status}',
+                                           event='job_status', job_id=job.id, status=job.status)
             return jsonify({
                 'success': True,
                 'message': 'Job updated successfully',
@@ -159,11 +313,19 @@ def job_api(job_id):
     
     elif request.method == 'DELETE':
         try:
-            # Delete related applications first
+            # Delete related applications and bookmarks first
+            applicant_ids = [candidate_id for (candidate_id,) in
+                             db.session.query(Application.candidate_id).filter_by(job_id=job_id).distinct()]
             Application.query.filter_by(job_id=job_id).delete()
+            SavedJob.query.filter_by(job_id=job_id).delete()
+            rollups.forget_job(job_id)
+            skill_matcher.forget_job(job_id)
             
             db.session.delete(job)
             db.session.commit()
+            # Applicant scopes may shrink
+            candidate_index.remove_applications(job.hr_id, applicant_ids)
+            events.record('job.deleted', job.hr_id, job_id=job_id, job_title=job.title)
             return jsonify({
                 'success': True,
                 'message': 'Job deleted successfully'
@@ -175,14 +337,111 @@ def job_api(job_id):
 
 @app.route('/api/job/<int:job_id>/details')
 def job_details_api(job_id):
-    job = JobPosting.query.get_or_404(job_id)
-    job_data = job.to_dict()
-    # add related info
-    job_data['applications'] = len(job.applications) if hasattr(job, 'applications') else 0
-    hr = User.query.get(job.hr_id)
-    job_data['hr_name'] = hr.name if hr else None
+    with shards.using(shards.shard_for_job(job_id)):
+        job, archived = archive.lookup_or_404(JobPosting, job_id)
+        with archive.reading(archived):
+            job_data = job.to_dict()
+            # add related info
+            job_data['applications'] = len(job.applications) if hasattr(job, 'applications') else 0
+        hr = User.query.get(job.hr_id)
+        job_data['hr_name'] = hr.name if hr else None
+        job_data['archived'] = archived
     return jsonify(job_data)
 
+# Saved jobs (bookmarks) for job seekers, used by static/js/jobs.js
+@app.route('/save-job/<int:job_id>', methods=['POST'])
+def save_job(job_id):
+    if 'user_id' not in session or session['user_type'] != 'jobseeker':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    with shards.using(shards.shard_for_job(job_id)):
+        job = db.session.get(JobPosting, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    try:
+        # Saving twice is a no-op thanks to the (candidate_id, job_id) unique key
+        db.session.execute(
+            sqlite_insert(SavedJob)
+            .values(candidate_id=session['user_id'], job_id=job_id, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['candidate_id', 'job_id'])
+        )
+        db.session.commit()
+        return jsonify({'success': True, 'saved': True})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/unsave-job/<int:job_id>', methods=['POST'])
+def unsave_job(job_id):
+    if 'user_id' not in session or session['user_type'] != 'jobseeker':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        SavedJob.query.filter_by(candidate_id=session['user_id'], job_id=job_id).delete()
+        db.session.commit()
+        return jsonify({'success': True, 'saved': False})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs')
+def jobs_search_api():
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', search.DEFAULT_PER_PAGE, type=int), 1),
+                   search.MAX_PER_PAGE)
+    
+    near = None
+    if request.args.get('near', '').strip():
+        place = geo.lookup(request.args['near'])
+        if place is None:
+            return jsonify({'error': f"Unknown location: {request.args['near']}"}), 400
+        radius_km = request.args.get('radius_km', geo.DEFAULT_RADIUS_KM, type=float)
+        if not 0 < radius_km <= geo.MAX_RADIUS_KM:
+            return jsonify({'error': f'radius_km must be between 0 and {geo.MAX_RADIUS_KM}'}), 400
+        near = geo.Area(place, radius_km)
+    
+    result = search.search_jobs(search=request.args.get('search', '').strip(),
+                                job_type=request.args.get('type', '').strip(),
+                                location=request.args.get('location', ''),
+                                salary=request.args.get('salary', '').strip(),
+                                experience=request.args.get('experience', '').strip(),
+                                min_salary=request.args.get('min_salary', type=int),
+                                near=near,
+                                page=page,
+                                per_page=per_page,
+                                currency=request.args.get('currency', search.DEFAULT_CURRENCY)
+                                .strip().upper())
+    return projection.json_response(result)
+
+@app.route('/api/autocomplete')
+def autocomplete_api():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    kinds = autocomplete.KINDS
+    if request.args.get('kind'):
+        kinds = request.args['kind'].split(',')
+        unknown = [kind for kind in kinds if kind not in autocomplete.KINDS]
+        if unknown:
+            return jsonify({'error': f"Unknown kind: {', '.join(unknown)}"}), 400
+    limit = min(max(request.args.get('limit', 8, type=int), 1), autocomplete.MAX_LIMIT)
+    return jsonify({'suggestions': autocomplete.index.suggest(request.args.get('q', ''), kinds, limit)})
+
+# Flat application rows for the job postings modal, selectable via ?fields=
+JOB_APPLICATION_COLUMNS = {
+    'id': Application.id,
+    'candidate_id': Application.candidate_id,
+    'candidate_name': Candidate.name,
+    'email': Candidate.email,
+    'phone': Candidate.phone,
+    'applied_at': Application.applied_at,
+    'status': Application.status,
+    'match_score': Application.match_score
+}
+
+MAX_RANKED_APPLICATIONS = 1000
 
 @app.route('/api/job/<int:job_id>/applications')
 def job_applications_api(job_id):
@@ -190,23 +449,73 @@ def job_applications_api(job_id):
     if 'user_id' not in session or session.get('user_type') != 'hr':
         return jsonify({'error': 'Unauthorized'}), 401
 
-    job = JobPosting.query.get_or_404(job_id)
-    applications = Application.query.filter_by(job_id=job_id).join(Candidate).all()
-
-    apps_data = []
-    for a in applications:
-        apps_data.append({
-            'id': a.id,
-            'candidate_id': a.candidate_id,
-            'candidate_name': a.candidate.name if a.candidate else None,
-            'email': a.candidate.email if a.candidate else None,
-            'phone': a.candidate.phone if a.candidate else None,
-            'applied_at': a.applied_at.strftime('%Y-%m-%d %H:%M:%S') if a.applied_at else None,
-            'status': a.status,
-            'match_score': a.match_score
-        })
+    job, archived = archive.lookup_or_404(JobPosting, job_id)
+    
+    try:
+        fields = projection.parse_fields(request.args.get('fields'),
+                                         JOB_APPLICATION_COLUMNS, JOB_APPLICATION_COLUMNS)
+    except FieldError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = Application.query.filter_by(job_id=job_id)
+    if any(JOB_APPLICATION_COLUMNS[name].class_ is Candidate for name in fields):
+        query = query.join(Candidate, Application.candidate_id == Candidate.id)
+    with archive.reading(archived):
+        apps_data = projection.select(query, fields, JOB_APPLICATION_COLUMNS)
+    # Without `fields` the response keeps its original timestamp format
+    if not request.args.get('fields'):
+        projection.format_times(apps_data, {'applied_at': '%Y-%m-%d %H:%M:%S'})
+
+    return projection.json_response({'applications': apps_data, 'count': len(apps_data)})
 
-    return jsonify({'applications': apps_data, 'count': len(apps_data)})
+@app.route('/api/job/<int:job_id>/ranked-applications')
+def ranked_applications_api(job_id):
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job, archived = archive.lookup_or_404(JobPosting, job_id)
+    if job.hr_id != session['user_id']:
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_RANKED_APPLICATIONS)
+    status = request.args.get('status')
+    min_score = request.args.get('min_score', type=float)
+    
+    try:
+        fields = projection.parse_fields(request.args.get('fields'),
+                                         JOB_APPLICATION_COLUMNS, JOB_APPLICATION_COLUMNS)
+    except FieldError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Served by the (job_id[, status], match_score DESC, id) indexes, so only
+    # `limit` rows are read no matter how many applications the job has
+    query = Application.query.filter(Application.job_id == job_id)
+    if status:
+        query = query.filter(Application.status == status)
+    if min_score is not None:
+        query = query.filter(Application.match_score >= min_score)
+    query = query.order_by(Application.match_score.desc(), Application.id).limit(limit)
+    
+    if any(JOB_APPLICATION_COLUMNS[name].class_ is Candidate for name in fields):
+        # Join after ranking so candidates are only looked up for the top rows
+        top = query.subquery()
+        ranked = db.aliased(Application, top)
+        query = db.session.query(ranked)\
+            .join(Candidate, ranked.candidate_id == Candidate.id)\
+            .order_by(ranked.match_score.desc(), ranked.id)
+        columns = {name: getattr(ranked, column.key) if column.class_ is Application else column
+                   for name, column in JOB_APPLICATION_COLUMNS.items()}
+    else:
+        columns = JOB_APPLICATION_COLUMNS
+    with archive.reading(archived):
+        applications = projection.select(query, fields, columns)
+    
+    return projection.json_response({
+        'job_id': job_id,
+        'limit': limit,
+        'applications': applications,
+        'count': len(applications)
+    })
 
 @app.route('/api/job/<int:job_id>/toggle-status', methods=['POST'])
 def toggle_job_status(job_id):
@@ -219,10 +528,17 @@ def toggle_job_status(job_id):
         return jsonify({'error': 'Forbidden'}), 403
     
     # Toggle between active and closed
+    previous_status = job.status
     job.status = 'closed' if job.status == 'active' else 'active'
     
     try:
         db.session.commit()
+        events.record('job.status', job.hr_id, job_id=job.id, job_title=job.title,
+                      status=job.status, previous=previous_status)
+        live_feed.publish_activity(job.hr_id,
+                                   f'Job {job.status}',
+                                   f'{job.title} is now {job.status}',
+                                   event='job_status', job_id=job.id, status=job.status)
         return jsonify({
             'success': True,
             'message': f'Job status updated to {job.status}',
@@ -232,6 +548,75 @@ def toggle_job_status(job_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/batch', methods=['POST'])
+def jobs_batch_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    job_ids = data.get('job_ids')
+    if action not in bulk.JOB_ACTIONS:
+        return jsonify({'error': f"action must be one of: {', '.join(bulk.JOB_ACTIONS)}"}), 400
+    if not isinstance(job_ids, list) or not all(isinstance(job_id, int) for job_id in job_ids):
+        return jsonify({'error': 'job_ids must be a list of integers'}), 400
+    if len(job_ids) > bulk.MAX_BATCH_IDS:
+        return jsonify({'error': f'At most {bulk.MAX_BATCH_IDS} jobs per request'}), 400
+    
+    try:
+        result = bulk.apply_job_action(session['user_id'], action, job_ids)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    applicant_ids = result.pop('applicant_ids')
+    if action == 'delete' and result['changed']:
+        for job_id in result['changed']:
+            skill_matcher.forget_job(job_id)
+        candidate_index.remove_applications(session['user_id'], applicant_ids)
+    if result['changed']:
+        # Bulk statements bypass the ORM events that keep suggestions current
+        autocomplete.index.invalidate()
+        count = len(result['changed'])
+        verb = {'close': 'closed', 'reopen': 'reopened', 'delete': 'deleted'}[action]
+        live_feed.publish_activity(session['user_id'],
+                                   f'{count} jobs {verb}',
+                                   f'{count} job postings were {verb}',
+                                   event='job_status', job_ids=result['changed'],
+                                   status=bulk.JOB_ACTIONS[action] or 'deleted')
+    
+    return jsonify({'success': True, **result})
+
+@app.route('/api/applications/status', methods=['POST'])
+def applications_status_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    application_ids = data.get('application_ids')
+    if status not in bulk.APPLICATION_TRANSITIONS:
+        return jsonify({'error': f"status must be one of: {', '.join(bulk.APPLICATION_TRANSITIONS)}"}), 400
+    if not isinstance(application_ids, list) or not all(isinstance(i, int) for i in application_ids):
+        return jsonify({'error': 'application_ids must be a list of integers'}), 400
+    if len(application_ids) > bulk.MAX_BATCH_IDS:
+        return jsonify({'error': f'At most {bulk.MAX_BATCH_IDS} applications per request'}), 400
+    
+    try:
+        result = bulk.transition_applications(session['user_id'], application_ids, status)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    if result['changed']:
+        count = len(result['changed'])
+        live_feed.publish_activity(session['user_id'],
+                                   f'{count} applications {status}',
+                                   f"{count} applications across {len(result['jobs'])} jobs moved to {status}",
+                                   status=status, jobs=result['jobs'])
+    
+    return jsonify({'success': True, **result})
+
 # Candidate Modal API Routes
 @app.route('/api/candidate/<int:candidate_id>', methods=['GET', 'PUT', 'DELETE'])
 def candidate_api(candidate_id):
@@ -241,7 +626,15 @@ def candidate_api(candidate_id):
     candidate = Candidate.query.get_or_404(candidate_id)
     
     if request.method == 'GET':
-        return jsonify(candidate.to_dict())
+        if not request.args.get('fields'):
+            return jsonify(candidate.to_dict())
+        try:
+            fields = projection.parse_fields(request.args['fields'], projection.CANDIDATE_COLUMNS, ())
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        rows = projection.select(Candidate.query.filter_by(id=candidate_id), fields,
+                                 projection.CANDIDATE_COLUMNS)
+        return projection.json_response(rows[0])
     
     elif request.method == 'PUT':
         data = request.get_json()
@@ -256,6 +649,7 @@ def candidate_api(candidate_id):
         
         try:
             db.session.commit()
+            candidate_index.update_candidate(candidate.id, candidate.skills)
             return jsonify({
                 'success': True,
                 'message': 'Candidate updated successfully',
@@ -267,11 +661,13 @@ def candidate_api(candidate_id):
     
     elif request.method == 'DELETE':
         try:
-            # Delete related applications
-            Application.query.filter_by(candidate_id=candidate_id).delete()
+            # Delete related applications on every shard
+            shards.scatter(lambda: Application.query.filter_by(candidate_id=candidate_id).delete())
+            SavedJob.query.filter_by(candidate_id=candidate_id).delete()
             
             db.session.delete(candidate)
             db.session.commit()
+            candidate_index.remove_candidate(candidate_id)
             return jsonify({
                 'success': True,
                 'message': 'Candidate deleted successfully'
@@ -280,6 +676,55 @@ def candidate_api(candidate_id):
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/hr/candidates/search')
+def candidate_search_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    query_text = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    try:
+        tree = parse_query(query_text)
+    except QueryError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    
+    started = time.perf_counter()
+    total, hits = candidate_index.search(session['user_id'], tree, page=page, per_page=per_page)
+    took_ms = (time.perf_counter() - started) * 1000
+    
+    # Hydrate only the page of candidates, keeping the ranked order
+    fields = ['id', 'name', 'email', 'experience', 'education', 'skills']
+    rows = projection.select(Candidate.query.filter(Candidate.id.in_([cid for cid, _ in hits])),
+                             fields, projection.CANDIDATE_COLUMNS) if hits else []
+    by_id = {row['id']: row for row in rows}
+    candidates = []
+    for candidate_id, score in hits:
+        if candidate_id in by_id:
+            candidates.append(dict(by_id[candidate_id], score=score))
+    
+    return projection.json_response({
+        'query': query_text,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'candidates': candidates,
+        'took_ms': round(took_ms, 3)
+    })
+
+def time_ago(moment, now=None):
+    """Human readable age of a UTC timestamp, e.g. '5 minutes ago'"""
+    if not moment:
+        return ''
+    seconds = int(((now or datetime.utcnow()) - moment).total_seconds())
+    if seconds < 60:
+        return 'Just now'
+    for unit, size in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size:
+            value = seconds // size
+            return f"{value} {unit}{'s' if value > 1 else ''} ago"
+
 def get_dashboard_data(user_id):
     """Helper function to get dashboard data"""
     user = User.query.get(user_id)
@@ -303,22 +748,14 @@ def get_dashboard_data(user_id):
         .filter(JobPosting.hr_id == user_id, Application.status == 'shortlisted')\
         .count()
     
-    # Get recent activities
+    # Get recent activities from the event log
     recent_activities = []
-    
-    # Get recent applications for activity
-    recent_apps = Application.query\
-        .join(JobPosting)\
-        .filter(JobPosting.hr_id == user_id)\
-        .order_by(Application.applied_at.desc())\
-        .limit(3)\
-        .all()
-    
-    for app in recent_apps:
+    for event in events.hr_timeline(user_id, limit=3):
+        title, description = events.describe(event)
         recent_activities.append({
-            'title': f'New application from {app.candidate.name}',
-            'description': f'Applied for {app.job.title}',
-            'time_ago': 'Just now'  # In production, calculate time difference
+            'title': title,
+            'description': description,
+            'time_ago': time_ago(event.created_at)
         })
     
     # Get new candidates (last 4)
@@ -350,6 +787,41 @@ def hr_dashboard():
     
     return render_template('hr_dashboard.html', **data)
 
+@app.route('/api/hr/timeline')
+def hr_timeline_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    timeline = events.hr_timeline(session['user_id'], limit=limit,
+                                  before_id=request.args.get('before_id', type=int))
+    items = []
+    for event in timeline:
+        title, description = events.describe(event)
+        items.append({
+            'id': event.id,
+            'kind': event.kind,
+            'job_id': event.job_id,
+            'application_id': event.application_id,
+            'title': title,
+            'description': description,
+            'created_at': event.created_at.isoformat(),
+            'time_ago': time_ago(event.created_at)
+        })
+    return jsonify({
+        'events': items,
+        'next_before_id': timeline[-1].id if len(timeline) == limit else None
+    })
+
+@app.route('/api/hr/activity-stream')
+def hr_activity_stream():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return Response(stream_with_context(live_feed.stream(session['user_id'])),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/dashboard/jobseeker')
 def jobseeker_dashboard():
     if 'user_id' not in session or session['user_type'] != 'jobseeker':
@@ -368,10 +840,17 @@ def job_postings():
     jobs = JobPosting.query.filter_by(hr_id=user_id)\
         .order_by(JobPosting.created_at.desc())\
         .all()
+    # One grouped count instead of loading every job's applications
+    application_counts = dict(db.session.query(Application.job_id, func.count(Application.id))
+                              .join(JobPosting, Application.job_id == JobPosting.id)
+                              .filter(JobPosting.hr_id == user_id)
+                              .group_by(Application.job_id)
+                              .all())
     
     return render_template('job_postings.html', 
                          jobs=jobs,
-                         job_count=len(jobs))
+                         job_count=len(jobs),
+                         application_counts=application_counts)
 
 @app.route('/dashboard/hr/create-job', methods=['POST'])
 def create_job():
@@ -385,6 +864,7 @@ def create_job():
                 company=request.form['company'],
                 location=request.form.get('location', ''),
                 salary_range=request.form.get('salary_range', ''),
+                experience=request.form.get('experience', ''),
                 description=request.form['description'],
                 requirements=request.form['requirements'],
                 job_type=request.form['job_type'],
@@ -394,6 +874,7 @@ def create_job():
             
             db.session.add(new_job)
             db.session.commit()
+            events.record('job.created', new_job.hr_id, job_id=new_job.id, job_title=new_job.title)
             
             flash('Job posted successfully!', 'success')
             return redirect(url_for('hr_dashboard'))
@@ -421,10 +902,20 @@ def candidate_list():
         .distinct()\
         .order_by(Candidate.created_at.desc())\
         .all()
+    # Application count and latest date per candidate for this HR's jobs
+    application_stats = {
+        candidate_id: (count, last_applied_at)
+        for candidate_id, count, last_applied_at in db.session.query(
+            Application.candidate_id, func.count(Application.id), func.max(Application.applied_at)
+        ).join(JobPosting, Application.job_id == JobPosting.id)
+        .filter(JobPosting.hr_id == user_id)
+        .group_by(Application.candidate_id)
+    }
     
     return render_template('candidates.html',
                          candidates=candidates,
-                         candidate_count=len(candidates))
+                         candidate_count=len(candidates),
+                         application_stats=application_stats)
 
 # Applications Routes
 @app.route('/dashboard/hr/applications')
@@ -453,18 +944,286 @@ def analytics():
     
     user_id = session['user_id']
     
-    # Get analytics data
-    total_jobs = JobPosting.query.filter_by(hr_id=user_id).count()
-    active_jobs = JobPosting.query.filter_by(hr_id=user_id, status='active').count()
-    total_applications = Application.query\
-        .join(JobPosting)\
-        .filter(JobPosting.hr_id == user_id)\
-        .count()
+    with snapshot.reading() as data_age:
+        # Get analytics data
+        total_jobs = JobPosting.query.filter_by(hr_id=user_id).count()
+        active_jobs = JobPosting.query.filter_by(hr_id=user_id, status='active').count()
+        total_applications = Application.query\
+            .join(JobPosting)\
+            .filter(JobPosting.hr_id == user_id)\
+            .count()
+        
+        # Funnel and time-to-shortlist for the last 30 days, served from rollups
+        end = datetime.utcnow()
+        report = rollups.query_range(user_id, end - timedelta(days=30), end)
     
     return render_template('analytics.html',
                          total_jobs=total_jobs,
                          active_jobs=active_jobs,
-                         total_applications=total_applications)
+                         total_applications=total_applications,
+                         report=report,
+                         data_age=data_age)
+
+@app.route('/api/analytics')
+def analytics_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Date range defaults to the last 30 days; `end` is exclusive
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') if request.args.get('end') \
+            else datetime.utcnow()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') \
+            else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'error': 'Dates must be formatted as YYYY-MM-DD'}), 400
+    
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'hour'):
+        return jsonify({'error': 'granularity must be day or hour'}), 400
+    
+    job_id = request.args.get('job_id', type=int)
+    if job_id is not None:
+        # Rollups of archived jobs are kept, so their reports still work
+        job, _ = archive.lookup_or_404(JobPosting, job_id)
+        if job.hr_id != session['user_id']:
+            return jsonify({'error': 'Forbidden'}), 403
+    
+    with snapshot.reading() as data_age:
+        report = rollups.query_range(session['user_id'], start, end,
+                                     job_id=job_id, granularity=granularity)
+    report['data_age_seconds'] = round(data_age, 1)
+    return jsonify(report)
+
+@app.cli.command('jobs-backfill-fields')
+def jobs_backfill_fields_command():
+    """Extract structured salary/experience fields for existing jobs."""
+    processed = sum(shards.scatter(job_fields.backfill))
+    print(f'Processed {processed} jobs')
+
+@app.cli.command('rollups-compact')
+def rollups_compact_command():
+    """Fold old hourly analytics buckets into daily buckets."""
+    folded = sum(shards.scatter(rollups.compact))
+    print(f'Compacted {folded} hourly bucket groups')
+
+@app.cli.command('rollups-rebuild')
+def rollups_rebuild_command():
+    """Rebuild analytics rollups from existing applications."""
+    rebuilt = sum(shards.scatter(rollups.rebuild))
+    print(f'Rebuilt {rebuilt} rollup groups')
+
+@app.cli.command('tasks-worker')
+@click.option('--processes', default=2, show_default=True, help='Worker processes to run.')
+@click.option('--poll-interval', default=tasks.POLL_INTERVAL, show_default=True,
+              help='Seconds to sleep when no task is due.')
+def tasks_worker_command(processes, poll_interval):
+    """Run background task workers until interrupted."""
+    tasks.install_defaults()
+    print(f'Starting {processes} task workers')
+    tasks.run_workers('web:app', processes, poll_interval)
+
+@app.cli.command('tasks-run-due')
+def tasks_run_due_command():
+    """Run every task that is currently due in this process, then exit."""
+    tasks.install_defaults()
+    processed = tasks.work(max_tasks=1000)
+    print(f'Ran {processed} tasks')
+
+@app.cli.command('tasks-enqueue')
+@click.argument('name')
+@click.argument('args', required=False)
+def tasks_enqueue_command(name, args):
+    """Queue a one-shot task, with optional JSON keyword arguments."""
+    tasks.enqueue(name, json.loads(args) if args else None)
+    db.session.commit()
+    print(f'Queued {name}')
+
+@app.cli.command('tasks-stats')
+def tasks_stats_command():
+    """Print task queue depth and latency."""
+    print(json.dumps(tasks.metrics(), indent=2))
+
+@app.route('/api/tasks/metrics')
+def tasks_metrics_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(tasks.metrics())
+
+@app.route('/api/limits/metrics')
+def limits_metrics_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(limiter.metrics())
+
+@app.cli.command('events-backfill')
+def events_backfill_command():
+    """Seed the event log from existing applications (only when empty)."""
+    count = events.backfill()
+    print(f'Recorded {count} events')
+
+@app.cli.command('events-compact')
+def events_compact_command():
+    """Drop superseded and orphaned event log entries older than 90 days."""
+    removed = events.compact()
+    print(f'Removed {removed} events')
+
+def _export_response(prefix, names, rows, data_age=0):
+    fmt = request.args.get('format', 'csv')
+    gzip = request.args.get('gzip') in ('1', 'true')
+    try:
+        chunks = exports.encode(names, rows, fmt, gzip)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    mimetype = 'application/gzip' if gzip else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename="{exports.download_name(prefix, fmt, gzip)}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Data-Age'] = str(int(data_age))
+    return response
+
+@app.route('/api/exports/applications')
+def export_applications():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job_id = request.args.get('job_id', type=int)
+    prefix = 'applications'
+    if job_id is not None:
+        job = JobPosting.query.get_or_404(job_id)
+        if job.hr_id != session['user_id']:
+            return jsonify({'error': 'Forbidden'}), 403
+        prefix = f'applications-job-{job_id}'
+    
+    with snapshot.reading() as data_age:
+        names, rows = exports.application_rows(session['user_id'], job_id)
+        rows = snapshot.stream(rows)
+    return _export_response(prefix, names, rows, data_age)
+
+@app.route('/api/exports/candidates')
+def export_candidates():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    with snapshot.reading() as data_age:
+        names, rows = exports.candidate_rows(session['user_id'])
+        rows = snapshot.stream(rows)
+    return _export_response('candidates', names, rows, data_age)
+
+@app.route('/api/snapshot')
+def snapshot_status_api():
+    if 'user_id' not in session or session['user_type'] != 'hr':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(snapshot.status())
+
+@app.cli.command('snapshot-refresh')
+def snapshot_refresh_command():
+    """Copy the live databases into the read-only reporting snapshot."""
+    manifest = snapshot.refresh()
+    print(f"Snapshot of {len(manifest['shards'])} databases taken in {manifest['duration_ms']} ms")
+
+# ---------------------- Profiler admin API ----------------------
+def _profiler_authorized():
+    token = app.config.get('PROFILER_TOKEN')
+    supplied = request.headers.get('X-Profiler-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+@app.route('/api/admin/profiler', methods=['GET', 'DELETE'])
+def profiler_api():
+    if not _profiler_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if request.method == 'DELETE':
+        return jsonify({'success': True, 'removed': profiler.clear()})
+    return jsonify({
+        'armed': profiler.current_config(),
+        'profiles': profiler.summary(request.args.get('endpoint'))
+    })
+
+@app.route('/api/admin/profiler/arm', methods=['POST', 'DELETE'])
+def profiler_arm_api():
+    if not _profiler_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if request.method == 'DELETE':
+        profiler.disarm()
+        return jsonify({'success': True, 'armed': None})
+    
+    data = request.get_json(silent=True) or {}
+    endpoint = data.get('endpoint')
+    if endpoint is not None and endpoint not in app.view_functions:
+        return jsonify({'error': f'Unknown endpoint: {endpoint}'}), 400
+    try:
+        min_duration_ms = float(data.get('min_duration_ms', 0))
+        interval_ms = float(data.get('interval_ms', profiler.DEFAULT_INTERVAL_MS))
+        seconds = float(data.get('seconds', profiler.DEFAULT_SECONDS))
+        max_profiles = int(data.get('max_profiles', profiler.DEFAULT_MAX_PROFILES))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'min_duration_ms, interval_ms, seconds and max_profiles must be numbers'}), 400
+    if not 1 <= interval_ms <= 1000 or not 0 < seconds <= 86400 or min_duration_ms < 0 or max_profiles < 1:
+        return jsonify({'error': 'interval_ms must be 1-1000, seconds 1-86400, max_profiles at least 1'}), 400
+    
+    config = profiler.arm(endpoint, min_duration_ms, interval_ms, seconds, max_profiles)
+    return jsonify({'success': True, 'armed': config})
+
+@app.route('/api/admin/profiler/export')
+def profiler_export_api():
+    if not _profiler_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    fmt = request.args.get('format', 'speedscope')
+    records = profiler.profiles(request.args.get('endpoint'))
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    if fmt == 'collapsed':
+        response = Response(profiler.collapsed(records), mimetype='text/plain')
+        filename = f'profile-{stamp}.collapsed.txt'
+    elif fmt == 'speedscope':
+        response = Response(json.dumps(profiler.speedscope(records)), mimetype='application/json')
+        filename = f'profile-{stamp}.speedscope.json'
+    else:
+        return jsonify({'error': 'format must be one of: collapsed, speedscope'}), 400
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.cli.command('shards-status')
+def shards_status_command():
+    """Show HR users, jobs and applications per shard."""
+    for row in shards.status():
+        print(f"{row['shard']:<20} {row['hr_users']:>6} HR users {row['jobs']:>8} jobs "
+              f"{row['applications']:>10} applications")
+
+@app.cli.command('shards-migrate')
+def shards_migrate_command():
+    """Move HR users without a shard out of the core database."""
+    for hr_id, shard, jobs in shards.migrate():
+        print(f'HR {hr_id} -> {shard} ({jobs} jobs)')
+
+@app.cli.command('shards-rebalance')
+@click.argument('hr_id', type=int)
+@click.argument('shard')
+def shards_rebalance_command(hr_id, shard):
+    """Move one HR user's jobs and applications to SHARD."""
+    jobs = shards.move_hr(hr_id, shard)
+    print(f'Moved {jobs} jobs of HR {hr_id} to {shard}')
+
+@app.cli.command('archive-run')
+@click.option('--days', default=None, type=int, help='Archive jobs closed more than this many days ago.')
+@click.option('--batch-size', default=archive.BATCH_SIZE, show_default=True, help='Jobs per transaction.')
+def archive_run_command(days, batch_size):
+    """Move long-closed jobs and their applications to the archive database."""
+    days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    result = archive.run(days, batch_size)
+    print(f"Archived {result['jobs']} jobs and {result['applications']} applications")
+
+@app.cli.command('archive-stats')
+def archive_stats_command():
+    """Show job and application counts in the hot tables and the archive."""
+    print(json.dumps(archive.stats(), indent=2))
 
 # ------------------ Job Posting Action Buttons -----------------------------
 @app.route('/api/applications/<int:job_id>')
@@ -472,40 +1231,30 @@ def get_job_applications(job_id):
     if 'user_id' not in session or session['user_type'] != 'hr':
         return jsonify({'error': 'Unauthorized'}), 401
     
-    job = JobPosting.query.get_or_404(job_id)
+    job, archived = archive.lookup_or_404(JobPosting, job_id)
     
     # Check if user owns this job
     if job.hr_id != session['user_id']:
         return jsonify({'error': 'Forbidden'}), 403
     
-    # Get applications with candidate details
-    applications = Application.query\
-        .filter_by(job_id=job_id)\
-        .options(db.joinedload(Application.candidate))\
-        .order_by(Application.applied_at.desc())\
-        .all()
+    try:
+        fields = projection.parse_fields(request.args.get('fields'),
+                                         projection.APPLICATION_DETAIL_COLUMNS,
+                                         projection.APPLICATION_DETAIL_DEFAULT)
+    except FieldError as e:
+        return jsonify({'error': str(e)}), 400
     
-    applications_data = []
-    for app in applications:
-        applications_data.append({
-            'id': app.id,
-            'candidate_id': app.candidate_id,
-            'job_id': app.job_id,
-            'status': app.status,
-            'applied_at': app.applied_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'candidate': {
-                'id': app.candidate.id,
-                'name': app.candidate.name,
-                'email': app.candidate.email,
-                'phone': app.candidate.phone,
-                'skills': app.candidate.skills,
-                'experience': app.candidate.experience,
-                'education': app.candidate.education,
-                'resume_url': app.candidate.resume_url
-            }
-        })
+    # Select only the requested columns; join candidates only when needed
+    query = Application.query.filter_by(job_id=job_id)
+    if projection.needs_join(fields, 'candidate'):
+        query = query.join(Candidate, Application.candidate_id == Candidate.id)
+    with archive.reading(archived):
+        applications_data = projection.select(query.order_by(Application.applied_at.desc()),
+                                              fields, projection.APPLICATION_DETAIL_COLUMNS)
+    if not request.args.get('fields'):
+        projection.format_times(applications_data, {'applied_at': '%Y-%m-%d %H:%M:%S'})
     
-    return jsonify({
+    return projection.json_response({
         'job_id': job_id,
         'job_title': job.title,
         'applications': applications_data,